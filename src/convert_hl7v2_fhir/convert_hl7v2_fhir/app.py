@@ -1,19 +1,26 @@
-from datetime import date
-from hashlib import scrypt
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from boto3 import client
-from botocore.exceptions import ClientError, NoRegionError
+from botocore.exceptions import BotoCoreError, ClientError
 from hl7apy.core import Message
 from hl7apy.exceptions import ValidationError
-from hl7apy.parser import parse_message
 
 from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
 from convert_hl7v2_fhir.controllers.er7.er7_message_controller import (
     ER7MessageController,
 )
+from convert_hl7v2_fhir.controllers.er7.er7_parser import parse_er7_message
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import (
+    SEGMENT_SEPARATOR,
+    ER7Header,
+    normalise_er7_message,
+    scan_er7_header,
+)
+from convert_hl7v2_fhir.controllers.er7.er7_snapshot import ER7Snapshot
 from convert_hl7v2_fhir.controllers.er7.exceptions import (
     InvalidNHSNumberError,
     MissingNHSNumberError,
@@ -21,148 +28,552 @@ from convert_hl7v2_fhir.controllers.er7.exceptions import (
 )
 from convert_hl7v2_fhir.controllers.hl7.hl7_ack_builder import (
     generate_ack_message,
-    HL7ErrorCode,
-    HL7ErrorSeverity,
+    generate_batch_ack_message,
     HL7Error,
 )
+from convert_hl7v2_fhir.controllers.hl7.hl7_batch import (
+    is_hl7_batch,
+    iter_hl7_batch_messages,
+    scan_hl7_batch_header,
+)
+from convert_hl7v2_fhir.controllers.hl7.hl7_errors import (
+    check_header_is_supported,
+    check_message_is_supported,
+    to_hl7_error,
+)
+from convert_hl7v2_fhir.controllers.idempotency.idempotency_store import (
+    create_idempotency_key,
+    get_idempotency_store,
+)
+from convert_hl7v2_fhir.controllers.pseudo_id.pseudo_id_cache import (
+    get_pseudo_id_cache,
+)
 from convert_hl7v2_fhir.controllers.utils import hl7v2_lambda_response_factory
+from convert_hl7v2_fhir.http_adapter import with_lambda_deadline
+from convert_hl7v2_fhir.instrumentation.stage_timer import (
+    NO_OP_STAGE_TIMER,
+    StageTimer,
+    create_stage_timer,
+)
 from convert_hl7v2_fhir.internal_integrations.management_interface.api_client import (
     ManagementInterfaceApiClient,
 )
 from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
     ManagementInterfaceApiClientException,
+    ManagementInterfaceCircuitOpen,
+)
+from convert_hl7v2_fhir.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.dead_letter_queue import (
+    send_to_dead_letter_queue,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.message_attributes import (
+    care_provider_lookup_to_message_attributes,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.exceptions import (
+    SQSPublisherException,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.publisher import (
+    get_accepted_sqs_publisher,
+    get_sqs_publisher,
 )
 from convert_hl7v2_fhir.internal_integrations.sqs.settings import get_sqs_settings
+from convert_hl7v2_fhir.settings import get_convert_hl7v2_fhir_settings
 
 _LOGGER = Logger()
 
+# rejections which a retransmission would get again, so their ACK is remembered
+_PERMANENT_ERRORS = (
+    ValidationError,
+    InvalidNHSNumberError,
+    MissingNHSNumberError,
+    MissingFieldError,
+)
+
+# the fields the care provider lookup and conversion read, in the order they
+#  first read them, so the first failure is the one the message is rejected for
+_CONVERSION_FIELDS = (
+    "nhs_number",
+    "date_of_birth",
+    "event_type_code",
+    "family_name",
+    "patient_location",
+    "time_of_admission",
+    "given_name",
+    "admission_type",
+)
+
+_UNREADABLE_HEADER = ER7Header(
+    sending_application="",
+    sending_facility="",
+    message_control_id="",
+    message_type="",
+    trigger_event="",
+    patient_class=None,
+)
+
 
 @_LOGGER.inject_lambda_context(log_event=False)
+@with_lambda_deadline
 def lambda_handler(event: dict, context: LambdaContext):
-    er7_message = _parse_message(event["body"])
+    return hl7v2_lambda_response_factory(body=handle_er7_message(event["body"]))
 
+
+def handle_er7_message(body: str) -> str:
+    """Processes a single HL7 message or an FHS/BHS batch and returns the
+    ACK to reply with, shared by every way messages come in."""
+
+    stage_timer = create_stage_timer()
     try:
-        if not _is_message_of_admit_discharge_transfer_type(er7_message):
-            body = _create_ack_body(
-                er7_message,
-                HL7Error(
-                    error_code=HL7ErrorCode.UNSUPPORTED_MESSAGE_TYPE,
-                    error_severity=HL7ErrorSeverity.ERROR,
-                    error_message="Only ADT message types are supported",
-                ),
-            )
-            return hl7v2_lambda_response_factory(body=body)
-
-        if not _is_message_of_admit_visit_event_code(er7_message):
-            body = _create_ack_body(
-                er7_message,
-                HL7Error(
-                    error_code=HL7ErrorCode.UNSUPPORTED_EVENT_CODE,
-                    error_severity=HL7ErrorSeverity.ERROR,
-                    error_message="Only A01 message event codes are supported",
-                ),
-            )
-            return hl7v2_lambda_response_factory(body=body)
-
-        if not _is_message_of_inpatient_visit_class(er7_message):
-            body = _create_ack_body(
-                er7_message,
-                HL7Error(
-                    error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
-                    error_severity=HL7ErrorSeverity.ERROR,
-                    error_message="Only Inpatient visit patient class messages are supported",
-                ),
+        with stage_timer.stage("total"):
+            raw_er7 = normalise_er7_message(body)
+            if is_hl7_batch(raw_er7):
+                ack = _process_batch(raw_er7, stage_timer)
+                outcome, error_code = "batch", "none"
+            else:
+                ack = _process_message(raw_er7, stage_timer)
+                outcome, error_code = _ack_outcome(ack)
+    except Exception:
+        stage_timer.emit(outcome="error", error_code="none")
+        raise
+
+    stage_timer.emit(outcome=outcome, error_code=error_code)
+    return ack
+
+
+def create_error_ack(body: str, ex: Exception) -> str:
+    """The ACK rejecting a message, or each message of a batch, that
+    `handle_er7_message` raised for, built from the scanned headers so it can
+    be sent whatever state the message is in."""
+
+    hl7_error = to_hl7_error(ex)
+    try:
+        raw_er7 = normalise_er7_message(body)
+        if not is_hl7_batch(raw_er7):
+            return _create_ack_body_from_header(
+                scan_er7_header(raw_er7) or _UNREADABLE_HEADER, hl7_error
             )
-            return hl7v2_lambda_response_factory(body=body)
-
-        if not _is_patient_added_to_hans(er7_message):
-            body = _create_ack_body(er7_message)
-            return hl7v2_lambda_response_factory(body=body)
-
-        er7_extractor = ER7Extractor(er7_message)
-        fhir_bundle = ER7MessageController(er7_extractor=er7_extractor).to_fhir_bundle()
-        _send_to_sqs(fhir_bundle.json())
-        _LOGGER.info("Successfully processed message")
-    except ValidationError as ex:
-        # Malformed message, not adhering to the structures defined by HL7
-        _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.SEGMENT_SEQUENCE_ERROR,
-                error_severity=HL7ErrorSeverity.ERROR,
-                error_message=str(ex),
-            ),
-        )
-        return hl7v2_lambda_response_factory(body=body)
 
-    except InvalidNHSNumberError as ex:
-        _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.DATA_TYPE_ERROR,
-                error_severity=HL7ErrorSeverity.ERROR,
-                error_message="NHS Number in message was invalid",
-            ),
+        batch_header = scan_hl7_batch_header(raw_er7)
+        return generate_batch_ack_message(
+            receiving_application=batch_header.sending_application,
+            receiving_facility=batch_header.sending_facility,
+            replying_to_batch_id=batch_header.batch_control_id,
+            ack_messages=[
+                _create_ack_body_from_header(
+                    scan_er7_header(raw_er7_message) or _UNREADABLE_HEADER, hl7_error
+                )
+                for raw_er7_message in iter_hl7_batch_messages(raw_er7)
+            ],
+            replying_to_file_id=batch_header.file_control_id,
         )
-        return hl7v2_lambda_response_factory(body=body)
+    except Exception as scan_ex:
+        _LOGGER.exception(str(scan_ex))
+        return _create_ack_body_from_header(_UNREADABLE_HEADER, hl7_error)
+
+
+@_LOGGER.inject_lambda_context(log_event=False)
+@with_lambda_deadline
+def accepted_message_handler(event: dict, context: LambdaContext):
+    """Converts the messages `lambda_handler` accepted onto the accepted queue
+    in accept-then-process mode. They have already been filtered and
+    acknowledged, so a transient failure here is returned to the queue to
+    retry rather than rejected. A message which would fail the same way on
+    every retry is moved to the dead-letter queue straight away."""
+
+    queue_messages = {
+        queue_message["messageId"]: queue_message for queue_message in event["Records"]
+    }
+    failed_message_ids = set()
+    dead_lettered = 0
+    lookups = []
+    settings = get_convert_hl7v2_fhir_settings()
+    with ThreadPoolExecutor(max_workers=settings.max_workers) as executor:
+        for queue_message in event["Records"]:
+            message_id = queue_message["messageId"]
+            try:
+                er7_snapshot = ER7Extractor(
+                    er7_message=parse_er7_message(
+                        normalise_er7_message(queue_message["body"])
+                    )
+                ).extract()
+            except Exception as ex:
+                _LOGGER.exception(str(ex), extra={"message_id": message_id})
+                if _dead_letter(queue_message, ex):
+                    dead_lettered += 1
+                else:
+                    failed_message_ids.add(message_id)
+                continue
+
+            lookups.append(
+                (
+                    message_id,
+                    er7_snapshot,
+                    executor.submit(_find_care_provider, er7_snapshot),
+                )
+            )
+
+        sqs_publisher = get_sqs_publisher().with_own_buffer()
+        for message_id, er7_snapshot, care_provider_lookup in lookups:
+            try:
+                if care_provider_lookup.result() is None:
+                    continue
+
+                sqs_publisher.publish(
+                    ER7MessageController(
+                        er7_snapshot=er7_snapshot
+                    ).to_fhir_bundle_json(),
+                    message_attributes=_message_attributes(
+                        care_provider_lookup.result()
+                    ),
+                    correlation_id=message_id,
+                )
+            except SQSPublisherException as ex:
+                _LOGGER.exception(str(ex))
+                failed_message_ids.update(ex.correlation_ids)
+            except Exception as ex:
+                _LOGGER.exception(str(ex), extra={"message_id": message_id})
+                if _dead_letter(queue_messages[message_id], ex):
+                    dead_lettered += 1
+                else:
+                    failed_message_ids.add(message_id)
+
+        try:
+            sqs_publisher.flush()
+        except SQSPublisherException as ex:
+            _LOGGER.exception(str(ex))
+            failed_message_ids.update(ex.correlation_ids)
+
+    _LOGGER.info(
+        "Processed accepted messages",
+        extra={
+            "records": len(queue_messages),
+            "retried": len(failed_message_ids),
+            "dead_lettered": dead_lettered,
+        },
+    )
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id}
+            for message_id in queue_messages
+            if message_id in failed_message_ids
+        ]
+    }
+
+
+def _dead_letter(queue_message: Dict[str, Any], ex: Exception) -> bool:
+    if not isinstance(ex, _PERMANENT_ERRORS):
+        return False
+
+    if not get_sqs_settings().dead_letter_queue_url:
+        _LOGGER.warning("No dead-letter queue configured, retrying permanent failure")
+        return False
 
-    except MissingNHSNumberError as ex:
+    try:
+        send_to_dead_letter_queue(queue_message, type(ex).__name__)
+    except (BotoCoreError, ClientError) as dead_letter_ex:
+        _LOGGER.exception(str(dead_letter_ex))
+        return False
+
+    return True
+
+
+def _process_message(raw_er7_message: str, stage_timer: StageTimer) -> str:
+    with stage_timer.stage("scan"):
+        er7_header = scan_er7_header(raw_er7_message)
+        if er7_header is not None:
+            hl7_error = check_header_is_supported(er7_header)
+            if hl7_error is not None:
+                # rejected without paying for a full hl7apy parse
+                return _create_ack_body_from_header(er7_header, hl7_error)
+
+    with stage_timer.stage("idempotency"):
+        idempotency_key = _idempotency_key(er7_header)
+        replayed_ack = _replayed_ack(idempotency_key)
+        if replayed_ack is not None:
+            return replayed_ack
+
+    try:
+        with stage_timer.stage("parse"):
+            er7_message = parse_er7_message(raw_er7_message)
+    except Exception as ex:
         _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.UNKNOWN_KEY_IDENTIFIER,
-                error_severity=HL7ErrorSeverity.ERROR,
-                error_message="NHS Number missing from message",
-            ),
+        ack = _create_ack_body_from_header(
+            er7_header or _UNREADABLE_HEADER, to_hl7_error(ex)
         )
-        return hl7v2_lambda_response_factory(body=body)
+        if isinstance(ex, _PERMANENT_ERRORS):
+            _remember_ack(idempotency_key, ack)
+        return ack
 
-    except MissingFieldError as ex:
+    try:
+        ack = _accept_message(raw_er7_message, er7_message, stage_timer)
+    except Exception as ex:
         _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.REQUIRED_FIELD_MISSING,
-                error_severity=HL7ErrorSeverity.ERROR,
-                error_message=str(ex),
-            ),
-        )
-        return hl7v2_lambda_response_factory(body=body)
+        ack = _create_ack_body(er7_message, to_hl7_error(ex))
+        if not isinstance(ex, _PERMANENT_ERRORS):
+            # not remembered, so the retransmission is processed again
+            return ack
 
-    except (ClientError, NoRegionError) as ex:
+    _remember_ack(idempotency_key, ack)
+    return ack
+
+
+def _accept_message(
+    raw_er7_message: str, er7_message: Message, stage_timer: StageTimer
+) -> str:
+    with stage_timer.stage("extract"):
+        er7_snapshot = ER7Extractor(er7_message=er7_message).extract()
+        hl7_error = check_message_is_supported(er7_snapshot)
+        if hl7_error is not None:
+            return _create_ack_body(er7_message, hl7_error)
+
+    if get_convert_hl7v2_fhir_settings().accept_then_process:
+        with stage_timer.stage("extract"):
+            _check_message_is_convertible(er7_snapshot)
+        with stage_timer.stage("send"):
+            _send_to_accepted_queue(raw_er7_message)
+        _LOGGER.info("Accepted message for processing")
+        return _create_ack_body(er7_message)
+
+    care_provider_lookup = _find_care_provider(er7_snapshot, stage_timer)
+    if care_provider_lookup is None:
+        return _create_ack_body(er7_message)
+
+    with stage_timer.stage("convert"):
+        fhir_bundle_json = ER7MessageController(
+            er7_snapshot=er7_snapshot
+        ).to_fhir_bundle_json()
+    with stage_timer.stage("send"):
+        _send_to_sqs(fhir_bundle_json, care_provider_lookup=care_provider_lookup)
+    _LOGGER.info("Successfully processed message")
+    return _create_ack_body(er7_message)
+
+
+@dataclass
+class _BatchMessage:
+    ack: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    raw_er7_message: Optional[str] = None
+    er7_message: Optional[Message] = None
+    er7_snapshot: Optional[ER7Snapshot] = None
+    care_provider_lookup: Optional["Future[Optional[CareProviderLookup]]"] = None
+
+
+def _process_batch(raw_er7_batch: str, stage_timer: StageTimer) -> str:
+    batch_header = scan_hl7_batch_header(raw_er7_batch)
+    settings = get_convert_hl7v2_fhir_settings()
+    batch_messages = []
+    with ThreadPoolExecutor(max_workers=settings.max_workers) as executor:
+        for raw_er7_message in iter_hl7_batch_messages(raw_er7_batch):
+            batch_message = _prepare_batch_message(raw_er7_message, stage_timer)
+            if batch_message.ack is None and not settings.accept_then_process:
+                # scrypt releases the GIL, so lookups overlap with parsing the rest
+                batch_message.care_provider_lookup = executor.submit(
+                    _find_care_provider, batch_message.er7_snapshot, stage_timer
+                )
+            batch_messages.append(batch_message)
+
+        _publish_batch(batch_messages, stage_timer)
+
+    _LOGGER.info("Processed HL7 batch", extra={"messages": len(batch_messages)})
+    return generate_batch_ack_message(
+        receiving_application=batch_header.sending_application,
+        receiving_facility=batch_header.sending_facility,
+        replying_to_batch_id=batch_header.batch_control_id,
+        ack_messages=[batch_message.ack for batch_message in batch_messages],
+        replying_to_file_id=batch_header.file_control_id,
+    )
+
+
+def _prepare_batch_message(
+    raw_er7_message: str, stage_timer: StageTimer
+) -> _BatchMessage:
+    with stage_timer.stage("scan"):
+        er7_header = scan_er7_header(raw_er7_message)
+        if er7_header is not None:
+            hl7_error = check_header_is_supported(er7_header)
+            if hl7_error is not None:
+                return _BatchMessage(
+                    ack=_create_ack_body_from_header(er7_header, hl7_error)
+                )
+
+    with stage_timer.stage("idempotency"):
+        idempotency_key = _idempotency_key(er7_header)
+        replayed_ack = _replayed_ack(idempotency_key)
+        if replayed_ack is not None:
+            return _BatchMessage(ack=replayed_ack)
+
+    try:
+        with stage_timer.stage("parse"):
+            er7_message = parse_er7_message(raw_er7_message)
+    except Exception as ex:
+        # one unreadable message must not fail the rest of the batch
         _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
-                error_severity=HL7ErrorSeverity.ERROR,
-                error_message="Issue reaching SQS service: " + str(ex),
-            ),
+        return _BatchMessage(
+            ack=_create_ack_body_from_header(
+                er7_header or _UNREADABLE_HEADER, to_hl7_error(ex)
+            )
         )
-        return hl7v2_lambda_response_factory(body=body)
 
+    try:
+        with stage_timer.stage("extract"):
+            er7_snapshot = ER7Extractor(er7_message=er7_message).extract()
+            hl7_error = check_message_is_supported(er7_snapshot)
+            if (
+                hl7_error is None
+                and get_convert_hl7v2_fhir_settings().accept_then_process
+            ):
+                _check_message_is_convertible(er7_snapshot)
     except Exception as ex:
         _LOGGER.exception(str(ex))
-        body = _create_ack_body(
-            er7_message,
-            HL7Error(
-                error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
-                error_severity=HL7ErrorSeverity.FATAL_ERROR,
-                error_message=str(ex),
-            ),
+        hl7_error = to_hl7_error(ex)
+
+    if hl7_error is not None:
+        return _BatchMessage(ack=_create_ack_body(er7_message, hl7_error))
+
+    return _BatchMessage(
+        idempotency_key=idempotency_key,
+        raw_er7_message=raw_er7_message,
+        er7_message=er7_message,
+        er7_snapshot=er7_snapshot,
+    )
+
+
+def _publish_batch(
+    batch_messages: List[_BatchMessage], stage_timer: StageTimer
+) -> None:
+    sqs_publisher = None
+    published = []
+    for index, batch_message in enumerate(batch_messages):
+        if batch_message.ack is not None:
+            continue
+
+        try:
+            if batch_message.care_provider_lookup is None:
+                # accept-then-process, converted by accepted_message_handler
+                get_queue_publisher = get_accepted_sqs_publisher
+                body, message_attributes = batch_message.raw_er7_message, {}
+            else:
+                care_provider_lookup = batch_message.care_provider_lookup.result()
+                if care_provider_lookup is None:
+                    batch_message.ack = _create_ack_body(batch_message.er7_message)
+                    _remember_ack(batch_message.idempotency_key, batch_message.ack)
+                    continue
+
+                get_queue_publisher = get_sqs_publisher
+                with stage_timer.stage("convert"):
+                    body = ER7MessageController(
+                        er7_snapshot=batch_message.er7_snapshot
+                    ).to_fhir_bundle_json()
+                message_attributes = _message_attributes(care_provider_lookup)
+
+            if sqs_publisher is None:
+                # the MLLP server handles batches on several threads, and a
+                #  flush must only send (and fail) this batch's messages
+                sqs_publisher = get_queue_publisher().with_own_buffer()
+            published.append(batch_message)
+            with stage_timer.stage("send"):
+                sqs_publisher.publish(
+                    body, message_attributes=message_attributes, correlation_id=index
+                )
+        except SQSPublisherException as ex:
+            _reject_unsent(batch_messages, ex)
+        except Exception as ex:
+            _LOGGER.exception(str(ex))
+            batch_message.ack = _create_ack_body(
+                batch_message.er7_message, to_hl7_error(ex)
+            )
+
+    if sqs_publisher is not None:
+        try:
+            with stage_timer.stage("send"):
+                sqs_publisher.flush()
+        except SQSPublisherException as ex:
+            _reject_unsent(batch_messages, ex)
+
+    for batch_message in published:
+        if batch_message.ack is None:
+            batch_message.ack = _create_ack_body(batch_message.er7_message)
+            _remember_ack(batch_message.idempotency_key, batch_message.ack)
+            _LOGGER.info("Successfully processed message")
+
+
+def _reject_unsent(batch_messages: List[_BatchMessage], ex: SQSPublisherException):
+    _LOGGER.exception(str(ex))
+    for index in ex.correlation_ids:
+        batch_messages[index].ack = _create_ack_body(
+            batch_messages[index].er7_message, to_hl7_error(ex)
+        )
+
+
+def _idempotency_key(er7_header: Optional[ER7Header]) -> Optional[str]:
+    # messages too unusual to scan are not deduplicated
+    if er7_header is None or get_idempotency_store() is None:
+        return None
+
+    return create_idempotency_key(
+        er7_header.sending_application,
+        er7_header.sending_facility,
+        er7_header.message_control_id,
+    )
+
+
+def _replayed_ack(idempotency_key: Optional[str]) -> Optional[str]:
+    if idempotency_key is None:
+        return None
+
+    idempotency_store = get_idempotency_store()
+    ack = idempotency_store.get_ack(idempotency_key)
+    if ack is not None:
+        _LOGGER.info(
+            "Replaying ACK of retransmitted message",
+            extra={
+                "idempotency_hits": idempotency_store.hits,
+                "idempotency_misses": idempotency_store.misses,
+            },
         )
-        return hl7v2_lambda_response_factory(body=body)
 
-    return hl7v2_lambda_response_factory(body=_create_ack_body(er7_message))
+    return ack
 
 
-def _send_to_sqs(body: str):
-    sqs = client("sqs")
-    sqs_settings = get_sqs_settings()
-    sqs.send_message(QueueUrl=sqs_settings.converted_queue_url, MessageBody=body)
+def _remember_ack(idempotency_key: Optional[str], ack: str) -> None:
+    if idempotency_key is not None:
+        get_idempotency_store().put_ack(idempotency_key, ack)
+
+
+def _ack_outcome(ack: str) -> Tuple[str, str]:
+    # MSA-1 acknowledgement code and ERR-3 error code, e.g. ("AR", "102")
+    fields = {
+        segment[:3]: segment.split("|") for segment in ack.split(SEGMENT_SEPARATOR)
+    }
+    msa, err = fields.get("MSA", []), fields.get("ERR", [])
+    return (
+        msa[1] if len(msa) > 1 else "unknown",
+        err[3] if len(err) > 3 else "none",
+    )
+
+
+def _message_attributes(
+    care_provider_lookup: Optional[CareProviderLookup],
+) -> Dict[str, Dict[str, Any]]:
+    # lets email_care_provider skip the pseudo ID and care provider lookup
+    if care_provider_lookup is None:
+        return {}
+
+    return care_provider_lookup_to_message_attributes(care_provider_lookup)
+
+
+def _send_to_sqs(body: str, care_provider_lookup: Optional[CareProviderLookup] = None):
+    # sent on its own rather than buffered, as the MLLP server handles
+    #  messages on several threads and each must only be acked once it is sent
+    get_sqs_publisher().send(
+        body, message_attributes=_message_attributes(care_provider_lookup)
+    )
+
+
+def _send_to_accepted_queue(raw_er7_message: str):
+    get_accepted_sqs_publisher().send(raw_er7_message)
 
 
 def _create_ack_body(
@@ -180,46 +591,51 @@ def _create_ack_body(
     )
 
 
-def _parse_message(body: str) -> Message:
-    # hl7 messages expect \r rather than \r\n (and the parsing library)
-    #  will reject otherwise (with a KeyError)
-    return parse_message(body.replace("\n", ""))
-
-
-def _is_message_of_admit_discharge_transfer_type(er7_message: Message) -> bool:
-    return ER7Extractor(er7_message=er7_message).message_type() == "ADT"
-
-
-def _is_message_of_admit_visit_event_code(er7_message: Message) -> bool:
-    return ER7Extractor(er7_message=er7_message).trigger_event() == "A01"
+def _create_ack_body_from_header(
+    er7_header: ER7Header, hl7_error: Optional[HL7Error] = None
+) -> str:
+    return generate_ack_message(
+        receiving_application=er7_header.sending_application,
+        receiving_facility=er7_header.sending_facility,
+        replying_to_msgid=er7_header.message_control_id,
+        hl7_error=hl7_error,
+    )
 
 
-def _is_message_of_inpatient_visit_class(er7_message: Message) -> bool:
-    return ER7Extractor(er7_message=er7_message).patient_class() == "I"
+def _check_message_is_convertible(er7_snapshot: ER7Snapshot) -> None:
+    """Raises what converting the message would for its fields, so accept-then-
+    process rejects a message it could never convert instead of accepting it."""
 
+    for field in _CONVERSION_FIELDS:
+        getattr(er7_snapshot, field)
 
-def _is_patient_added_to_hans(er7_message: Message) -> bool:
-    def _generate_pseudo_id(nhs_number: str, birth_date: date) -> str:
-        # https://nhsx.github.io/il-hans-infrastructure/adrs/003-Do-not-use-NEMS-or-MESH
-        return scrypt(
-            nhs_number.encode(),
-            salt=str(birth_date).encode(),
-            n=32768,
-            r=12,
-            p=6,
-            maxmem=2**26,
-        ).hex()
 
-    extractor = ER7Extractor(er7_message=er7_message)
+def _find_care_provider(
+    er7_snapshot: ER7Snapshot, stage_timer: StageTimer = NO_OP_STAGE_TIMER
+) -> Optional[CareProviderLookup]:
     management_interface_api_client = ManagementInterfaceApiClient()
-    care_recipient_pseudo_id = _generate_pseudo_id(
-        extractor.nhs_number(), extractor.date_of_birth()
+    pseudo_id_cache = get_pseudo_id_cache()
+    with stage_timer.stage("pseudo_id"):
+        care_recipient_pseudo_id = pseudo_id_cache.get_pseudo_id(
+            er7_snapshot.nhs_number, er7_snapshot.date_of_birth
+        )
+    _LOGGER.info(
+        "Pseudo ID cache usage",
+        extra={"hits": pseudo_id_cache.hits, "misses": pseudo_id_cache.misses},
     )
     try:
-        management_interface_api_client.get_care_provider(
-            care_recipient_pseudo_id=care_recipient_pseudo_id
-        )
+        with stage_timer.stage("care_provider_lookup"):
+            care_provider = management_interface_api_client.get_care_provider(
+                care_recipient_pseudo_id=care_recipient_pseudo_id
+            )
+    except ManagementInterfaceCircuitOpen:
+        # rejected rather than accepted without a care provider, to be resent
+        raise
     except ManagementInterfaceApiClientException:
-        return False
+        return None
 
-    return True
+    return CareProviderLookup(
+        care_recipient_pseudo_id=care_recipient_pseudo_id,
+        care_provider=care_provider,
+        retrieved_at=datetime.now(timezone.utc),
+    )
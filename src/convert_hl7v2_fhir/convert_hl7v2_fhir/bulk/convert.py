@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import Enum
+from itertools import islice
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from aws_lambda_powertools import Logger
+
+from convert_hl7v2_fhir.bulk.exceptions import (
+    CheckpointMismatchError,
+    UnresumableInputError,
+)
+from convert_hl7v2_fhir.bulk.reader import STDIN, SourceMessage, iter_er7_messages
+from convert_hl7v2_fhir.bulk.settings import get_bulk_conversion_settings
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_message_controller import (
+    ER7MessageController,
+)
+from convert_hl7v2_fhir.controllers.er7.er7_parser import parse_er7_message
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import scan_er7_header
+from convert_hl7v2_fhir.controllers.hl7.hl7_errors import (
+    check_header_is_supported,
+    check_message_is_supported,
+    to_hl7_error,
+)
+
+_LOGGER = Logger()
+
+
+class ConversionOutcome(str, Enum):
+    CONVERTED = "converted"
+    # filtered out as the lambda would, e.g. not an inpatient admission
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class ConversionResult(NamedTuple):
+    source: str
+    index: int
+    outcome: ConversionOutcome
+    # the FHIR bundle, or why the message was skipped or failed
+    bundle_json: Optional[str] = None
+    message_control_id: Optional[str] = None
+    error_code: Optional[int] = None
+    error_message: Optional[str] = None
+
+    def to_report_json(self) -> str:
+        return json.dumps(
+            {
+                "source": self.source,
+                "index": self.index,
+                "outcome": self.outcome.value,
+                "message_control_id": self.message_control_id,
+                "error_code": self.error_code,
+                "error_message": self.error_message,
+            }
+        )
+
+
+class Checkpoint(NamedTuple):
+    inputs: List[str]
+    # messages read, and the output file sizes once their results were written
+    messages: int = 0
+    bundles_bytes: int = 0
+    report_bytes: int = 0
+    converted: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        return cls(**json.loads(path.read_text()))
+
+    def save(self, path: Path) -> None:
+        # replaced in one go, so a crash leaves either the old or new one
+        temporary_path = path.with_name(path.name + ".tmp")
+        temporary_path.write_text(json.dumps(self._asdict()))
+        os.replace(temporary_path, path)
+
+
+def convert_er7_message(message: SourceMessage) -> ConversionResult:
+    """Applies the lambda's filtering and conversion to one message, without
+    the pseudo ID, care provider lookup or SQS."""
+
+    er7_header = scan_er7_header(message.raw_er7_message)
+    message_control_id = er7_header.message_control_id if er7_header else None
+    try:
+        hl7_error = None
+        if er7_header is not None:
+            hl7_error = check_header_is_supported(er7_header)
+        if hl7_error is None:
+            er7_message = parse_er7_message(message.raw_er7_message)
+            message_control_id = er7_message.msh.message_control_id.value
+            er7_snapshot = ER7Extractor(er7_message=er7_message).extract()
+            hl7_error = check_message_is_supported(er7_snapshot)
+        if hl7_error is None:
+            return ConversionResult(
+                source=message.source,
+                index=message.index,
+                outcome=ConversionOutcome.CONVERTED,
+                bundle_json=ER7MessageController(
+                    er7_snapshot=er7_snapshot
+                ).to_fhir_bundle_json(),
+                message_control_id=message_control_id,
+            )
+
+        outcome = ConversionOutcome.SKIPPED
+    except Exception as ex:
+        hl7_error = to_hl7_error(ex)
+        outcome = ConversionOutcome.FAILED
+
+    return ConversionResult(
+        source=message.source,
+        index=message.index,
+        outcome=outcome,
+        message_control_id=message_control_id,
+        error_code=hl7_error.error_code.value,
+        error_message=hl7_error.error_message,
+    )
+
+
+def convert_er7_messages(messages: List[SourceMessage]) -> List[ConversionResult]:
+    return [convert_er7_message(message) for message in messages]
+
+
+def _chunked(
+    messages: Iterable[SourceMessage], chunk_size: int
+) -> Iterator[List[SourceMessage]]:
+    messages = iter(messages)
+    while True:
+        chunk = list(islice(messages, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkConverter:
+    """Converts ER7 messages to FHIR bundles on a pool of processes, writing
+    a bundle a line to `bundles_path` and a line for each failed (and, with
+    `report_skipped`, skipped) message to `report_path`.
+
+    Results are written in input order. Reading stops while `chunks_per_worker`
+    chunks per worker are waiting, so memory use does not grow with the
+    input. A checkpoint is saved after every chunk is written, and `resume`
+    carries on from it, truncating anything written after it. A conversion
+    read from stdin cannot be resumed."""
+
+    def __init__(
+        self,
+        inputs: List[str],
+        bundles_path: Path,
+        report_path: Path,
+        checkpoint_path: Path,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 200,
+        chunks_per_worker: int = 2,
+        encoding: str = "utf-8",
+        report_skipped: bool = False,
+        progress_interval_seconds: float = 10.0,
+    ):
+        self.inputs = inputs
+        self.bundles_path = bundles_path
+        self.report_path = report_path
+        self.checkpoint_path = checkpoint_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.chunks_per_worker = chunks_per_worker
+        self.encoding = encoding
+        self.report_skipped = report_skipped
+        self.progress_interval_seconds = progress_interval_seconds
+
+    def run(self, resume: bool = False) -> Checkpoint:
+        checkpoint = self._starting_checkpoint(resume)
+        messages = islice(
+            iter_er7_messages(self.inputs, self.encoding), checkpoint.messages, None
+        )
+        started_at = last_progress_at = time.monotonic()
+        resumed_from = checkpoint.messages
+        with open(self.bundles_path, "ab") as bundles, open(
+            self.report_path, "ab"
+        ) as report, ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for output, size in (
+                (bundles, checkpoint.bundles_bytes),
+                (report, checkpoint.report_bytes),
+            ):
+                output.truncate(size)
+                output.seek(size)
+            in_flight: Deque["Future[List[ConversionResult]]"] = deque()
+            chunks = _chunked(messages, self.chunk_size)
+            while True:
+                for chunk in chunks:
+                    in_flight.append(executor.submit(convert_er7_messages, chunk))
+                    if len(in_flight) >= self.max_workers * self.chunks_per_worker:
+                        break
+                if not in_flight:
+                    break
+
+                checkpoint = self._write(
+                    in_flight.popleft().result(), checkpoint, bundles, report
+                )
+                checkpoint.save(self.checkpoint_path)
+                if (
+                    time.monotonic() - last_progress_at
+                    >= self.progress_interval_seconds
+                ):
+                    last_progress_at = time.monotonic()
+                    self._log_progress(checkpoint, resumed_from, started_at)
+
+        self._log_progress(checkpoint, resumed_from, started_at)
+        return checkpoint
+
+    def _starting_checkpoint(self, resume: bool) -> Checkpoint:
+        # what stdin gave the last run cannot be read again to skip past
+        if resume and STDIN in self.inputs:
+            raise UnresumableInputError("Cannot resume a conversion read from stdin")
+
+        if not resume or not self.checkpoint_path.exists():
+            return Checkpoint(inputs=self.inputs)
+
+        checkpoint = Checkpoint.load(self.checkpoint_path)
+        if checkpoint.inputs != self.inputs:
+            raise CheckpointMismatchError(
+                f"Checkpoint is for inputs {checkpoint.inputs}, not {self.inputs}"
+            )
+        _LOGGER.info("Resuming bulk conversion", extra=checkpoint._asdict())
+        return checkpoint
+
+    def _write(
+        self, results: List[ConversionResult], checkpoint: Checkpoint, bundles, report
+    ) -> Checkpoint:
+        counts = {outcome: 0 for outcome in ConversionOutcome}
+        for result in results:
+            counts[result.outcome] += 1
+            if result.outcome == ConversionOutcome.CONVERTED:
+                bundles.write(result.bundle_json.encode() + b"\n")
+            elif result.outcome == ConversionOutcome.FAILED or self.report_skipped:
+                report.write(result.to_report_json().encode() + b"\n")
+
+        # the checkpoint must not get ahead of what is on disk
+        for output in (bundles, report):
+            output.flush()
+            os.fsync(output.fileno())
+        return checkpoint._replace(
+            messages=checkpoint.messages + len(results),
+            bundles_bytes=bundles.tell(),
+            report_bytes=report.tell(),
+            converted=checkpoint.converted + counts[ConversionOutcome.CONVERTED],
+            skipped=checkpoint.skipped + counts[ConversionOutcome.SKIPPED],
+            failed=checkpoint.failed + counts[ConversionOutcome.FAILED],
+        )
+
+    @staticmethod
+    def _log_progress(
+        checkpoint: Checkpoint, resumed_from: int, started_at: float
+    ) -> None:
+        elapsed_seconds = time.monotonic() - started_at
+        progress: Dict[str, Any] = checkpoint._asdict()
+        del progress["inputs"]
+        progress["messages_per_second"] = (
+            round((checkpoint.messages - resumed_from) / elapsed_seconds, 1)
+            if elapsed_seconds
+            else 0.0
+        )
+        _LOGGER.info("Bulk conversion progress", extra=progress)
+
+
+def main() -> None:
+    settings = get_bulk_conversion_settings()
+    parser = argparse.ArgumentParser(
+        description="Converts ER7 messages from files, directories or stdin (-) "
+        "to FHIR bundles, one a line, as the lambda would."
+    )
+    parser.add_argument("inputs", nargs="+", help="files, directories or -")
+    parser.add_argument("--output", type=Path, required=True, help="NDJSON bundles")
+    parser.add_argument(
+        "--report", type=Path, help="NDJSON of failed messages, <output>.report"
+    )
+    parser.add_argument(
+        "--checkpoint", type=Path, help="checkpoint file, <output>.checkpoint"
+    )
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--report-skipped", action="store_true")
+    parser.add_argument("--max-workers", type=int, default=settings.max_workers)
+    parser.add_argument("--chunk-size", type=int, default=settings.chunk_size)
+    args = parser.parse_args()
+
+    BulkConverter(
+        inputs=args.inputs,
+        bundles_path=args.output,
+        report_path=args.report or Path(f"{args.output}.report"),
+        checkpoint_path=args.checkpoint or Path(f"{args.output}.checkpoint"),
+        max_workers=args.max_workers,
+        chunk_size=args.chunk_size,
+        chunks_per_worker=settings.chunks_per_worker,
+        encoding=settings.encoding,
+        report_skipped=args.report_skipped,
+        progress_interval_seconds=settings.progress_interval_seconds,
+    ).run(resume=args.resume)
+
+
+if __name__ == "__main__":
+    main()
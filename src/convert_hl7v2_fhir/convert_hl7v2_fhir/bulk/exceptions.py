@@ -0,0 +1,10 @@
+class BulkConversionException(Exception):
+    pass
+
+
+class CheckpointMismatchError(BulkConversionException):
+    pass
+
+
+class UnresumableInputError(BulkConversionException):
+    pass
@@ -0,0 +1,77 @@
+import io
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Sequence, TextIO
+
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import SEGMENT_SEPARATOR
+
+STDIN = "-"
+
+# MLLP start and end block characters, left over when a capture is read as
+#  text
+_MLLP_CHARACTERS = "\x0b\x1c"
+_ENVELOPE_SEGMENTS = ("FHS", "BHS", "BTS", "FTS")
+
+
+class SourceMessage(NamedTuple):
+    source: str
+    # position of the message within its source
+    index: int
+    raw_er7_message: str
+
+
+def iter_sources(paths: Sequence[str]) -> Iterator[str]:
+    """Expands directories into the files under them, in name order."""
+
+    for path in paths:
+        if path != STDIN and Path(path).is_dir():
+            yield from (
+                str(file) for file in sorted(Path(path).rglob("*")) if file.is_file()
+            )
+        else:
+            yield path
+
+
+def iter_er7_messages(
+    paths: Sequence[str], encoding: str = "utf-8"
+) -> Iterator[SourceMessage]:
+    """Streams the messages of every file (or stdin for "-"), holding one
+    message in memory at a time."""
+
+    for source in iter_sources(paths):
+        with _open(source, encoding) as stream:
+            for index, raw_er7_message in enumerate(split_er7_messages(stream)):
+                yield SourceMessage(source, index, raw_er7_message)
+
+
+def split_er7_messages(lines: Iterable[str]) -> Iterator[str]:
+    """Groups lines into messages, each starting at an MSH segment.
+
+    Segments may end in "\\r", "\\n" or "\\r\\n" (so one message a line, one
+    segment a line, MLLP captures and FHS/BHS batch files are all read).
+    MLLP framing characters and batch envelope segments are dropped."""
+
+    message = []
+    for line in lines:
+        for segment in line.split(SEGMENT_SEPARATOR):
+            segment = segment.strip(_MLLP_CHARACTERS + "\r\n")
+            if not segment.strip():
+                continue
+
+            if segment.startswith(("MSH",) + _ENVELOPE_SEGMENTS):
+                if message:
+                    yield SEGMENT_SEPARATOR.join(message)
+                message = [segment] if segment.startswith("MSH") else []
+            elif message:
+                message.append(segment)
+
+    if message:
+        yield SEGMENT_SEPARATOR.join(message)
+
+
+def _open(source: str, encoding: str) -> TextIO:
+    # universal newlines, so lines end at any of "\r", "\n" or "\r\n"
+    if source == STDIN:
+        return io.TextIOWrapper(sys.stdin.buffer, encoding=encoding, newline=None)
+
+    return open(source, encoding=encoding, newline=None)
@@ -0,0 +1,23 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class BulkConversionSettings(BaseSettings):
+    # worker processes, one per CPU when not set
+    max_workers: Optional[int] = None
+    # messages sent to a worker at once, and between checkpoints
+    chunk_size: int = 200
+    # chunks queued or in progress per worker, bounds memory use
+    chunks_per_worker: int = 2
+    encoding: str = "utf-8"
+    progress_interval_seconds: float = 10.0
+
+    class Config:
+        env_prefix = "BULK_CONVERSION_"
+
+
+@lru_cache(maxsize=1)
+def get_bulk_conversion_settings() -> BulkConversionSettings:
+    return BulkConversionSettings()
@@ -1,8 +1,9 @@
 from datetime import datetime, timezone, date
-from typing import List
+from typing import List, Optional, Union
 import hl7apy
 from hl7apy.core import Message
 
+from convert_hl7v2_fhir.controllers.er7.er7_snapshot import ER7Snapshot
 from convert_hl7v2_fhir.controllers.er7.exceptions import (
     MissingNHSNumberError,
     InvalidNHSNumberError,
@@ -21,6 +22,31 @@ from convert_hl7v2_fhir.controllers.utils import is_nhs_number_valid
 class ER7Extractor:
     def __init__(self, er7_message: Message):
         self.er7_message = er7_message
+        self._pv1_validation: Optional[Union[bool, Exception]] = None
+
+    def extract(self) -> ER7Snapshot:
+        """Reads every field in `ER7Snapshot.FIELDS` once, validating PV1 at
+        most once. Failures are kept in the snapshot rather than raised."""
+
+        fields = {}
+        for field in ER7Snapshot.FIELDS:
+            try:
+                fields[field] = getattr(self, field)()
+            except Exception as ex:
+                fields[field] = ER7Snapshot.failed(ex)
+
+        return ER7Snapshot(**fields)
+
+    def _validate_pv1(self) -> None:
+        if self._pv1_validation is None:
+            try:
+                self.er7_message.pv1.validate()
+                self._pv1_validation = True
+            except Exception as ex:
+                self._pv1_validation = ex
+
+        if isinstance(self._pv1_validation, Exception):
+            raise self._pv1_validation
 
     def nhs_number(self) -> str:
         """There are two potential fields where NHS number can be:
@@ -84,7 +110,7 @@ class ER7Extractor:
         return self.er7_message.evn.event_type_code.value
 
     def patient_location(self) -> str:
-        self.er7_message.pv1.validate()
+        self._validate_pv1()
         _poc = self.er7_message.pv1.assigned_patient_location.point_of_care_id.value
         if not _poc:
             raise MissingPointOfCareError(
@@ -100,7 +126,7 @@ class ER7Extractor:
         return f"{_poc}, {_facility}"
 
     def patient_class(self) -> str:
-        self.er7_message.pv1.validate()
+        self._validate_pv1()
         _patient_class = self.er7_message.pv1.patient_class.value
         if not _patient_class:
             raise MissingPatientClassError
@@ -108,7 +134,7 @@ class ER7Extractor:
         return self.er7_message.pv1.patient_class.value
 
     def admission_type(self) -> str:
-        self.er7_message.pv1.validate()
+        self._validate_pv1()
         _admission_type = self.er7_message.pv1.admission_type.value
         if not _admission_type:
             raise MissingAdmissionTypeError
@@ -116,7 +142,7 @@ class ER7Extractor:
         return self.er7_message.pv1.admission_type.value
 
     def time_of_admission(self) -> datetime:
-        self.er7_message.pv1.validate()
+        self._validate_pv1()
         _toa = self.er7_message.pv1.admit_date_time.value
         if not _toa:
             raise MissingTimeOfAdmissionError(
@@ -1,9 +1,20 @@
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from uuid import uuid4, UUID
 
 from fhir.resources.bundle import Bundle
+from fhir.resources.fhirtypes import Code, Date, DateTime, String
+from pydantic import parse_obj_as
 
 from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_snapshot import ER7Snapshot
+from convert_hl7v2_fhir.controllers.er7.fhir_bundle_template import (
+    DATE_PLACEHOLDER,
+    DATETIME_PLACEHOLDER,
+    FHIRBundleTemplate,
+    placeholder,
+)
+from convert_hl7v2_fhir.controllers.er7.settings import get_fhir_bundle_settings
 from convert_hl7v2_fhir.controllers.hl7.hl7_conversions import (
     to_fhir_admission_method,
     to_fhir_encounter_class,
@@ -13,15 +24,18 @@ from convert_hl7v2_fhir.controllers.hl7.hl7_conversions import (
 class ER7MessageController:
     def __init__(
         self,
-        er7_extractor: ER7Extractor,
+        er7_extractor: Optional[ER7Extractor] = None,
         message_header_uuid: Optional[UUID] = None,
         organization_uuid: Optional[UUID] = None,
         encounter_uuid: Optional[UUID] = None,
         patient_uuid: Optional[UUID] = None,
         location_uuid: Optional[UUID] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        er7_snapshot: Optional[ER7Snapshot] = None,
     ):
-        self.extractor = er7_extractor
+        if er7_snapshot is None:
+            er7_snapshot = er7_extractor.extract()
+        self.snapshot = er7_snapshot
         self.message_header_uuid = message_header_uuid or uuid4()
         self.organization_uuid = organization_uuid or uuid4()
         self.encounter_uuid = encounter_uuid or uuid4()
@@ -60,6 +74,42 @@ class ER7MessageController:
         }
         return Bundle(**bundle_json)
 
+    def to_fhir_bundle_json(self) -> str:
+        """Same JSON as `to_fhir_bundle().json()`, but filled into a template
+        rather than building and validating the fhir.resources models. Only
+        the per-message values are validated, against their FHIR types."""
+
+        if get_fhir_bundle_settings().validate_bundle:
+            return self.to_fhir_bundle().json()
+
+        # read in the same order as to_fhir_bundle so the same error surfaces
+        values = {
+            "eventTypeCode": parse_obj_as(Code, self.snapshot.event_type_code),
+            "nhsNumber": parse_obj_as(String, self.snapshot.nhs_number),
+            "familyName": parse_obj_as(String, self.snapshot.family_name),
+            "dateOfBirth": parse_obj_as(Date, self.snapshot.date_of_birth),
+            "patientLocation": parse_obj_as(String, self.snapshot.patient_location),
+            "timeOfAdmission": parse_obj_as(DateTime, self.snapshot.time_of_admission),
+            "messageHeaderUuid": str(self.message_header_uuid),
+            "organizationUuid": str(self.organization_uuid),
+            "encounterUuid": str(self.encounter_uuid),
+            "patientUuid": str(self.patient_uuid),
+            "locationUuid": str(self.location_uuid),
+        }
+        list_values = {
+            "givenName": parse_obj_as(List[String], self.snapshot.given_name),
+            "patientLocation": parse_obj_as(
+                List[String], _address_lines(self.snapshot.patient_location)
+            ),
+        }
+        for name, value in _metadata_values(self.metadata).items():
+            values[name] = parse_obj_as(String, value)
+
+        template = _fhir_bundle_template(
+            self.snapshot.patient_class, self.snapshot.admission_type
+        )
+        return template.render(values, list_values)
+
     def _create_header(self) -> Dict[str, Any]:
         return {
             "fullUrl": f"urn:uuid:{self.message_header_uuid}",
@@ -73,7 +123,7 @@ class ER7MessageController:
                 },
                 "eventCoding": {
                     "system": "http://terminology.hl7.org/CodeSystem/v2-0003",
-                    "code": self.extractor.event_type_code(),
+                    "code": self.snapshot.event_type_code,
                 },
                 "source": {"endpoint": "http://example.com/fhir/R4"},
                 "responsible": {"reference": f"urn:uuid:{self.organization_uuid}"},
@@ -95,7 +145,7 @@ class ER7MessageController:
                 "identifier": [
                     {
                         "system": "https://fhir.nhs.uk/Id/nhs-number",
-                        "value": self.extractor.nhs_number(),
+                        "value": self.snapshot.nhs_number,
                         "extension": [
                             {
                                 "url": "https://fhir.hl7.org.uk/StructureDefinition/Extension-UKCore-NHSNumberVerificationStatus",
@@ -115,11 +165,11 @@ class ER7MessageController:
                 "name": [
                     {
                         "use": "usual",
-                        "family": self.extractor.family_name(),
-                        "given": self.extractor.given_name(),
+                        "family": self.snapshot.family_name,
+                        "given": self.snapshot.given_name,
                     }
                 ],
-                "birthDate": self.extractor.date_of_birth(),
+                "birthDate": self.snapshot.date_of_birth,
             },
         }
 
@@ -141,11 +191,9 @@ class ER7MessageController:
                     }
                 ],
                 "status": "active",
-                "name": self.extractor.patient_location(),
+                "name": self.snapshot.patient_location,
                 "address": {
-                    "line": [
-                        l.strip() for l in self.extractor.patient_location().split(",")
-                    ],
+                    "line": _address_lines(self.snapshot.patient_location),
                     "city": self.metadata["location"]["address"]["city"],
                     "postalCode": self.metadata["location"]["address"]["postalCode"],
                 },
@@ -174,10 +222,8 @@ class ER7MessageController:
         }
 
     def _create_encounter(self):
-        resource_class = to_fhir_encounter_class(self.extractor.patient_class())
-        admission_method_coding = to_fhir_admission_method(
-            self.extractor.admission_type()
-        )
+        resource_class = to_fhir_encounter_class(self.snapshot.patient_class)
+        admission_method_coding = to_fhir_admission_method(self.snapshot.admission_type)
         return {
             "fullUrl": f"urn:uuid:{self.encounter_uuid}",
             "resource": {
@@ -191,7 +237,7 @@ class ER7MessageController:
                 "status": "in-progress",
                 "subject": {"reference": f"urn:uuid:{self.patient_uuid}"},
                 "class": resource_class,
-                "period": {"start": self.extractor.time_of_admission()},
+                "period": {"start": self.snapshot.time_of_admission},
                 "location": [
                     {
                         "status": "active",
@@ -206,3 +252,67 @@ class ER7MessageController:
                 ],
             },
         }
+
+
+def _address_lines(patient_location: str) -> List[str]:
+    return [line.strip() for line in patient_location.split(",")]
+
+
+def _metadata_values(metadata: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "organizationIdentifier": metadata["organization"]["identifier"]["value"],
+        "organizationName": metadata["organization"]["name"],
+        "locationIdentifier": metadata["location"]["identifier"]["value"],
+        "locationCity": metadata["location"]["address"]["city"],
+        "locationPostalCode": metadata["location"]["address"]["postalCode"],
+    }
+
+
+@lru_cache(maxsize=None)
+def _fhir_bundle_template(
+    patient_class: str, admission_type: str
+) -> FHIRBundleTemplate:
+    # the encounter class and admission method codings are whole objects, so
+    #  there is one template per combination rather than a slot for them
+    placeholder_snapshot = ER7Snapshot(
+        message_type="ADT",
+        trigger_event="A01",
+        event_type_code=placeholder("eventTypeCode"),
+        nhs_number=placeholder("nhsNumber"),
+        family_name=placeholder("familyName"),
+        given_name=[placeholder("givenName")],
+        date_of_birth=DATE_PLACEHOLDER,
+        patient_location=placeholder("patientLocation"),
+        patient_class=patient_class,
+        admission_type=admission_type,
+        time_of_admission=DATETIME_PLACEHOLDER,
+    )
+    placeholder_metadata = {
+        "organization": {
+            "identifier": {"value": placeholder("organizationIdentifier")},
+            "name": placeholder("organizationName"),
+        },
+        "location": {
+            "identifier": {"value": placeholder("locationIdentifier")},
+            "address": {
+                "postalCode": placeholder("locationPostalCode"),
+                "city": placeholder("locationCity"),
+            },
+        },
+    }
+    controller = ER7MessageController(
+        er7_snapshot=placeholder_snapshot,
+        message_header_uuid=placeholder("messageHeaderUuid"),
+        organization_uuid=placeholder("organizationUuid"),
+        encounter_uuid=placeholder("encounterUuid"),
+        patient_uuid=placeholder("patientUuid"),
+        location_uuid=placeholder("locationUuid"),
+        metadata=placeholder_metadata,
+    )
+    return FHIRBundleTemplate(
+        controller.to_fhir_bundle().json(),
+        value_placeholders={
+            "dateOfBirth": DATE_PLACEHOLDER,
+            "timeOfAdmission": DATETIME_PLACEHOLDER,
+        },
+    )
@@ -0,0 +1,37 @@
+from hl7apy.core import Message
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import SEGMENT_SEPARATOR
+from convert_hl7v2_fhir.controllers.er7.settings import get_er7_parser_settings
+
+# the only segments read by ER7Extractor
+EXTRACTED_SEGMENTS = frozenset(("MSH", "EVN", "PID", "PV1"))
+
+
+def parse_er7_message(raw_er7_message: str) -> Message:
+    settings = get_er7_parser_settings()
+    if not settings.selective_parsing:
+        return parse_message(raw_er7_message, find_groups=settings.find_groups)
+
+    return parse_er7_message_selectively(
+        raw_er7_message, find_groups=settings.find_groups
+    )
+
+
+def parse_er7_message_selectively(
+    raw_er7_message: str,
+    segment_names: frozenset = EXTRACTED_SEGMENTS,
+    find_groups: bool = True,
+) -> Message:
+    """Parses only the segments in `segment_names`, skipping the rest, so the
+    cost of parsing stays the same however many NK1, OBX, AL1 or Z segments
+    a feed sends."""
+
+    return parse_message(
+        SEGMENT_SEPARATOR.join(
+            segment
+            for segment in raw_er7_message.lstrip().split(SEGMENT_SEPARATOR)
+            if segment[:3] in segment_names
+        ),
+        find_groups=find_groups,
+    )
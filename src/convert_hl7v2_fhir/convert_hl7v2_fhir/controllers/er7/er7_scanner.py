@@ -0,0 +1,107 @@
+from typing import List, NamedTuple, Optional
+
+SEGMENT_SEPARATOR = "\r"
+
+
+class ER7Header(NamedTuple):
+    sending_application: str
+    sending_facility: str
+    message_control_id: str
+    message_type: str
+    trigger_event: str
+    patient_class: Optional[str]
+
+
+def normalise_er7_message(body: str) -> str:
+    # hl7 messages expect \r rather than \r\n (and the parsing library)
+    #  will reject otherwise (with a KeyError)
+    return body.replace("\n", "")
+
+
+def scan_er7_header(er7_message: str) -> Optional[ER7Header]:
+    """Reads the MSH fields needed for routing and acknowledgement, and the
+    PV1 patient class, by splitting on the separators declared in MSH.
+
+    This avoids building an hl7apy tree for messages that are going to be
+    rejected anyway. `None` is returned whenever the message is not plain
+    enough to be read this way, and the caller should fall back to a full
+    parse. `patient_class` is `None` unless there is exactly one PV1 segment
+    with a plain, non-empty PV1-2."""
+
+    segments = er7_message.split(SEGMENT_SEPARATOR)
+    msh = segments[0]
+    if not msh.startswith("MSH") or len(msh) < 8:
+        return None
+
+    field_separator = msh[3]
+    encoding_characters = msh[4:8]
+    if field_separator.isalnum() or field_separator in encoding_characters:
+        return None
+
+    component_separator, repetition_separator, escape_character, _ = encoding_characters
+    # MSH-1 is the field separator itself, so MSH-n is at index n - 1
+    msh_fields = msh.split(field_separator)
+    if len(msh_fields) < 12 or not msh_fields[11]:
+        # hl7apy needs MSH-12 (version ID) to parse the message at all
+        return None
+
+    message_type_field = msh_fields[8]
+    if _is_escaped_or_repeated(
+        message_type_field, repetition_separator, escape_character
+    ):
+        return None
+
+    message_type_components = message_type_field.split(component_separator)
+    return ER7Header(
+        sending_application=msh_fields[2],
+        sending_facility=msh_fields[3],
+        message_control_id=msh_fields[9],
+        message_type=message_type_components[0],
+        trigger_event=_component(message_type_components, 1),
+        patient_class=_scan_patient_class(
+            segments[1:],
+            field_separator=field_separator,
+            component_separator=component_separator,
+            repetition_separator=repetition_separator,
+            escape_character=escape_character,
+        ),
+    )
+
+
+def _scan_patient_class(
+    segments: List[str],
+    field_separator: str,
+    component_separator: str,
+    repetition_separator: str,
+    escape_character: str,
+) -> Optional[str]:
+    pv1_segments = [
+        segment
+        for segment in segments
+        if segment.startswith("PV1") and segment[3:4] == field_separator
+    ]
+    if len(pv1_segments) != 1:
+        return None
+
+    pv1_fields = pv1_segments[0].split(field_separator)
+    if len(pv1_fields) < 3:
+        return None
+
+    patient_class = pv1_fields[2]
+    if not patient_class or component_separator in patient_class:
+        return None
+
+    if _is_escaped_or_repeated(patient_class, repetition_separator, escape_character):
+        return None
+
+    return patient_class
+
+
+def _is_escaped_or_repeated(
+    value: str, repetition_separator: str, escape_character: str
+) -> bool:
+    return repetition_separator in value or escape_character in value
+
+
+def _component(components: List[str], index: int) -> str:
+    return components[index] if len(components) > index else ""
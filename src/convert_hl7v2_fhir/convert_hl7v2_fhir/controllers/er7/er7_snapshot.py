@@ -0,0 +1,70 @@
+from datetime import date, datetime
+from typing import Any, List
+
+
+class _ExtractionFailure:
+    __slots__ = ("exception",)
+
+    def __init__(self, exception: Exception):
+        self.exception = exception
+
+
+def _snapshot_field(slot: str) -> property:
+    def getter(self: "ER7Snapshot") -> Any:
+        value = object.__getattribute__(self, slot)
+        if isinstance(value, _ExtractionFailure):
+            raise value.exception
+        return value
+
+    return property(getter)
+
+
+class ER7Snapshot:
+    """Immutable record of every field the pipeline reads from a message,
+    produced in one pass by `ER7Extractor.extract`.
+
+    A field that could not be extracted holds the exception instead, which
+    is raised when (and only when) that field is read. Errors therefore
+    surface in the same order, and get the same ACK, as when the fields
+    were read straight from the extractor."""
+
+    FIELDS = (
+        "message_type",
+        "trigger_event",
+        "event_type_code",
+        "nhs_number",
+        "family_name",
+        "given_name",
+        "date_of_birth",
+        "patient_location",
+        "patient_class",
+        "admission_type",
+        "time_of_admission",
+    )
+    __slots__ = tuple(f"_{field}" for field in FIELDS)
+
+    message_type: str = _snapshot_field("_message_type")
+    trigger_event: str = _snapshot_field("_trigger_event")
+    event_type_code: str = _snapshot_field("_event_type_code")
+    nhs_number: str = _snapshot_field("_nhs_number")
+    family_name: str = _snapshot_field("_family_name")
+    given_name: List[str] = _snapshot_field("_given_name")
+    date_of_birth: date = _snapshot_field("_date_of_birth")
+    patient_location: str = _snapshot_field("_patient_location")
+    patient_class: str = _snapshot_field("_patient_class")
+    admission_type: str = _snapshot_field("_admission_type")
+    time_of_admission: datetime = _snapshot_field("_time_of_admission")
+
+    def __init__(self, **fields: Any):
+        for field in self.FIELDS:
+            object.__setattr__(self, f"_{field}", fields[field])
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def failed(cls, exception: Exception) -> _ExtractionFailure:
+        return _ExtractionFailure(exception)
@@ -0,0 +1,83 @@
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from fhir.resources.bundle import Bundle
+
+# serialise exactly as `Bundle.json()` would, whichever JSON library
+#  fhir.resources picked up
+_JSON_DUMPS = Bundle.__config__.json_dumps
+_JSON_ENCODER = Bundle.__json_encoder__
+
+# sentinels for values that are serialised as a whole JSON token, they must
+#  pass FHIR validation so cannot be placeholder strings
+DATE_PLACEHOLDER = date(1, 2, 3)
+DATETIME_PLACEHOLDER = datetime(1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+
+_STRING = "string"
+_LIST = "list"
+_VALUE = "value"
+
+
+def placeholder(name: str) -> str:
+    # only letters, digits and dashes so it is also a valid FHIR id
+    return f"--{name}--"
+
+
+def encode_json(value: Any) -> str:
+    return _JSON_DUMPS(value, default=_JSON_ENCODER)
+
+
+class FHIRBundleTemplate:
+    """A serialised FHIR bundle split into its static parts and the slots the
+    per-message values go in.
+
+    The skeleton is produced by the validated path with `placeholder` strings
+    (and `value_placeholders` sentinels) in place of the per-message values,
+    so key order, profiles, extensions and codings are exactly those of
+    `Bundle.json()`. Rendering only JSON encodes the values and joins."""
+
+    def __init__(self, skeleton_json: str, value_placeholders: Dict[str, Any]):
+        value_tokens = {
+            encode_json(value): name for name, value in value_placeholders.items()
+        }
+        pattern = re.compile(
+            "|".join(
+                (
+                    r'\["--(?P<list>[A-Za-z]+)--"\]',
+                    *(
+                        f"(?P<value{i}>{re.escape(t)})"
+                        for i, t in enumerate(value_tokens)
+                    ),
+                    r"--(?P<string>[A-Za-z]+)--",
+                )
+            )
+        )
+
+        self._fragments: List[str] = []
+        self._slots: List[Tuple[str, str]] = []
+        position = 0
+        for match in pattern.finditer(skeleton_json):
+            self._fragments.append(skeleton_json[position : match.start()])
+            if match.group("list"):
+                self._slots.append((_LIST, match.group("list")))
+            elif match.group("string"):
+                self._slots.append((_STRING, match.group("string")))
+            else:
+                self._slots.append((_VALUE, value_tokens[match.group()]))
+            position = match.end()
+        self._fragments.append(skeleton_json[position:])
+
+    def render(self, values: Dict[str, Any], list_values: Dict[str, List]) -> str:
+        parts = [self._fragments[0]]
+        for (kind, name), fragment in zip(self._slots, self._fragments[1:]):
+            if kind == _STRING:
+                # the slot sits inside an existing JSON string, drop the quotes
+                parts.append(encode_json(values[name])[1:-1])
+            elif kind == _LIST:
+                parts.append(encode_json(list_values[name]))
+            else:
+                parts.append(encode_json(values[name]))
+            parts.append(fragment)
+
+        return "".join(parts)
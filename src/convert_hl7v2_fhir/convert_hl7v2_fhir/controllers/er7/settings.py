@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class ER7ParserSettings(BaseSettings):
+    # only build hl7apy segments for those read by ER7Extractor
+    selective_parsing: bool = False
+    find_groups: bool = True
+
+    class Config:
+        env_prefix = "ER7_PARSER_"
+
+
+@lru_cache(maxsize=1)
+def get_er7_parser_settings() -> ER7ParserSettings:
+    return ER7ParserSettings()
+
+
+class FHIRBundleSettings(BaseSettings):
+    # build and validate fhir.resources models rather than fill in a template
+    validate_bundle: bool = False
+
+    class Config:
+        env_prefix = "FHIR_BUNDLE_"
+
+
+@lru_cache(maxsize=1)
+def get_fhir_bundle_settings() -> FHIRBundleSettings:
+    return FHIRBundleSettings()
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum, IntEnum
-from typing import Optional
+from typing import List, Optional
 from uuid import uuid4, UUID
 
 from pydantic import BaseModel
@@ -73,6 +73,47 @@ def generate_ack_message(
     return message_header + "\r" + segment_msa + segment_err + segment_zha
 
 
+def generate_batch_ack_message(
+    receiving_application: str,
+    receiving_facility: str,
+    replying_to_batch_id: str,
+    ack_messages: List[str],
+    replying_to_file_id: Optional[str] = None,
+):
+    """Wraps one ACK per message of a batch, each built by
+    `generate_ack_message`, in batch (and file, when replying to one)
+    header and trailer segments.
+
+    https://hl7-definition.caristix.com/v2/HL7v2.8/Segments/BHS"""
+
+    segments = [
+        _generate_batch_header_segment(
+            "BHS", receiving_application, receiving_facility, replying_to_batch_id
+        ),
+        *ack_messages,
+        f"BTS|{len(ack_messages)}",
+    ]
+    if replying_to_file_id is not None:
+        file_header = _generate_batch_header_segment(
+            "FHS", receiving_application, receiving_facility, replying_to_file_id
+        )
+        segments = [file_header, *segments, "FTS|1"]
+
+    return "\r".join(segments)
+
+
+def _generate_batch_header_segment(
+    segment_name: str,
+    receiving_application: str,
+    receiving_facility: str,
+    replying_to_control_id: str,
+):
+    """https://hl7-definition.caristix.com/v2/HL7v2.8/Segments/FHS"""
+
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"{segment_name}|^~\\&|HANS|NHSENGLAND|{receiving_application}|{receiving_facility}|{timestamp}||||{uuid4()}|{replying_to_control_id}"
+
+
 def _generate_msh_segment(
     receiving_application: str,
     receiving_facility: str,
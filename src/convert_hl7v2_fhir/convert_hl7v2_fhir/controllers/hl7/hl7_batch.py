@@ -0,0 +1,74 @@
+from typing import Iterator, NamedTuple, Optional
+
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import SEGMENT_SEPARATOR
+
+FILE_HEADER = "FHS"
+BATCH_HEADER = "BHS"
+_ENVELOPE_SEGMENTS = (FILE_HEADER, BATCH_HEADER, "BTS", "FTS")
+
+
+class HL7BatchHeader(NamedTuple):
+    sending_application: str
+    sending_facility: str
+    batch_control_id: str
+    file_control_id: Optional[str]
+
+
+def is_hl7_batch(raw_er7: str) -> bool:
+    return raw_er7.lstrip().startswith((FILE_HEADER, BATCH_HEADER))
+
+
+def scan_hl7_batch_header(raw_er7: str) -> HL7BatchHeader:
+    """Reads who sent the batch, and the control IDs the batch ACK refers
+    to, from the FHS and BHS segments. Both segments share the MSH layout
+    up to the control ID in field 11."""
+
+    headers = {}
+    for segment in _segments(raw_er7.lstrip()):
+        if segment.startswith("MSH"):
+            break
+        if segment.startswith((FILE_HEADER, BATCH_HEADER)) and len(segment) > 3:
+            headers[segment[:3]] = segment.split(segment[3])
+
+    # prefer the batch header, a file may leave it out when it only has one
+    fields = headers.get(BATCH_HEADER) or headers.get(FILE_HEADER) or []
+    file_fields = headers.get(FILE_HEADER)
+    return HL7BatchHeader(
+        sending_application=_field(fields, 3),
+        sending_facility=_field(fields, 4),
+        batch_control_id=_field(fields, 11),
+        file_control_id=_field(file_fields, 11) if file_fields else None,
+    )
+
+
+def iter_hl7_batch_messages(raw_er7: str) -> Iterator[str]:
+    """Yields each message of an FHS/BHS batch as it is found, without
+    splitting the whole batch up front."""
+
+    message = []
+    for segment in _segments(raw_er7):
+        if segment.startswith("MSH") or segment.startswith(_ENVELOPE_SEGMENTS):
+            if message:
+                yield SEGMENT_SEPARATOR.join(message)
+            message = [segment] if segment.startswith("MSH") else []
+        elif message:
+            message.append(segment)
+
+    if message:
+        yield SEGMENT_SEPARATOR.join(message)
+
+
+def _segments(raw_er7: str) -> Iterator[str]:
+    start = 0
+    while start < len(raw_er7):
+        end = raw_er7.find(SEGMENT_SEPARATOR, start)
+        if end == -1:
+            end = len(raw_er7)
+        if end > start:
+            yield raw_er7[start:end]
+        start = end + 1
+
+
+def _field(fields: list, number: int) -> str:
+    # FHS-1/BHS-1 is the field separator itself, so field n is at index n - 1
+    return fields[number - 1] if len(fields) > number - 1 else ""
@@ -0,0 +1,117 @@
+from typing import Optional
+
+from botocore.exceptions import ClientError, NoRegionError
+from hl7apy.exceptions import ValidationError
+
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import ER7Header
+from convert_hl7v2_fhir.controllers.er7.er7_snapshot import ER7Snapshot
+from convert_hl7v2_fhir.controllers.er7.exceptions import (
+    InvalidNHSNumberError,
+    MissingNHSNumberError,
+    MissingFieldError,
+)
+from convert_hl7v2_fhir.controllers.hl7.hl7_ack_builder import (
+    HL7ErrorCode,
+    HL7ErrorSeverity,
+    HL7Error,
+)
+from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
+    ManagementInterfaceCircuitOpen,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.exceptions import (
+    SQSPublisherException,
+)
+
+UNSUPPORTED_MESSAGE_TYPE_ERROR = HL7Error(
+    error_code=HL7ErrorCode.UNSUPPORTED_MESSAGE_TYPE,
+    error_severity=HL7ErrorSeverity.ERROR,
+    error_message="Only ADT message types are supported",
+)
+UNSUPPORTED_EVENT_CODE_ERROR = HL7Error(
+    error_code=HL7ErrorCode.UNSUPPORTED_EVENT_CODE,
+    error_severity=HL7ErrorSeverity.ERROR,
+    error_message="Only A01 message event codes are supported",
+)
+UNSUPPORTED_PATIENT_CLASS_ERROR = HL7Error(
+    error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
+    error_severity=HL7ErrorSeverity.ERROR,
+    error_message="Only Inpatient visit patient class messages are supported",
+)
+
+
+def to_hl7_error(ex: Exception) -> HL7Error:
+    if isinstance(ex, ValidationError):
+        # Malformed message, not adhering to the structures defined by HL7
+        return HL7Error(
+            error_code=HL7ErrorCode.SEGMENT_SEQUENCE_ERROR,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message=str(ex),
+        )
+
+    if isinstance(ex, InvalidNHSNumberError):
+        return HL7Error(
+            error_code=HL7ErrorCode.DATA_TYPE_ERROR,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message="NHS Number in message was invalid",
+        )
+
+    if isinstance(ex, MissingNHSNumberError):
+        return HL7Error(
+            error_code=HL7ErrorCode.UNKNOWN_KEY_IDENTIFIER,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message="NHS Number missing from message",
+        )
+
+    if isinstance(ex, MissingFieldError):
+        return HL7Error(
+            error_code=HL7ErrorCode.REQUIRED_FIELD_MISSING,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message=str(ex),
+        )
+
+    if isinstance(ex, ManagementInterfaceCircuitOpen):
+        return HL7Error(
+            error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message="Management interface unavailable, resend later",
+        )
+
+    if isinstance(ex, (ClientError, NoRegionError, SQSPublisherException)):
+        return HL7Error(
+            error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
+            error_severity=HL7ErrorSeverity.ERROR,
+            error_message="Issue reaching SQS service: " + str(ex),
+        )
+
+    return HL7Error(
+        error_code=HL7ErrorCode.APPLICATION_INTERNAL_ERROR,
+        error_severity=HL7ErrorSeverity.FATAL_ERROR,
+        error_message=str(ex),
+    )
+
+
+def check_header_is_supported(er7_header: ER7Header) -> Optional[HL7Error]:
+    if er7_header.message_type != "ADT":
+        return UNSUPPORTED_MESSAGE_TYPE_ERROR
+
+    if er7_header.trigger_event != "A01":
+        return UNSUPPORTED_EVENT_CODE_ERROR
+
+    # an unreadable patient class is left to the full parse to report
+    if er7_header.patient_class not in (None, "I"):
+        return UNSUPPORTED_PATIENT_CLASS_ERROR
+
+    return None
+
+
+def check_message_is_supported(er7_snapshot: ER7Snapshot) -> Optional[HL7Error]:
+    if er7_snapshot.message_type != "ADT":
+        return UNSUPPORTED_MESSAGE_TYPE_ERROR
+
+    if er7_snapshot.trigger_event != "A01":
+        return UNSUPPORTED_EVENT_CODE_ERROR
+
+    if er7_snapshot.patient_class != "I":
+        return UNSUPPORTED_PATIENT_CLASS_ERROR
+
+    return None
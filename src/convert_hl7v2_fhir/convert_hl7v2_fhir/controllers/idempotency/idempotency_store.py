@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+from boto3 import resource
+
+from convert_hl7v2_fhir.controllers.idempotency.settings import (
+    IdempotencyBackend,
+    get_idempotency_settings,
+)
+
+_LOGGER = Logger()
+
+
+def create_idempotency_key(
+    sending_application: str, sending_facility: str, message_control_id: str
+) -> Optional[str]:
+    # MSH-10 is only unique per sender, and without it there is nothing to key on
+    if not message_control_id:
+        return None
+
+    return "|".join((sending_application, sending_facility, message_control_id))
+
+
+class IdempotencyStore(ABC):
+    """Remembers the final ACK sent for a message, so a retransmission of it is
+    answered with the same ACK instead of being processed (and sent on to the
+    care provider) again.
+
+    Backends implement `_get` and `_put`, entries are expired after
+    `ttl_seconds` whether or not the backend removes them itself. A backend
+    that cannot be reached is logged and treated as a miss, as processing a
+    retransmission is better than rejecting a new message."""
+
+    def __init__(self, ttl_seconds: int, clock: Callable[[], float] = time.time):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_ack(self, key: str) -> Optional[str]:
+        try:
+            entry = self._get(key)
+        except Exception as ex:
+            _LOGGER.warning("Could not read idempotency store: %s", ex)
+            entry = None
+
+        ack = entry[0] if entry is not None and entry[1] > self._clock() else None
+        with self._stats_lock:
+            if ack is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return ack
+
+    def put_ack(self, key: str, ack: str) -> None:
+        try:
+            self._put(key, ack, self._clock() + self.ttl_seconds)
+        except Exception as ex:
+            _LOGGER.warning("Could not write idempotency store: %s", ex)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        """The ACK stored for the key and when it expires, `None` when absent."""
+
+    @abstractmethod
+    def _put(self, key: str, ack: str, expires_at: float) -> None:
+        """Stores the ACK for the key, replacing any stored before."""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Bounded LRU, only sees retransmissions that reach the same container."""
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_size: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(ttl_seconds, clock=clock)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, ack: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (ack, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Local SQLite file, for a long running process such as the MLLP server."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(ttl_seconds, clock=clock)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency"
+                " (idempotency_key TEXT PRIMARY KEY, ack TEXT, expires_at REAL)"
+            )
+
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT ack, expires_at FROM idempotency WHERE idempotency_key = ?",
+                (key,),
+            ).fetchone()
+
+    def _put(self, key: str, ack: str, expires_at: float) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO idempotency VALUES (?, ?, ?)",
+                (key, ack, expires_at),
+            )
+            self._connection.execute(
+                "DELETE FROM idempotency WHERE expires_at <= ?", (self._clock(),)
+            )
+
+
+class DynamoDBIdempotencyStore(IdempotencyStore):
+    """Shared between containers. `table` is a boto3 DynamoDB Table, or
+    anything with the same `get_item` and `put_item`. DynamoDB deletes expired
+    items some time after `expires_at`, so expiry is checked on read too."""
+
+    def __init__(
+        self,
+        table: Any,
+        ttl_seconds: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(ttl_seconds, clock=clock)
+        self.table = table
+
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        item = self.table.get_item(
+            Key={"idempotency_key": key}, ConsistentRead=True
+        ).get("Item")
+        if item is None:
+            return None
+
+        return item["ack"], float(item["expires_at"])
+
+    def _put(self, key: str, ack: str, expires_at: float) -> None:
+        self.table.put_item(
+            Item={
+                "idempotency_key": key,
+                "ack": ack,
+                # DynamoDB TTL needs whole epoch seconds
+                "expires_at": int(expires_at),
+            }
+        )
+
+
+@lru_cache(maxsize=1)
+def get_idempotency_store() -> Optional[IdempotencyStore]:
+    settings = get_idempotency_settings()
+    if settings.backend == IdempotencyBackend.MEMORY:
+        return InMemoryIdempotencyStore(
+            ttl_seconds=settings.ttl_seconds, max_size=settings.max_size
+        )
+
+    if settings.backend == IdempotencyBackend.SQLITE:
+        return SQLiteIdempotencyStore(
+            path=settings.sqlite_path, ttl_seconds=settings.ttl_seconds
+        )
+
+    if settings.backend == IdempotencyBackend.DYNAMODB:
+        return DynamoDBIdempotencyStore(
+            table=resource("dynamodb").Table(settings.dynamodb_table_name),
+            ttl_seconds=settings.ttl_seconds,
+        )
+
+    return None
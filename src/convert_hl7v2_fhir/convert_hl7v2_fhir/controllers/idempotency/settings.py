@@ -0,0 +1,31 @@
+from enum import Enum
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class IdempotencyBackend(str, Enum):
+    NONE = "none"
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+    DYNAMODB = "dynamodb"
+
+
+class IdempotencySettings(BaseSettings):
+    backend: IdempotencyBackend = IdempotencyBackend.NONE
+    # how long a retransmission is answered from the store
+    ttl_seconds: int = 24 * 60 * 60
+    # memory backend only
+    max_size: int = 4096
+    sqlite_path: str = "/tmp/idempotency.sqlite3"
+    # partition key "idempotency_key", with TTL enabled on "expires_at"
+    dynamodb_table_name: Optional[str] = None
+
+    class Config:
+        env_prefix = "IDEMPOTENCY_"
+
+
+@lru_cache(maxsize=1)
+def get_idempotency_settings() -> IdempotencySettings:
+    return IdempotencySettings()
@@ -0,0 +1,204 @@
+import atexit
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from hashlib import scrypt, sha256
+from typing import Callable, List, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from convert_hl7v2_fhir.controllers.pseudo_id.settings import (
+    get_pseudo_id_cache_settings,
+)
+
+_LOGGER = Logger()
+
+
+def generate_pseudo_id(nhs_number: str, birth_date: date) -> str:
+    # https://nhsx.github.io/il-hans-infrastructure/adrs/003-Do-not-use-NEMS-or-MESH
+    return scrypt(
+        nhs_number.encode(),
+        salt=str(birth_date).encode(),
+        n=32768,
+        r=12,
+        p=6,
+        maxmem=2**26,
+    ).hex()
+
+
+class PseudoIdCache:
+    """Bounded, TTL evicted cache in front of `generate_pseudo_id`.
+
+    Entries are keyed on an HMAC of the NHS number and date of birth, so raw
+    identifiers are never held as keys. The cache is only persisted when
+    an HMAC key is configured, otherwise the file would hold everything needed
+    to brute force the keys without paying the scrypt cost.
+
+    The file is rewritten on the first miss and then at most once every
+    `persist_interval_seconds`, outside of the lock, so lookups do not wait
+    on it. `flush` writes anything added since, e.g. before shutting down."""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: int = 60 * 60,
+        hmac_key: Optional[bytes] = None,
+        persist_path: Optional[str] = None,
+        persist_interval_seconds: float = 30,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path if hmac_key else None
+        self.persist_interval_seconds = persist_interval_seconds
+        if persist_path and not hmac_key:
+            _LOGGER.warning("Pseudo ID cache persistence disabled, no HMAC key set")
+
+        self._hmac_key = hmac_key or secrets.token_bytes(32)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # entries added since the last save
+        self._unsaved = False
+        self._saved_at: Optional[float] = None
+        # saves are numbered so an older one never overwrites a newer one
+        self._save_lock = threading.Lock()
+        self._saves_taken = 0
+        self._saves_written = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def get_pseudo_id(self, nhs_number: str, birth_date: date) -> str:
+        key = self._cache_key(nhs_number, birth_date)
+        with self._lock:
+            pseudo_id = self._get(key)
+            if pseudo_id is not None:
+                self.hits += 1
+                return pseudo_id
+
+            self.misses += 1
+
+        # computed outside of the lock, scrypt releases the GIL
+        pseudo_id = generate_pseudo_id(nhs_number, birth_date)
+        with self._lock:
+            self._set(key, pseudo_id)
+            self._unsaved = True
+            save = self._take_save()
+        self._write(save)
+
+        return pseudo_id
+
+    def flush(self) -> None:
+        with self._lock:
+            save = self._take_save(force=True)
+        self._write(save)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cache_key(self, nhs_number: str, birth_date: date) -> str:
+        message = f"{nhs_number}|{birth_date}".encode()
+        return hmac.new(self._hmac_key, message, sha256).hexdigest()
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        pseudo_id, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return pseudo_id
+
+    def _set(self, key: str, pseudo_id: str) -> None:
+        self._entries[key] = (pseudo_id, self._clock() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self) -> None:
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+
+        now = self._clock()
+        loaded: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        try:
+            with open(self.persist_path, "r") as f:
+                entries = json.load(f)
+            for key, pseudo_id, expires_at in entries[-self.max_size :]:
+                if expires_at > now:
+                    loaded[key] = (pseudo_id, expires_at)
+        except (OSError, ValueError, TypeError) as ex:
+            # a malformed file is treated as an empty cache
+            _LOGGER.warning("Could not load pseudo ID cache: %s", ex)
+            return
+
+        self._entries.update(loaded)
+
+    def _take_save(self, force: bool = False) -> Optional[Tuple[int, List[list]]]:
+        if not self.persist_path or not self._unsaved:
+            return None
+
+        now = self._clock()
+        if (
+            not force
+            and self._saved_at is not None
+            and now - self._saved_at < self.persist_interval_seconds
+        ):
+            return None
+
+        self._unsaved = False
+        self._saved_at = now
+        self._saves_taken += 1
+        entries = [
+            [key, pseudo_id, expires_at]
+            for key, (pseudo_id, expires_at) in self._entries.items()
+        ]
+        return self._saves_taken, entries
+
+    def _write(self, save: Optional[Tuple[int, List[list]]]) -> None:
+        if save is None:
+            return
+
+        number, entries = save
+        directory = os.path.dirname(self.persist_path) or "."
+        with self._save_lock:
+            if number < self._saves_written:
+                return
+
+            try:
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=directory, delete=False
+                ) as temp_file:
+                    json.dump(entries, temp_file)
+                os.replace(temp_file.name, self.persist_path)
+            except OSError as ex:
+                _LOGGER.warning("Could not persist pseudo ID cache: %s", ex)
+                return
+
+            self._saves_written = number
+
+
+@lru_cache(maxsize=1)
+def get_pseudo_id_cache() -> PseudoIdCache:
+    settings = get_pseudo_id_cache_settings()
+    pseudo_id_cache = PseudoIdCache(
+        max_size=settings.max_size,
+        ttl_seconds=settings.ttl_seconds,
+        hmac_key=settings.hmac_key.encode() if settings.hmac_key else None,
+        persist_path=settings.persist_path,
+        persist_interval_seconds=settings.persist_interval_seconds,
+    )
+    atexit.register(pseudo_id_cache.flush)
+    return pseudo_id_cache
@@ -0,0 +1,23 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class PseudoIdCacheSettings(BaseSettings):
+    max_size: int = 1024
+    ttl_seconds: int = 60 * 60
+    # keyed hash secret, required for the cache to be persisted
+    hmac_key: Optional[str] = None
+    # e.g. /tmp/pseudo-id-cache.json, to survive runtime restarts in a warm container
+    persist_path: Optional[str] = None
+    # entries added within this long of the last save are written with the next
+    persist_interval_seconds: float = 30
+
+    class Config:
+        env_prefix = "PSEUDO_ID_CACHE_"
+
+
+@lru_cache(maxsize=1)
+def get_pseudo_id_cache_settings() -> PseudoIdCacheSettings:
+    return PseudoIdCacheSettings()
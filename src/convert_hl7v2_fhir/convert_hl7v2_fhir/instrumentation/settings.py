@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class StageMetricsSettings(BaseSettings):
+    # off by default, the no-op timers then cost nothing
+    enabled: bool = False
+    namespace: str = "HANS"
+
+    class Config:
+        env_prefix = "STAGE_METRICS_"
+
+
+@lru_cache(maxsize=1)
+def get_stage_metrics_settings() -> StageMetricsSettings:
+    return StageMetricsSettings()
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator
+
+from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+from convert_hl7v2_fhir.instrumentation.settings import get_stage_metrics_settings
+
+# suffixed to the stage name to give the metric name, e.g. "parseLatency"
+_METRIC_SUFFIX = "Latency"
+
+
+class StageTimer:
+    """Times the stages of processing one message (or batch) and emits them
+    together when the outcome is known.
+
+    This base class is the no-op timer used when stage metrics are disabled,
+    `stage` returns a shared null context and nothing is recorded."""
+
+    _NULL_CONTEXT = nullcontext()
+
+    def stage(self, name: str) -> ContextManager:
+        return self._NULL_CONTEXT
+
+    def emit(self, outcome: str, error_code: str) -> None:
+        pass
+
+
+class MetricsStageTimer(StageTimer):
+    """Emits each stage's total time as a CloudWatch embedded metric format
+    metric through Powertools, with `outcome` and `error_code` dimensions.
+
+    Stages entered more than once (or from several threads, as batch lookups
+    are) are added up. `EphemeralMetrics` keeps these apart from any other
+    timer, where `Metrics` would share one set of metrics per process."""
+
+    def __init__(
+        self,
+        namespace: str,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.namespace = namespace
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.durations: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = self._clock()
+        try:
+            yield
+        finally:
+            elapsed_ms = (self._clock() - start) * 1000
+            with self._lock:
+                self.durations[name] += elapsed_ms
+
+    def emit(self, outcome: str, error_code: str) -> None:
+        if not self.durations:
+            return
+
+        metrics = EphemeralMetrics(namespace=self.namespace)
+        metrics.add_dimension(name="outcome", value=outcome)
+        metrics.add_dimension(name="error_code", value=error_code)
+        with self._lock:
+            for name, duration in self.durations.items():
+                metrics.add_metric(
+                    name=name + _METRIC_SUFFIX,
+                    unit=MetricUnit.Milliseconds,
+                    value=duration,
+                )
+        # what `log_metrics` does at the end of an invocation, CloudWatch picks
+        #  the metrics out of the function's log
+        print(json.dumps(metrics.serialize_metric_set(), separators=(",", ":")))
+
+
+NO_OP_STAGE_TIMER = StageTimer()
+
+
+def create_stage_timer() -> StageTimer:
+    settings = get_stage_metrics_settings()
+    if not settings.enabled:
+        return NO_OP_STAGE_TIMER
+
+    return MetricsStageTimer(namespace=settings.namespace)
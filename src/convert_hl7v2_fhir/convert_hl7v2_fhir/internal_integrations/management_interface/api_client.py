@@ -4,6 +4,10 @@ import requests
 from aws_lambda_powertools import Logger
 
 from convert_hl7v2_fhir.http_adapter import TimeoutHTTPAdapter, DEFAULT_RETRY_STRATEGY
+from convert_hl7v2_fhir.internal_integrations.management_interface.circuit_breaker import (
+    CircuitBreaker,
+    get_circuit_breaker,
+)
 from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
     CareProviderLocationNotFound,
     ManagementInterfaceNotAvailable,
@@ -23,16 +27,28 @@ class ManagementInterfaceApiClient:
         self,
         base_url: Optional[str] = None,
         session: Optional[requests.Session] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
         self.session: requests.Session = session or requests.Session()
         _adapter = TimeoutHTTPAdapter(max_retries=DEFAULT_RETRY_STRATEGY)
         self.session.mount("http://", _adapter)
         self.session.mount("https://", _adapter)
         self.base_url: str = base_url or get_management_interface_settings().base_url
+        self.circuit_breaker: Optional[CircuitBreaker] = (
+            circuit_breaker or get_circuit_breaker()
+        )
 
     def get_care_provider(
         self, *, care_recipient_pseudo_id: str
     ) -> CareProviderResponse:
+        if self.circuit_breaker is None:
+            return self._get_care_provider(care_recipient_pseudo_id)
+
+        return self.circuit_breaker.call(
+            lambda: self._get_care_provider(care_recipient_pseudo_id)
+        )
+
+    def _get_care_provider(self, care_recipient_pseudo_id: str) -> CareProviderResponse:
         url = f"{self.base_url}/care-provider-location/_search/"
         data = {"_careRecipientPseudoId": care_recipient_pseudo_id}
         response = self.session.post(url, data=data)
@@ -0,0 +1,227 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple, Type, TypeVar
+
+import requests
+from aws_lambda_powertools import Logger
+from boto3 import resource
+
+from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
+    ManagementInterfaceCircuitOpen,
+    ManagementInterfaceNotAvailable,
+)
+from convert_hl7v2_fhir.internal_integrations.management_interface.settings import (
+    CircuitBreakerBackend,
+    get_circuit_breaker_settings,
+)
+
+_LOGGER = Logger()
+
+T = TypeVar("T")
+
+# the management interface could not be reached or failed, as opposed to
+#  answering that there is no care provider
+_FAILURES: Tuple[Type[Exception], ...] = (
+    ManagementInterfaceNotAvailable,
+    requests.RequestException,
+)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker(ABC):
+    """Stops calling the management interface once `failure_threshold` calls
+    in a row have failed, raising `ManagementInterfaceCircuitOpen` straight
+    away instead of waiting through the retries of each call.
+
+    After `open_seconds` the circuit is half open and one call is let through:
+    the circuit closes if it succeeds and opens again if it fails.
+
+    Backends implement `_read` and `_write` of when the circuit is open until,
+    so a circuit opened by one container is seen by the others within
+    `refresh_seconds`. A backend that cannot be reached is logged and the
+    container carries on with its own view of the circuit."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        open_seconds: int = 30,
+        refresh_seconds: int = 5,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        # epoch seconds, 0 while closed
+        self._open_until = 0.0
+        self._probing = False
+        self._refreshed_at: Optional[float] = None
+        # calls failed fast while the circuit was open
+        self.rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._state()
+
+    def call(self, function: Callable[[], T]) -> T:
+        self._refresh()
+        self._before_call()
+        try:
+            result = function()
+        except _FAILURES:
+            self._record_failure()
+            raise
+        except Exception:
+            # e.g. the care provider was not found, which it answered
+            self._record_success()
+            raise
+
+        self._record_success()
+        return result
+
+    def _state(self) -> CircuitState:
+        if not self._open_until:
+            return CircuitState.CLOSED
+        if self._clock() < self._open_until:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def _before_call(self) -> None:
+        with self._lock:
+            state = self._state()
+            if state == CircuitState.OPEN or (
+                state == CircuitState.HALF_OPEN and self._probing
+            ):
+                self.rejected += 1
+                raise ManagementInterfaceCircuitOpen(f"{self.name} circuit is open")
+
+            if state == CircuitState.HALF_OPEN:
+                self._probing = True
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            probed, self._probing = self._probing, False
+            if not probed and self._failures < self.failure_threshold:
+                return
+
+            self._open_until = self._clock() + self.open_seconds
+            open_until = self._open_until
+
+        _LOGGER.warning(
+            "Circuit opened", extra={"circuit": self.name, "open_until": open_until}
+        )
+        self._publish(open_until)
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if not self._open_until:
+                return
+
+            self._open_until = 0.0
+
+        _LOGGER.info("Circuit closed", extra={"circuit": self.name})
+        self._publish(0.0)
+
+    def _refresh(self) -> None:
+        now = self._clock()
+        with self._lock:
+            if (
+                self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh_seconds
+            ):
+                return
+            self._refreshed_at = now
+
+        try:
+            open_until = self._read()
+        except Exception as ex:
+            _LOGGER.warning("Could not read circuit breaker store: %s", ex)
+            return
+
+        with self._lock:
+            if open_until is not None and not self._probing:
+                self._open_until = open_until
+
+    def _publish(self, open_until: float) -> None:
+        try:
+            self._write(open_until)
+        except Exception as ex:
+            _LOGGER.warning("Could not write circuit breaker store: %s", ex)
+
+    @abstractmethod
+    def _read(self) -> Optional[float]:
+        """When the shared circuit is open until, `None` when not known."""
+
+    @abstractmethod
+    def _write(self, open_until: float) -> None:
+        """Shares when the circuit is open until, 0 once it has closed."""
+
+
+class InMemoryCircuitBreaker(CircuitBreaker):
+    """Only sees the failures of its own container."""
+
+    def _read(self) -> Optional[float]:
+        return None
+
+    def _write(self, open_until: float) -> None:
+        pass
+
+
+class DynamoDBCircuitBreaker(CircuitBreaker):
+    """Shared between containers. `table` is a boto3 DynamoDB Table, or
+    anything with the same `get_item` and `put_item`. Failures are counted by
+    each container, only the opening and closing of the circuit is shared."""
+
+    def __init__(self, table: Any, name: str, **kwargs):
+        super().__init__(name, **kwargs)
+        self.table = table
+
+    def _read(self) -> Optional[float]:
+        item = self.table.get_item(
+            Key={"circuit_name": self.name}, ConsistentRead=True
+        ).get("Item")
+        if item is None:
+            return None
+
+        return float(item["open_until"])
+
+    def _write(self, open_until: float) -> None:
+        self.table.put_item(
+            Item={"circuit_name": self.name, "open_until": int(open_until)}
+        )
+
+
+@lru_cache(maxsize=1)
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    settings = get_circuit_breaker_settings()
+    options = {
+        "name": "management-interface",
+        "failure_threshold": settings.failure_threshold,
+        "open_seconds": settings.open_seconds,
+        "refresh_seconds": settings.refresh_seconds,
+    }
+    if settings.backend == CircuitBreakerBackend.MEMORY:
+        return InMemoryCircuitBreaker(**options)
+
+    if settings.backend == CircuitBreakerBackend.DYNAMODB:
+        return DynamoDBCircuitBreaker(
+            table=resource("dynamodb").Table(settings.dynamodb_table_name), **options
+        )
+
+    return None
@@ -8,3 +8,7 @@ class CareProviderLocationNotFound(ManagementInterfaceApiClientException):
 
 class ManagementInterfaceNotAvailable(ManagementInterfaceApiClientException):
     pass
+
+
+class ManagementInterfaceCircuitOpen(ManagementInterfaceNotAvailable):
+    pass
@@ -1,5 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
 from fhir.resources.organization import Organization
+from pydantic import BaseModel
 
 
 class CareProviderResponse(Organization):
     ...
+
+
+class CareProviderLookup(BaseModel):
+    care_recipient_pseudo_id: str
+    care_provider: Optional[CareProviderResponse] = None
+    retrieved_at: Optional[datetime] = None
@@ -1,4 +1,6 @@
+from enum import Enum
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -13,3 +15,29 @@ class ManagementInterfaceSettings(BaseSettings):
 @lru_cache(maxsize=1)
 def get_management_interface_settings() -> ManagementInterfaceSettings:
     return ManagementInterfaceSettings()
+
+
+class CircuitBreakerBackend(str, Enum):
+    NONE = "none"
+    MEMORY = "memory"
+    DYNAMODB = "dynamodb"
+
+
+class CircuitBreakerSettings(BaseSettings):
+    backend: CircuitBreakerBackend = CircuitBreakerBackend.MEMORY
+    # consecutive failed calls that open the circuit
+    failure_threshold: int = 5
+    # how long the circuit stays open before a call is let through to try it
+    open_seconds: int = 30
+    # how often an open circuit shared by other containers is looked for
+    refresh_seconds: int = 5
+    # shared by every container, partition key "circuit_name"
+    dynamodb_table_name: Optional[str] = None
+
+    class Config:
+        env_prefix = "MANAGEMENT_INTERFACE_CIRCUIT_BREAKER_"
+
+
+@lru_cache(maxsize=1)
+def get_circuit_breaker_settings() -> CircuitBreakerSettings:
+    return CircuitBreakerSettings()
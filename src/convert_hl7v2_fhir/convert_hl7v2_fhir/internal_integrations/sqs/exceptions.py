@@ -0,0 +1,24 @@
+from typing import Any, Dict, Iterable, List
+
+
+class SQSPublisherException(Exception):
+    def __init__(self, message: str, correlation_ids: Iterable[Any] = ()):
+        super().__init__(message)
+        # as passed to SQSPublisher.publish, for the messages that were not sent
+        self.correlation_ids = list(correlation_ids)
+
+
+class SQSBatchFailed(SQSPublisherException):
+    pass
+
+
+class SQSBatchEntriesFailed(SQSPublisherException):
+    def __init__(
+        self, failed_entries: List[Dict[str, Any]], correlation_ids: Iterable[Any] = ()
+    ):
+        self.failed_entries = failed_entries
+        super().__init__(
+            f"{len(failed_entries)} message(s) could not be sent: "
+            + ", ".join(entry.get("Code", "Unknown") for entry in failed_entries),
+            correlation_ids=correlation_ids,
+        )
@@ -0,0 +1,45 @@
+from typing import Any, Dict
+
+from convert_hl7v2_fhir.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+)
+
+# bump whenever the attributes below change in a backwards incompatible way,
+#  email_care_provider ignores versions it does not know and looks up again
+MESSAGE_ATTRIBUTES_VERSION = "1"
+
+
+class MessageAttributeName:
+    VERSION = "HANSMessageAttributesVersion"
+    CARE_RECIPIENT_PSEUDO_ID = "CareRecipientPseudoId"
+    CARE_PROVIDER = "CareProvider"
+    CARE_PROVIDER_RETRIEVED_AT = "CareProviderRetrievedAt"
+
+
+def care_provider_lookup_to_message_attributes(
+    care_provider_lookup: CareProviderLookup,
+) -> Dict[str, Dict[str, Any]]:
+    message_attributes = {
+        MessageAttributeName.VERSION: {
+            "DataType": "String",
+            "StringValue": MESSAGE_ATTRIBUTES_VERSION,
+        },
+        MessageAttributeName.CARE_RECIPIENT_PSEUDO_ID: {
+            "DataType": "String",
+            "StringValue": care_provider_lookup.care_recipient_pseudo_id,
+        },
+    }
+    if (
+        care_provider_lookup.care_provider is not None
+        and care_provider_lookup.retrieved_at is not None
+    ):
+        message_attributes[MessageAttributeName.CARE_PROVIDER] = {
+            "DataType": "String",
+            "StringValue": care_provider_lookup.care_provider.json(),
+        }
+        message_attributes[MessageAttributeName.CARE_PROVIDER_RETRIEVED_AT] = {
+            "DataType": "Number",
+            "StringValue": str(care_provider_lookup.retrieved_at.timestamp()),
+        }
+
+    return message_attributes
@@ -0,0 +1,189 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from boto3 import client
+from botocore.exceptions import BotoCoreError, ClientError
+
+from convert_hl7v2_fhir.internal_integrations.sqs.exceptions import (
+    SQSBatchEntriesFailed,
+    SQSBatchFailed,
+    SQSPublisherException,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.settings import get_sqs_settings
+
+# limits of SendMessageBatch
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+
+class SQSPublisher:
+    """Buffers messages for one queue and sends them with SendMessageBatch.
+
+    The buffer is sent when it holds `batch_size` messages, when the next
+    message would take it over the batch payload limit, when the oldest
+    message has waited `max_wait_seconds` (checked on each publish) and on
+    `flush`, which must be called before the end of every invocation.
+    Entries SQS fails on its side are retried up to `max_attempts` in total,
+    anything still failing is raised as `SQSBatchEntriesFailed`, and a failed
+    call as `SQSBatchFailed`."""
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        batch_size: int = MAX_BATCH_ENTRIES,
+        max_wait_seconds: float = 1.0,
+        max_attempts: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.batch_size = min(batch_size, MAX_BATCH_ENTRIES)
+        self.max_wait_seconds = max_wait_seconds
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[Any, Dict[str, Any]]] = []
+        self._entries_bytes = 0
+        self._oldest_entry_at: Optional[float] = None
+
+    def publish(
+        self,
+        body: str,
+        message_attributes: Optional[Dict[str, Dict[str, Any]]] = None,
+        correlation_id: Any = None,
+    ) -> None:
+        """Buffers the message, sending the buffer if a limit is reached.
+
+        When that send fails the message being published is either part of
+        it (and its `correlation_id` is on the exception) or still buffered."""
+
+        entry = {"MessageBody": body, "MessageAttributes": message_attributes or {}}
+        entry_bytes = _entry_bytes(entry)
+        with self._lock:
+            over_payload_limit = (
+                len(self._entries) > 0
+                and self._entries_bytes + entry_bytes > MAX_BATCH_BYTES
+            )
+            self._entries.append((correlation_id, entry))
+            self._entries_bytes += entry_bytes
+            if self._oldest_entry_at is None:
+                self._oldest_entry_at = self._clock()
+
+            if over_payload_limit:
+                self._send_buffered(keep_last=True)
+            elif (
+                len(self._entries) >= self.batch_size
+                or self._clock() - self._oldest_entry_at >= self.max_wait_seconds
+            ):
+                self._send_buffered()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._entries:
+                self._send_buffered()
+
+    def with_own_buffer(self) -> "SQSPublisher":
+        """A publisher for the same queue, client and limits with a buffer of
+        its own, for a caller which must only flush (and be told about the
+        failures of) its own messages while other threads publish."""
+
+        return SQSPublisher(
+            self.sqs_client,
+            self.queue_url,
+            batch_size=self.batch_size,
+            max_wait_seconds=self.max_wait_seconds,
+            max_attempts=self.max_attempts,
+            clock=self._clock,
+        )
+
+    def send(
+        self,
+        body: str,
+        message_attributes: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Sends the message on its own straight away, for a caller which must
+        know that its own message was sent. Unlike `publish` and `flush` it
+        does not go through the buffer, so a failure raised here is always
+        for this message, whatever other threads are publishing."""
+
+        entry = {"MessageBody": body, "MessageAttributes": message_attributes or {}}
+        self._send([(None, entry)])
+
+    def _send_buffered(self, keep_last: bool = False) -> None:
+        to_send = self._entries[:-1] if keep_last else self._entries
+        self._entries = self._entries[-1:] if keep_last else []
+        self._entries_bytes = sum(_entry_bytes(e) for _, e in self._entries)
+        self._oldest_entry_at = self._clock() if self._entries else None
+        self._send(to_send)
+
+    def _send(self, to_send: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        entries = dict(enumerate(to_send))
+        failed = []
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self.sqs_client.send_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {"Id": str(index), **entry}
+                        for index, (_, entry) in entries.items()
+                    ],
+                )
+            except (BotoCoreError, ClientError) as ex:
+                unsent = list(entries) + [int(failure["Id"]) for failure in failed]
+                raise SQSBatchFailed(
+                    str(ex), correlation_ids=[to_send[index][0] for index in unsent]
+                ) from ex
+
+            retryable = []
+            for failure in response.get("Failed", []):
+                if failure.get("SenderFault") or attempt == self.max_attempts:
+                    failed.append(failure)
+                else:
+                    retryable.append(int(failure["Id"]))
+
+            if not retryable:
+                break
+
+            entries = {index: entries[index] for index in retryable}
+
+        if failed:
+            raise SQSBatchEntriesFailed(
+                failed,
+                correlation_ids=[to_send[int(failure["Id"])][0] for failure in failed],
+            )
+
+
+def _entry_bytes(entry: Dict[str, Any]) -> int:
+    size = len(entry["MessageBody"].encode())
+    for name, attribute in entry["MessageAttributes"].items():
+        size += len(name.encode()) + len(attribute["DataType"].encode())
+        size += len(attribute.get("StringValue", "").encode())
+    return size
+
+
+@lru_cache(maxsize=1)
+def get_sqs_publisher() -> SQSPublisher:
+    # created once per container, so the client and its connections are reused
+    return _create_sqs_publisher(get_sqs_settings().converted_queue_url)
+
+
+@lru_cache(maxsize=1)
+def get_accepted_sqs_publisher() -> SQSPublisher:
+    sqs_settings = get_sqs_settings()
+    if not sqs_settings.accepted_queue_url:
+        raise SQSPublisherException("No accepted queue configured")
+
+    return _create_sqs_publisher(sqs_settings.accepted_queue_url)
+
+
+def _create_sqs_publisher(queue_url: str) -> SQSPublisher:
+    sqs_settings = get_sqs_settings()
+    return SQSPublisher(
+        sqs_client=client("sqs"),
+        queue_url=queue_url,
+        batch_size=sqs_settings.publish_batch_size,
+        max_wait_seconds=sqs_settings.publish_max_wait_seconds,
+    )
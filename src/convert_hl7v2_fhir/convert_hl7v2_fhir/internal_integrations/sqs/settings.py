@@ -1,15 +1,22 @@
-from functools import lru_cache
-
-from pydantic import BaseSettings
-
-
-class SQSSettings(BaseSettings):
-    converted_queue_url: str
-
-    class Config:
-        env_prefix = "SQS_"
-
-
-@lru_cache(maxsize=1)
-def get_sqs_settings() -> SQSSettings:
-    return SQSSettings()
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class SQSSettings(BaseSettings):
+    converted_queue_url: str
+    accepted_queue_url: Optional[str] = None
+    # SendMessageBatch accepts at most 10 entries
+    publish_batch_size: int = 10
+    publish_max_wait_seconds: float = 1.0
+    # accepted messages which can never be converted are retried when not set
+    dead_letter_queue_url: Optional[str] = None
+
+    class Config:
+        env_prefix = "SQS_"
+
+
+@lru_cache(maxsize=1)
+def get_sqs_settings() -> SQSSettings:
+    return SQSSettings()
@@ -0,0 +1,6 @@
+class MLLPException(Exception):
+    pass
+
+
+class MLLPFramingError(MLLPException):
+    pass
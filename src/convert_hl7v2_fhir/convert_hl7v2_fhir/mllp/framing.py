@@ -0,0 +1,37 @@
+import asyncio
+from typing import Optional
+
+from convert_hl7v2_fhir.mllp.exceptions import MLLPFramingError
+
+# https://www.hl7.org/implement/standards/product_brief.cfm?product_id=55
+START_BLOCK = b"\x0b"
+END_BLOCK = b"\x1c\r"
+
+
+def frame_message(message: bytes) -> bytes:
+    return START_BLOCK + message + END_BLOCK
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Reads the next MLLP frame and returns the message inside it, or `None`
+    once the sender has closed the connection between frames.
+
+    Frames larger than the reader's limit are raised as `MLLPFramingError`,
+    as is anything that is not a frame, since the connection cannot be
+    resynchronised after either."""
+
+    try:
+        frame = await reader.readuntil(END_BLOCK)
+    except asyncio.IncompleteReadError as ex:
+        if ex.partial.strip():
+            raise MLLPFramingError("Connection closed part way through a frame")
+        return None
+    except asyncio.LimitOverrunError:
+        raise MLLPFramingError("Frame is larger than the maximum message size")
+
+    # whitespace between frames is tolerated, anything else is not
+    start = frame.find(START_BLOCK)
+    if start == -1 or frame[:start].strip():
+        raise MLLPFramingError("Data received outside of an MLLP frame")
+
+    return frame[start + len(START_BLOCK) : -len(END_BLOCK)]
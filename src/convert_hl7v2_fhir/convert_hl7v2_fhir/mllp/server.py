@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+
+from convert_hl7v2_fhir.app import create_error_ack, handle_er7_message
+from convert_hl7v2_fhir.mllp.exceptions import MLLPFramingError
+from convert_hl7v2_fhir.mllp.framing import frame_message, read_frame
+from convert_hl7v2_fhir.mllp.settings import get_mllp_settings
+from convert_hl7v2_fhir.settings import get_convert_hl7v2_fhir_settings
+
+_LOGGER = Logger()
+
+
+class MLLPServer:
+    """Receives HL7 messages over MLLP and writes each ACK back on the
+    connection the message came in on.
+
+    `handler` is called on `executor` as it is synchronous and CPU heavy
+    (parsing, scrypt) or blocking (lookups, SQS). A connection can have up to
+    `max_pipelined` messages in progress at once, their ACKs are still written
+    in the order the messages were received.
+
+    When `handler` raises, the message is answered with what `error_handler`
+    returns for it, as a sender would resend a message that is never
+    acknowledged forever and hold up the rest of its feed. Without an
+    `error_handler`, or when the connection breaks framing, the connection is
+    closed without an ACK so the sender resends rather than losing it."""
+
+    def __init__(
+        self,
+        handler: Callable[[str], str],
+        executor: Executor,
+        error_handler: Optional[Callable[[str, Exception], str]] = None,
+        host: str = "0.0.0.0",
+        port: int = 2575,
+        max_pipelined: int = 32,
+        max_message_bytes: int = 1024 * 1024,
+        encoding: str = "utf-8",
+    ):
+        self.handler = handler
+        self.executor = executor
+        self.error_handler = error_handler
+        self.host = host
+        self.port = port
+        self.max_pipelined = max_pipelined
+        self.max_message_bytes = max_message_bytes
+        self.encoding = encoding
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            host=self.host,
+            port=self.port,
+            limit=self.max_message_bytes,
+        )
+        # port 0 binds to any free port, report the one actually used
+        self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.info("MLLP server listening", extra={"port": self.port})
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        pending: "asyncio.Queue[Optional[asyncio.Future]]" = asyncio.Queue(
+            maxsize=self.max_pipelined
+        )
+        ack_writer = asyncio.ensure_future(self._write_acks(pending, writer))
+        try:
+            while not ack_writer.done():
+                message = await read_frame(reader)
+                if message is None:
+                    break
+
+                ack = asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._handle, message.decode(self.encoding)
+                )
+                await pending.put(ack)
+        except (MLLPFramingError, UnicodeDecodeError, ConnectionError) as ex:
+            _LOGGER.warning("Closing MLLP connection: %s", ex)
+        finally:
+            if ack_writer.done():
+                _drain_and_cancel(pending)
+            else:
+                # let the ACKs of messages already received be written first
+                await pending.put(None)
+                await ack_writer
+            writer.close()
+
+    def _handle(self, message: str) -> str:
+        try:
+            return self.handler(message)
+        except Exception as ex:
+            if self.error_handler is None:
+                raise
+
+            _LOGGER.exception(str(ex))
+            return self.error_handler(message, ex)
+
+    async def _write_acks(
+        self, pending: "asyncio.Queue[Optional[asyncio.Future]]", writer
+    ) -> None:
+        while True:
+            ack = await pending.get()
+            if ack is None:
+                return
+
+            try:
+                writer.write(frame_message((await ack).encode(self.encoding)))
+                await writer.drain()
+            except Exception as ex:
+                # an ACK missing from the sequence would be matched to the
+                #  wrong message, stop here and let the sender resend
+                _LOGGER.exception(str(ex))
+                _drain_and_cancel(pending)
+                writer.close()
+                return
+
+
+def _drain_and_cancel(pending: asyncio.Queue) -> None:
+    while not pending.empty():
+        ack = pending.get_nowait()
+        if ack is not None:
+            ack.cancel()
+
+
+async def serve() -> None:
+    settings = get_mllp_settings()
+    with ThreadPoolExecutor(
+        max_workers=get_convert_hl7v2_fhir_settings().max_workers
+    ) as executor:
+        server = MLLPServer(
+            handler=handle_er7_message,
+            executor=executor,
+            error_handler=create_error_ack,
+            host=settings.host,
+            port=settings.port,
+            max_pipelined=settings.max_pipelined,
+            max_message_bytes=settings.max_message_bytes,
+            encoding=settings.encoding,
+        )
+        await server.serve_forever()
+
+
+def main() -> None:
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class MLLPSettings(BaseSettings):
+    host: str = "0.0.0.0"
+    port: int = 2575
+    # messages of one connection processed ahead of the ACK being written,
+    #  reading stops (so TCP pushes back on the sender) when this is reached
+    max_pipelined: int = 32
+    max_message_bytes: int = 1024 * 1024
+    encoding: str = "utf-8"
+
+    class Config:
+        env_prefix = "MLLP_"
+
+
+@lru_cache(maxsize=1)
+def get_mllp_settings() -> MLLPSettings:
+    return MLLPSettings()
@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class ConvertHL7v2FhirSettings(BaseSettings):
+    # messages of an HL7 batch looked up at the same time, each scrypt call
+    #  needs ~50MB so keep this in line with the function memory size
+    max_workers: int = 4
+    # ACK once a message passes validation and filtering, leaving the lookup
+    #  and conversion to accepted_message_handler (needs SQS_ACCEPTED_QUEUE_URL)
+    accept_then_process: bool = False
+
+    class Config:
+        env_prefix = "CONVERT_HL7V2_FHIR_"
+
+
+@lru_cache(maxsize=1)
+def get_convert_hl7v2_fhir_settings() -> ConvertHL7v2FhirSettings:
+    return ConvertHL7v2FhirSettings()
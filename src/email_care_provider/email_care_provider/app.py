@@ -1,27 +1,112 @@
+from typing import Any, Dict, List
+
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from urllib3.exceptions import MaxRetryError
+from botocore.exceptions import BotoCoreError, ClientError
 
-from email_care_provider.controllers.notify_care_provider import (
-    NotifyCareProviderController,
+from email_care_provider.controllers.failure_classifier import (
+    FailureClass,
+    get_failure_classifier,
+)
+from email_care_provider.controllers.notify_batch import (
+    NotificationResult,
+    QueuedNotification,
+    get_notify_batch_controller,
+)
+from email_care_provider.http_adapter import with_lambda_deadline
+from email_care_provider.internal_integrations.sqs.dead_letter_queue import (
+    send_to_dead_letter_queue,
 )
+from email_care_provider.internal_integrations.sqs.message_attributes import (
+    care_provider_lookup_from_message_attributes,
+)
+from email_care_provider.internal_integrations.sqs.settings import get_sqs_settings
 from email_care_provider.schemas import HANSBundle
 
 _LOGGER = Logger()
 
 
 @_LOGGER.inject_lambda_context(log_event=False)
+@with_lambda_deadline
 def lambda_handler(event: dict, context: LambdaContext):
-    for queue_message in event["Records"]:
-        bundle = HANSBundle.parse_raw(queue_message["body"])
+    queue_messages = {
+        queue_message["messageId"]: queue_message for queue_message in event["Records"]
+    }
+    queued_notifications = []
+    results = []
+    for message_id, queue_message in queue_messages.items():
         try:
-            NotifyCareProviderController().send_email_to_care_provider(
-                patient_nhs_number=bundle.patient.identifier[0].value,
-                patient_given_name=bundle.patient.name[0].given[0],
-                patient_family_name=bundle.patient.name[0].family,
-                patient_birth_date=bundle.patient.birthDate,
-                location_name=bundle.location.name,
-                admitted_at=bundle.encounter.period.start,
-            )
-        except MaxRetryError as ex:
-            _LOGGER.exception(str(ex))
+            queued_notifications.append(_to_queued_notification(queue_message))
+        except Exception as ex:
+            results.append(NotificationResult(message_id=message_id, exception=ex))
+
+    results.extend(get_notify_batch_controller().send_emails(queued_notifications))
+    return _batch_response(results, queue_messages)
+
+
+def _to_queued_notification(queue_message: Dict[str, Any]) -> QueuedNotification:
+    return QueuedNotification(
+        message_id=queue_message["messageId"],
+        bundle=HANSBundle.parse_notification(queue_message["body"]),
+        care_provider_lookup=care_provider_lookup_from_message_attributes(
+            queue_message.get("messageAttributes", {})
+        ),
+    )
+
+
+def _batch_response(
+    results: List[NotificationResult], queue_messages: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html#services-sqs-batchfailurereporting
+
+    Only the records with transient failures are returned to the queue, so a retry
+    does not redo the work (or resend the emails) of the records which succeeded.
+    Records which can never succeed are moved to the dead-letter queue straight away
+    rather than using up their maxReceiveCount"""
+
+    failure_classifier = get_failure_classifier()
+    batch_item_failures = []
+    for result in results:
+        if result.succeeded:
+            continue
+
+        failure_class, reason = failure_classifier.classify(result.exception)
+        _LOGGER.exception(
+            str(result.exception),
+            exc_info=result.exception,
+            extra={
+                "message_id": result.message_id,
+                "failure_class": failure_class,
+                "failure_reason": reason,
+            },
+        )
+        if failure_class == FailureClass.PERMANENT and _dead_letter(
+            queue_messages[result.message_id], reason
+        ):
+            continue
+
+        batch_item_failures.append({"itemIdentifier": result.message_id})
+
+    _LOGGER.info(
+        "Processed batch",
+        extra={
+            "records": len(results),
+            "retried": len(batch_item_failures),
+            "failure_counts": failure_classifier.counts,
+        },
+    )
+    return {"batchItemFailures": batch_item_failures}
+
+
+def _dead_letter(queue_message: Dict[str, Any], reason: str) -> bool:
+    if not get_sqs_settings().dead_letter_queue_url:
+        _LOGGER.warning("No dead-letter queue configured, retrying permanent failure")
+        return False
+
+    try:
+        send_to_dead_letter_queue(queue_message, reason)
+    except (BotoCoreError, ClientError) as ex:
+        _LOGGER.exception(str(ex))
+        return False
+
+    return True
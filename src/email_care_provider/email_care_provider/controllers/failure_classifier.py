@@ -0,0 +1,71 @@
+import threading
+from collections import Counter
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from notifications_python_client.errors import HTTPError
+
+from email_care_provider.exceptions import MalformedHANSBundle
+from email_care_provider.internal_integrations.management_interface.exceptions import (
+    CareProviderLocationNotFound,
+    ManagementInterfaceRequestRefused,
+)
+
+
+class FailureClass(str, Enum):
+    # retrying can never succeed, the record goes straight to the dead-letter queue
+    PERMANENT = "permanent"
+    # timeouts, 5xx and throttling, the record goes back to the queue
+    TRANSIENT = "transient"
+
+
+class FailureClassifier:
+    """Classifies the failures of email_care_provider records, counting each class
+    for as long as the container lives"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def classify(self, exception: Exception) -> Tuple[FailureClass, str]:
+        failure_class, reason = _classify(exception)
+        with self._lock:
+            self._counts[failure_class] += 1
+        return failure_class, reason
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                failure_class.value: self._counts[failure_class]
+                for failure_class in FailureClass
+            }
+
+
+def _classify(exception: Exception) -> Tuple[FailureClass, str]:
+    if isinstance(exception, MalformedHANSBundle):
+        return FailureClass.PERMANENT, "MalformedHANSBundle"
+
+    if isinstance(exception, ManagementInterfaceRequestRefused):
+        return (
+            FailureClass.TRANSIENT,
+            f"ManagementInterfaceRequestRefused{exception.status_code}",
+        )
+
+    if isinstance(exception, CareProviderLocationNotFound):
+        return FailureClass.PERMANENT, "CareProviderLocationNotFound"
+
+    if (
+        isinstance(exception, HTTPError)
+        and 400 <= exception.status_code < 500
+        and exception.status_code != 429
+    ):
+        return FailureClass.PERMANENT, f"NotifyClientError{exception.status_code}"
+
+    return FailureClass.TRANSIENT, type(exception).__name__
+
+
+@lru_cache(maxsize=1)
+def get_failure_classifier() -> FailureClassifier:
+    return FailureClassifier()
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from aws_lambda_powertools import Logger
+
+from email_care_provider.controllers.notify_care_provider import (
+    NotifyCareProviderController,
+)
+from email_care_provider.controllers.pseudo_id.batch_pseudo_id_service import (
+    BatchPseudoIdService,
+)
+from email_care_provider.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+)
+from email_care_provider.schemas import HANSBundle
+from email_care_provider.settings import get_email_care_provider_settings
+
+_LOGGER = Logger()
+
+
+@dataclass(frozen=True)
+class QueuedNotification:
+    message_id: str
+    bundle: HANSBundle
+    care_provider_lookup: Optional[CareProviderLookup] = None
+
+
+@dataclass(frozen=True)
+class NotificationResult:
+    message_id: str
+    exception: Optional[Exception] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exception is None
+
+
+class NotifyBatchController:
+    """Sends the emails of an SQS batch concurrently through one shared
+    `NotifyCareProviderController`, so the batch takes about as long as its
+    slowest record"""
+
+    def __init__(
+        self,
+        notify_care_provider_controller: Optional[NotifyCareProviderController] = None,
+        batch_pseudo_id_service: Optional[BatchPseudoIdService] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.notify_care_provider_controller = (
+            notify_care_provider_controller or NotifyCareProviderController()
+        )
+        self.batch_pseudo_id_service = batch_pseudo_id_service or BatchPseudoIdService()
+        self.max_workers = max_workers or get_email_care_provider_settings().max_workers
+
+    def send_emails(
+        self, queued_notifications: List[QueuedNotification]
+    ) -> List[NotificationResult]:
+        if not queued_notifications:
+            return []
+
+        queued_notifications = self._with_pseudo_ids(queued_notifications)
+        workers = min(self.max_workers, len(queued_notifications))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._send_email, queued_notifications))
+
+    def _with_pseudo_ids(
+        self, queued_notifications: List[QueuedNotification]
+    ) -> List[QueuedNotification]:
+        # pseudo IDs not carried over from convert_hl7v2_fhir are computed up front
+        #  for the whole batch, in parallel
+        pseudo_ids = self.batch_pseudo_id_service.generate_pseudo_ids(
+            _patient_key(queued_notification.bundle)
+            for queued_notification in queued_notifications
+            if queued_notification.care_provider_lookup is None
+        )
+        return [
+            QueuedNotification(
+                message_id=queued_notification.message_id,
+                bundle=queued_notification.bundle,
+                care_provider_lookup=CareProviderLookup(
+                    care_recipient_pseudo_id=pseudo_ids[
+                        _patient_key(queued_notification.bundle)
+                    ]
+                ),
+            )
+            if queued_notification.care_provider_lookup is None
+            and _patient_key(queued_notification.bundle) in pseudo_ids
+            else queued_notification
+            for queued_notification in queued_notifications
+        ]
+
+    def _send_email(
+        self, queued_notification: QueuedNotification
+    ) -> NotificationResult:
+        bundle = queued_notification.bundle
+        try:
+            self.notify_care_provider_controller.send_email_to_care_provider(
+                patient_nhs_number=bundle.patient.identifier[0].value,
+                patient_given_name=bundle.patient.name[0].given[0],
+                patient_family_name=bundle.patient.name[0].family,
+                patient_birth_date=bundle.patient.birthDate,
+                location_name=bundle.location.name,
+                admitted_at=bundle.encounter.period.start,
+                care_provider_lookup=queued_notification.care_provider_lookup,
+            )
+        except Exception as ex:
+            return NotificationResult(
+                message_id=queued_notification.message_id, exception=ex
+            )
+
+        return NotificationResult(message_id=queued_notification.message_id)
+
+
+def _patient_key(bundle: HANSBundle):
+    return bundle.patient.identifier[0].value, bundle.patient.birthDate
+
+
+@lru_cache(maxsize=1)
+def get_notify_batch_controller() -> NotifyBatchController:
+    return NotifyBatchController()
@@ -3,13 +3,20 @@ from typing import Optional
 
 from notifications_python_client.notifications import NotificationsAPIClient
 
+from email_care_provider.controllers.pseudo_id.batch_pseudo_id_service import (
+    generate_pseudo_id,
+)
+from email_care_provider.external_integrations.notify.api_client import NotifyApiClient
 from email_care_provider.external_integrations.notify.settings import (
     get_notify_settings,
 )
 from email_care_provider.internal_integrations.management_interface.api_client import (
     ManagementInterfaceApiClient,
 )
-from hashlib import scrypt
+from email_care_provider.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+    CareProviderResponse,
+)
 
 
 class NotifyCareProviderController:
@@ -18,9 +25,9 @@ class NotifyCareProviderController:
         notifications_api_client: Optional[NotificationsAPIClient] = None,
         management_interface_api_client: Optional[ManagementInterfaceApiClient] = None,
     ):
-        self.notifications_api_client = (
-            notifications_api_client
-            or NotificationsAPIClient(api_key=get_notify_settings().api_key)
+        self.notifications_api_client = notifications_api_client or NotifyApiClient(
+            api_key=get_notify_settings().api_key,
+            base_url=get_notify_settings().base_url,
         )
         self.management_interface_api_client = (
             management_interface_api_client or ManagementInterfaceApiClient()
@@ -34,12 +41,13 @@ class NotifyCareProviderController:
         patient_family_name: str,
         patient_birth_date: date,
         location_name: str,
-        admitted_at: datetime
+        admitted_at: datetime,
+        care_provider_lookup: Optional[CareProviderLookup] = None,
     ) -> None:
-        care_provider_response = self.management_interface_api_client.get_care_provider(
-            care_recipient_pseudo_id=self._generate_pseudo_id(
-                nhs_number=patient_nhs_number, birth_date=patient_birth_date
-            )
+        care_provider_response = self._get_care_provider(
+            nhs_number=patient_nhs_number,
+            birth_date=patient_birth_date,
+            care_provider_lookup=care_provider_lookup,
         )
         self.notifications_api_client.send_email_notification(
             email_address=care_provider_response.telecom[0].value,
@@ -55,14 +63,26 @@ class NotifyCareProviderController:
             },
         )
 
+    def _get_care_provider(
+        self,
+        nhs_number: str,
+        birth_date: date,
+        care_provider_lookup: Optional[CareProviderLookup],
+    ) -> CareProviderResponse:
+        if care_provider_lookup is None:
+            care_provider_lookup = CareProviderLookup(
+                care_recipient_pseudo_id=self._generate_pseudo_id(
+                    nhs_number=nhs_number, birth_date=birth_date
+                )
+            )
+
+        if care_provider_lookup.care_provider is not None:
+            return care_provider_lookup.care_provider
+
+        return self.management_interface_api_client.get_care_provider(
+            care_recipient_pseudo_id=care_provider_lookup.care_recipient_pseudo_id
+        )
+
     @staticmethod
     def _generate_pseudo_id(nhs_number: str, birth_date: date) -> str:
-        # https://nhsx.github.io/il-hans-infrastructure/adrs/003-Do-not-use-NEMS-or-MESH
-        return scrypt(
-            nhs_number.encode(),
-            salt=str(birth_date).encode(),
-            n=32768,
-            r=12,
-            p=6,
-            maxmem=2**26,
-        ).hex()
+        return generate_pseudo_id(nhs_number, birth_date)
@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from hashlib import scrypt
+from typing import Dict, Iterable, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from email_care_provider.controllers.pseudo_id.settings import get_pseudo_id_settings
+
+_LOGGER = Logger()
+
+SCRYPT_MAXMEM = 2**26
+_MEGABYTE = 2**20
+
+PatientKey = Tuple[str, date]
+
+
+def generate_pseudo_id(nhs_number: str, birth_date: date) -> str:
+    # https://nhsx.github.io/il-hans-infrastructure/adrs/003-Do-not-use-NEMS-or-MESH
+    return scrypt(
+        nhs_number.encode(),
+        salt=str(birth_date).encode(),
+        n=32768,
+        r=12,
+        p=6,
+        maxmem=SCRYPT_MAXMEM,
+    ).hex()
+
+
+def memory_aware_worker_limit(
+    lambda_memory_size_mb: int, reserved_memory_mb: int
+) -> int:
+    """Number of scrypt calls that fit in memory at once, each may use up to maxmem"""
+    available = (lambda_memory_size_mb - reserved_memory_mb) * _MEGABYTE
+    return max(1, available // SCRYPT_MAXMEM)
+
+
+class BatchPseudoIdService:
+    """Computes the pseudo IDs of a whole SQS batch on a bounded thread pool,
+    scrypt releases the GIL so this scales with cores rather than records"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        settings = get_pseudo_id_settings()
+        self.max_workers = min(
+            max_workers or settings.max_workers or os.cpu_count() or 1,
+            memory_aware_worker_limit(
+                settings.lambda_memory_size_mb, settings.reserved_memory_mb
+            ),
+        )
+
+    def generate_pseudo_ids(
+        self, patients: Iterable[PatientKey]
+    ) -> Dict[PatientKey, str]:
+        """Patients whose pseudo ID could not be generated are left out"""
+        unique_patients = list(dict.fromkeys(patients))
+        if not unique_patients:
+            return {}
+
+        pseudo_ids = {}
+        workers = min(self.max_workers, len(unique_patients))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                patient: executor.submit(generate_pseudo_id, *patient)
+                for patient in unique_patients
+            }
+            for patient, future in futures.items():
+                try:
+                    pseudo_ids[patient] = future.result()
+                except (TypeError, ValueError) as ex:
+                    _LOGGER.warning("Could not generate pseudo ID: %s", ex)
+
+        return pseudo_ids
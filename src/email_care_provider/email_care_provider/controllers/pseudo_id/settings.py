@@ -0,0 +1,19 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings, Field
+
+
+class PseudoIdSettings(BaseSettings):
+    max_workers: Optional[int] = None
+    # left for the interpreter, HTTP clients and the SQS batch itself
+    reserved_memory_mb: int = 128
+    lambda_memory_size_mb: int = Field(128, env="AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+
+    class Config:
+        env_prefix = "PSEUDO_ID_"
+
+
+@lru_cache(maxsize=1)
+def get_pseudo_id_settings() -> PseudoIdSettings:
+    return PseudoIdSettings()
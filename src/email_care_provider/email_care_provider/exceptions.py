@@ -0,0 +1,6 @@
+class EmailCareProviderException(Exception):
+    pass
+
+
+class MalformedHANSBundle(EmailCareProviderException):
+    pass
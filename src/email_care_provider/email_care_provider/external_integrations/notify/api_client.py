@@ -0,0 +1,30 @@
+from typing import Optional
+
+import requests
+from aws_lambda_powertools import Logger
+from notifications_python_client.errors import HTTPError
+from notifications_python_client.notifications import NotificationsAPIClient
+
+_LOGGER = Logger()
+
+
+class NotifyApiClient(NotificationsAPIClient):
+    """NotificationsAPIClient sending its requests through one `requests.Session`,
+    so connections are kept alive and shared by concurrently processed records"""
+
+    def __init__(self, *args, session: Optional[requests.Session] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session: requests.Session = session or requests.Session()
+
+    def _perform_request(self, method, url, kwargs):
+        try:
+            response = self.session.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+        except requests.RequestException as ex:
+            api_error = HTTPError.create(ex)
+            _LOGGER.warning(
+                "notify request, response error",
+                extra={"status_code": api_error.status_code},
+            )
+            raise api_error
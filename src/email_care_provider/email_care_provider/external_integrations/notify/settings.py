@@ -9,6 +9,7 @@ class EmailTemplatesIDs:
 
 class NotifySettings(BaseSettings):
     api_key: str
+    base_url: str = "https://api.notifications.service.gov.uk"
     email_templates = EmailTemplatesIDs
 
     class Config:
@@ -1,7 +1,98 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
 from requests.adapters import HTTPAdapter, Retry
+from requests.exceptions import Timeout
 
 DEFAULT_TIMEOUT = 5
-DEFAULT_RETRY_STRATEGY = Retry(
+# kept back from the Lambda deadline for the handler to answer after a failure
+DEFAULT_DEADLINE_MARGIN = 2
+
+# time.monotonic() by when requests must have finished. A Lambda container
+#  handles one event at a time, so this is shared by the threads handling it
+_deadline: Optional[float] = None
+# the timeout of the request being sent by this thread, which its retries reuse
+_attempt = threading.local()
+
+
+class DeadlineExceeded(Timeout):
+    pass
+
+
+def remaining_seconds() -> Optional[float]:
+    """Time left until the deadline, `None` when there is no deadline."""
+
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+
+@contextmanager
+def lambda_deadline(
+    context: Any, margin: float = DEFAULT_DEADLINE_MARGIN
+) -> Iterator[None]:
+    """Makes requests sent within it finish `margin` seconds before the
+    Lambda times out. Contexts without a numeric remaining time (e.g. mocks
+    in tests) set no deadline."""
+
+    global _deadline
+    get_remaining_time_in_millis = getattr(
+        context, "get_remaining_time_in_millis", None
+    )
+    remaining_millis = (
+        get_remaining_time_in_millis()
+        if callable(get_remaining_time_in_millis)
+        else None
+    )
+    previous_deadline = _deadline
+    if isinstance(remaining_millis, (int, float)):
+        _deadline = time.monotonic() + remaining_millis / 1000 - margin
+    try:
+        yield
+    finally:
+        _deadline = previous_deadline
+
+
+def with_lambda_deadline(handler: Callable) -> Callable:
+    @wraps(handler)
+    def wrapper(event: dict, context: Any):
+        with lambda_deadline(context):
+            return handler(event, context)
+
+    return wrapper
+
+
+class DeadlineRetry(Retry):
+    """Only retries, and backs off, for as long as another attempt with the
+    request's timeout still fits before the deadline."""
+
+    def is_exhausted(self) -> bool:
+        if super().is_exhausted():
+            return True
+
+        remaining = remaining_seconds()
+        return remaining is not None and (
+            remaining - self.get_backoff_time() < _attempt_seconds()
+        )
+
+    def get_backoff_time(self) -> float:
+        return self._fit_to_deadline(super().get_backoff_time())
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else self._fit_to_deadline(retry_after)
+
+    def _fit_to_deadline(self, seconds: float) -> float:
+        remaining = remaining_seconds()
+        if remaining is None:
+            return seconds
+        return max(min(seconds, remaining - _attempt_seconds()), 0)
+
+
+DEFAULT_RETRY_STRATEGY = DeadlineRetry(
     total=5,
     status_forcelist=[429, 500, 502, 503, 504],
     allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
@@ -21,5 +112,35 @@ class TimeoutHTTPAdapter(HTTPAdapter):
     def send(self, request, **kwargs):
         timeout = kwargs.get("timeout")
         if timeout is None:
-            kwargs["timeout"] = self.timeout
+            timeout = self.timeout
+
+        remaining = remaining_seconds()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(
+                    "No time left before the deadline", request=request
+                )
+            timeout = _shorten_timeout(timeout, remaining)
+
+        _attempt.seconds = _longest_timeout(timeout)
+        kwargs["timeout"] = timeout
         return super().send(request, **kwargs)
+
+
+def _shorten_timeout(timeout: Any, remaining: float) -> Any:
+    # requests takes a total, or (connect, read), timeout
+    if isinstance(timeout, tuple):
+        return tuple(_shorten_timeout(part, remaining) for part in timeout)
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+def _longest_timeout(timeout: Any) -> float:
+    if isinstance(timeout, tuple):
+        return max(_longest_timeout(part) for part in timeout)
+    return DEFAULT_TIMEOUT if timeout is None else timeout
+
+
+def _attempt_seconds() -> float:
+    return getattr(_attempt, "seconds", DEFAULT_TIMEOUT)
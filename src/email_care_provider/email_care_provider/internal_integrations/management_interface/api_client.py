@@ -4,9 +4,14 @@ import requests
 from aws_lambda_powertools import Logger
 
 from email_care_provider.http_adapter import TimeoutHTTPAdapter, DEFAULT_RETRY_STRATEGY
+from email_care_provider.internal_integrations.management_interface.circuit_breaker import (
+    CircuitBreaker,
+    get_circuit_breaker,
+)
 from email_care_provider.internal_integrations.management_interface.exceptions import (
     CareProviderLocationNotFound,
     ManagementInterfaceNotAvailable,
+    ManagementInterfaceRequestRefused,
 )
 from email_care_provider.internal_integrations.management_interface.schemas import (
     CareProviderResponse,
@@ -17,25 +22,46 @@ from email_care_provider.internal_integrations.management_interface.settings imp
 
 _LOGGER = Logger()
 
+_REFUSED_STATUS_CODES = (401, 403, 429)
+
 
 class ManagementInterfaceApiClient:
     def __init__(
         self,
         base_url: Optional[str] = None,
         session: Optional[requests.Session] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
         self.session: requests.Session = session or requests.Session()
         _adapter = TimeoutHTTPAdapter(max_retries=DEFAULT_RETRY_STRATEGY)
         self.session.mount("http://", _adapter)
         self.session.mount("https://", _adapter)
         self.base_url: str = base_url or get_management_interface_settings().base_url
+        self.circuit_breaker: Optional[CircuitBreaker] = (
+            circuit_breaker or get_circuit_breaker()
+        )
 
     def get_care_provider(
         self, *, care_recipient_pseudo_id: str
     ) -> CareProviderResponse:
+        if self.circuit_breaker is None:
+            return self._get_care_provider(care_recipient_pseudo_id)
+
+        return self.circuit_breaker.call(
+            lambda: self._get_care_provider(care_recipient_pseudo_id)
+        )
+
+    def _get_care_provider(self, care_recipient_pseudo_id: str) -> CareProviderResponse:
         url = f"{self.base_url}/care-provider-location/_search/"
         data = {"_careRecipientPseudoId": care_recipient_pseudo_id}
         response = self.session.post(url, data=data)
+        if response.status_code in _REFUSED_STATUS_CODES:
+            _LOGGER.warning(
+                "get_care_provider, request refused",
+                extra={"status_code": response.status_code},
+            )
+            raise ManagementInterfaceRequestRefused(response.status_code)
+
         if response.status_code in range(400, 500):
             _LOGGER.warning(
                 "get_care_provider, response error",
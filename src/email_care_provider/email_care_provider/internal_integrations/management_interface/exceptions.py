@@ -8,3 +8,17 @@ class CareProviderLocationNotFound(ManagementInterfaceApiClientException):
 
 class ManagementInterfaceNotAvailable(ManagementInterfaceApiClientException):
     pass
+
+
+class ManagementInterfaceCircuitOpen(ManagementInterfaceNotAvailable):
+    pass
+
+
+class ManagementInterfaceRequestRefused(ManagementInterfaceNotAvailable):
+    """The management interface refused to answer, e.g. throttled (429) or
+    credentials it does not accept (401, 403), rather than having no care
+    provider for the care recipient"""
+
+    def __init__(self, status_code: int):
+        super().__init__(status_code)
+        self.status_code = status_code
@@ -1,10 +1,14 @@
+from enum import Enum
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import BaseSettings
 
 
 class ManagementInterfaceSettings(BaseSettings):
     base_url: str = "http://localhost:8000"
+    # how long a care provider looked up by convert_hl7v2_fhir can be reused for
+    care_provider_max_age_seconds: int = 15 * 60
 
     class Config:
         env_prefix = "MANAGEMENT_INTERFACE_"
@@ -13,3 +17,29 @@ class ManagementInterfaceSettings(BaseSettings):
 @lru_cache(maxsize=1)
 def get_management_interface_settings() -> ManagementInterfaceSettings:
     return ManagementInterfaceSettings()
+
+
+class CircuitBreakerBackend(str, Enum):
+    NONE = "none"
+    MEMORY = "memory"
+    DYNAMODB = "dynamodb"
+
+
+class CircuitBreakerSettings(BaseSettings):
+    backend: CircuitBreakerBackend = CircuitBreakerBackend.MEMORY
+    # consecutive failed calls that open the circuit
+    failure_threshold: int = 5
+    # how long the circuit stays open before a call is let through to try it
+    open_seconds: int = 30
+    # how often an open circuit shared by other containers is looked for
+    refresh_seconds: int = 5
+    # shared by every container, partition key "circuit_name"
+    dynamodb_table_name: Optional[str] = None
+
+    class Config:
+        env_prefix = "MANAGEMENT_INTERFACE_CIRCUIT_BREAKER_"
+
+
+@lru_cache(maxsize=1)
+def get_circuit_breaker_settings() -> CircuitBreakerSettings:
+    return CircuitBreakerSettings()
@@ -0,0 +1,28 @@
+from typing import Any, Dict
+
+from boto3 import client
+
+from email_care_provider.internal_integrations.sqs.settings import get_sqs_settings
+
+FAILURE_REASON_ATTRIBUTE = "FailureReason"
+
+
+def send_to_dead_letter_queue(queue_message: Dict[str, Any], reason: str) -> None:
+    """Moves an SQS record to the dead-letter queue, keeping its message attributes"""
+    message_attributes = {
+        name: {
+            "DataType": attribute["dataType"],
+            "StringValue": attribute["stringValue"],
+        }
+        for name, attribute in queue_message.get("messageAttributes", {}).items()
+        if attribute.get("stringValue") is not None
+    }
+    message_attributes[FAILURE_REASON_ATTRIBUTE] = {
+        "DataType": "String",
+        "StringValue": reason,
+    }
+    client("sqs").send_message(
+        QueueUrl=get_sqs_settings().dead_letter_queue_url,
+        MessageBody=queue_message["body"],
+        MessageAttributes=message_attributes,
+    )
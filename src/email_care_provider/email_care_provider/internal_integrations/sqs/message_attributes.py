@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from aws_lambda_powertools import Logger
+from pydantic import ValidationError
+
+from email_care_provider.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+    CareProviderResponse,
+)
+from email_care_provider.internal_integrations.management_interface.settings import (
+    get_management_interface_settings,
+)
+
+_LOGGER = Logger()
+
+# must match the version written by convert_hl7v2_fhir
+MESSAGE_ATTRIBUTES_VERSION = "1"
+
+
+class MessageAttributeName:
+    VERSION = "HANSMessageAttributesVersion"
+    CARE_RECIPIENT_PSEUDO_ID = "CareRecipientPseudoId"
+    CARE_PROVIDER = "CareProvider"
+    CARE_PROVIDER_RETRIEVED_AT = "CareProviderRetrievedAt"
+
+
+def care_provider_lookup_from_message_attributes(
+    message_attributes: Dict[str, Dict[str, Any]]
+) -> Optional[CareProviderLookup]:
+    """Reads the lookup done by convert_hl7v2_fhir from SQS record message attributes,
+    dropping the care provider if it is stale or cannot be parsed"""
+
+    def _string_value(name: str) -> Optional[str]:
+        return message_attributes.get(name, {}).get("stringValue")
+
+    if _string_value(MessageAttributeName.VERSION) != MESSAGE_ATTRIBUTES_VERSION:
+        return None
+
+    care_recipient_pseudo_id = _string_value(
+        MessageAttributeName.CARE_RECIPIENT_PSEUDO_ID
+    )
+    if not care_recipient_pseudo_id:
+        return None
+
+    care_provider_lookup = CareProviderLookup(
+        care_recipient_pseudo_id=care_recipient_pseudo_id
+    )
+    care_provider = _string_value(MessageAttributeName.CARE_PROVIDER)
+    retrieved_at = _string_value(MessageAttributeName.CARE_PROVIDER_RETRIEVED_AT)
+    if not care_provider or not retrieved_at:
+        return care_provider_lookup
+
+    try:
+        retrieved_at = datetime.fromtimestamp(float(retrieved_at), tz=timezone.utc)
+        max_age = timedelta(
+            seconds=get_management_interface_settings().care_provider_max_age_seconds
+        )
+        if datetime.now(timezone.utc) - retrieved_at > max_age:
+            return care_provider_lookup
+
+        care_provider_lookup.care_provider = CareProviderResponse.parse_raw(
+            care_provider
+        )
+        care_provider_lookup.retrieved_at = retrieved_at
+    except (ValueError, ValidationError) as ex:
+        _LOGGER.warning("Ignoring malformed care provider message attribute: %s", ex)
+
+    return care_provider_lookup
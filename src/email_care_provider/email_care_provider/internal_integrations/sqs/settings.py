@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class SQSSettings(BaseSettings):
+    # permanent failures are retried like transient ones when not set
+    dead_letter_queue_url: Optional[str] = None
+
+    class Config:
+        env_prefix = "SQS_"
+
+
+@lru_cache(maxsize=1)
+def get_sqs_settings() -> SQSSettings:
+    return SQSSettings()
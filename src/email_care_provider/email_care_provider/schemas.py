@@ -3,6 +3,8 @@ from fhir.resources.patient import Patient
 from fhir.resources.location import Location
 from fhir.resources.encounter import Encounter
 
+from email_care_provider.exceptions import MalformedHANSBundle
+
 
 class HANSBundle(Bundle):
     @property
@@ -16,3 +18,24 @@ class HANSBundle(Bundle):
     @property
     def encounter(self) -> Encounter:
         return self.entry[4].resource
+
+    @classmethod
+    def parse_notification(cls, raw: str) -> "HANSBundle":
+        """Parses a queued bundle, making sure it has everything the notification needs"""
+        try:
+            bundle = cls.parse_raw(raw)
+            required_values = (
+                bundle.patient.identifier[0].value,
+                bundle.patient.name[0].given[0],
+                bundle.patient.name[0].family,
+                bundle.patient.birthDate,
+                bundle.location.name,
+                bundle.encounter.period.start,
+            )
+        except (ValueError, TypeError, IndexError, AttributeError) as ex:
+            raise MalformedHANSBundle(str(ex)) from ex
+
+        if any(value is None for value in required_values):
+            raise MalformedHANSBundle("Required notification value was missing")
+
+        return bundle
@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class EmailCareProviderSettings(BaseSettings):
+    # records of an SQS batch processed at the same time, the batch size is at most 10
+    max_workers: int = 10
+
+    class Config:
+        env_prefix = "EMAIL_CARE_PROVIDER_"
+
+
+@lru_cache(maxsize=1)
+def get_email_care_provider_settings() -> EmailCareProviderSettings:
+    return EmailCareProviderSettings()
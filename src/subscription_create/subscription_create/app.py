@@ -1,9 +1,14 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
 from uuid import uuid4
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
+from fhir.resources.bundle import Bundle, BundleEntry, BundleEntryResponse
+from fhir.resources.operationoutcome import OperationOutcome, OperationOutcomeIssue
 from pydantic import ValidationError
 from pydantic.env_settings import SettingsError
+from requests import RequestException
 from urllib3.exceptions import MaxRetryError
 
 from subscription_create.controllers.exceptions import (
@@ -13,15 +18,36 @@ from subscription_create.controllers.exceptions import (
     BirthDateMissmatch,
     NameMissmatch,
 )
-from subscription_create.controllers.verify_patient import VerifyPatientController
+from subscription_create.controllers.verify_patient import (
+    PatientToVerify,
+    VerifyPatientController,
+)
+from subscription_create.http_adapter import with_lambda_deadline
 from subscription_create.schemas import HANSPatient
+from subscription_create.settings import get_subscription_create_settings
 from subscription_create.utils import operation_outcome_lambda_response_factory
 
 _LOGGER = Logger()
 verify_patient_controller = VerifyPatientController()
 
 
+class _ErrorResponse(NamedTuple):
+    status_code: int
+    severity: str
+    code: str
+    diagnostics: str
+
+
+_UNKNOWN_ERROR_RESPONSE = _ErrorResponse(
+    status_code=500,
+    severity="error",
+    code="exception",
+    diagnostics="Unknown error occurred",
+)
+
+
 @_LOGGER.inject_lambda_context(log_event=False)
+@with_lambda_deadline
 def lambda_handler(event: dict, context: LambdaContext):
     try:
         patient = HANSPatient.parse_raw(event["body"])
@@ -31,50 +57,200 @@ def lambda_handler(event: dict, context: LambdaContext):
             birth_date=patient.birthDate,
         )
         return {"statusCode": 201, "headers": {"X-Subscription-Id": str(uuid4())}}
-    except ValidationError as ex:
+    except Exception as ex:
+        error_response = _to_error_response(ex)
+        if error_response is None:
+            raise
+        return operation_outcome_lambda_response_factory(**error_response._asdict())
+
+
+@_LOGGER.inject_lambda_context(log_event=False)
+@with_lambda_deadline
+def bundle_handler(event: dict, context: LambdaContext):
+    """Creates a subscription for each HANS Patient of a FHIR batch or
+    transaction Bundle, verifying them against PDS at the same time.
+
+    A batch is answered with a batch-response Bundle, with the subscription
+    ID or an OperationOutcome for each entry. A transaction only succeeds if
+    every entry does, otherwise it is answered with an OperationOutcome with
+    an issue for each entry that failed."""
+
+    settings = get_subscription_create_settings()
+    try:
+        bundle = json.loads(event["body"])
+        bundle_type = bundle.get("type")
+        entries = bundle.get("entry", [])
+        if not isinstance(entries, list):
+            raise TypeError("Bundle.entry must be a list")
+    except (TypeError, ValueError, AttributeError):
         return operation_outcome_lambda_response_factory(
-            status_code=400, severity="error", code="value", diagnostics=str(ex)
+            status_code=400,
+            severity="error",
+            code="structure",
+            diagnostics="Body must be a FHIR Bundle",
         )
-    except IncorrectNHSNumber:
+
+    if bundle.get("resourceType") != "Bundle" or bundle_type not in (
+        "batch",
+        "transaction",
+    ):
         return operation_outcome_lambda_response_factory(
             status_code=400,
             severity="error",
             code="value",
-            diagnostics="NHS Number provided was invalid",
+            diagnostics="Bundle type must be batch or transaction",
         )
-    except BirthDateMissmatch:
+
+    if len(entries) > settings.max_bundle_entries:
         return operation_outcome_lambda_response_factory(
+            status_code=400,
+            severity="error",
+            code="too-costly",
+            diagnostics=f"Bundle must have at most {settings.max_bundle_entries} "
+            "entries",
+        )
+
+    error_responses: List[Optional[_ErrorResponse]] = [None] * len(entries)
+    patients_to_verify: Dict[int, PatientToVerify] = {}
+    for index, entry in enumerate(entries):
+        try:
+            patients_to_verify[index] = _to_patient_to_verify(entry)
+        except Exception as ex:
+            error_responses[index] = _to_error_response(ex) or _ErrorResponse(
+                status_code=400,
+                severity="error",
+                code="structure",
+                diagnostics="Entry must be a POST of a HANS Patient",
+            )
+
+    errors = verify_patient_controller.verify_patients_data(
+        list(patients_to_verify.values()), max_workers=settings.max_workers
+    )
+    for index, error in zip(patients_to_verify, errors):
+        if error is not None:
+            error_responses[index] = (
+                _to_error_response(error) or _UNKNOWN_ERROR_RESPONSE
+            )
+
+    if bundle_type == "transaction" and any(error_responses):
+        return _transaction_error_response(error_responses)
+
+    return {
+        "statusCode": 200,
+        "body": Bundle(
+            type=f"{bundle_type}-response",
+            entry=[
+                BundleEntry(response=_to_bundle_entry_response(error_response))
+                for error_response in error_responses
+            ],
+        ).json(),
+    }
+
+
+def _to_patient_to_verify(entry: dict) -> PatientToVerify:
+    if entry.get("request", {}).get("method", "POST") != "POST":
+        raise ValueError("Entry request method must be POST")
+
+    patient = HANSPatient.parse_obj(entry["resource"])
+    return PatientToVerify(
+        nhs_number=patient.identifier[0].value,
+        patient_name=patient.name[0],
+        birth_date=patient.birthDate,
+    )
+
+
+def _to_bundle_entry_response(
+    error_response: Optional[_ErrorResponse],
+) -> BundleEntryResponse:
+    if error_response is None:
+        return BundleEntryResponse(status="201 Created", location=uuid4().urn)
+
+    return BundleEntryResponse(
+        status=str(error_response.status_code),
+        outcome=OperationOutcome(
+            issue=[
+                OperationOutcomeIssue(
+                    severity=error_response.severity,
+                    code=error_response.code,
+                    diagnostics=error_response.diagnostics,
+                )
+            ]
+        ),
+    )
+
+
+def _transaction_error_response(
+    error_responses: List[Optional[_ErrorResponse]],
+) -> Dict[str, Any]:
+    failed = [
+        (index, error_response)
+        for index, error_response in enumerate(error_responses)
+        if error_response is not None
+    ]
+    return {
+        "statusCode": max(error_response.status_code for _, error_response in failed),
+        "body": OperationOutcome(
+            issue=[
+                OperationOutcomeIssue(
+                    severity=error_response.severity,
+                    code=error_response.code,
+                    diagnostics=error_response.diagnostics,
+                    expression=[f"Bundle.entry[{index}]"],
+                )
+                for index, error_response in failed
+            ]
+        ).json(),
+    }
+
+
+def _to_error_response(ex: Exception) -> Optional[_ErrorResponse]:
+    if isinstance(ex, ValidationError):
+        return _ErrorResponse(
+            status_code=400, severity="error", code="value", diagnostics=str(ex)
+        )
+
+    if isinstance(ex, IncorrectNHSNumber):
+        return _ErrorResponse(
+            status_code=400,
+            severity="error",
+            code="value",
+            diagnostics="NHS Number provided was invalid",
+        )
+
+    if isinstance(ex, BirthDateMissmatch):
+        return _ErrorResponse(
             status_code=400,
             severity="error",
             code="business-rule",
             diagnostics="Date of birth did not match",
         )
-    except NameMissmatch:
-        return operation_outcome_lambda_response_factory(
+
+    if isinstance(ex, NameMissmatch):
+        return _ErrorResponse(
             status_code=400,
             severity="error",
             code="business-rule",
             diagnostics="Name did not match",
         )
-    except PatientNotFound:
-        return operation_outcome_lambda_response_factory(
+
+    if isinstance(ex, PatientNotFound):
+        return _ErrorResponse(
             status_code=404,
             severity="error",
             code="not-found",
             diagnostics="NHS Number did not exist on PDS",
         )
-    except (MaxRetryError, InternalError) as ex:
+
+    if isinstance(ex, (MaxRetryError, InternalError, RequestException)):
         _LOGGER.exception(str(ex))
-        return operation_outcome_lambda_response_factory(
-            status_code=500,
-            severity="error",
-            code="exception",
-            diagnostics="Unknown error occurred",
-        )
-    except SettingsError as ex:
-        return operation_outcome_lambda_response_factory(
+        return _UNKNOWN_ERROR_RESPONSE
+
+    if isinstance(ex, SettingsError):
+        return _ErrorResponse(
             status_code=500,
             severity="exception",
             code="value",
             diagnostics=str(ex),
         )
+
+    return None
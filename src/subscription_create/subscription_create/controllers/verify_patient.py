@@ -1,5 +1,8 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from aws_lambda_powertools import Logger
 
 from fhir.resources.humanname import HumanName
 
@@ -19,19 +22,99 @@ from subscription_create.external_integrations.pds.exceptions import (
     UnknownPDSError,
     PDSUnavailable,
 )
+from subscription_create.external_integrations.pds.patient_details_cache import (
+    PatientDetailsCache,
+    create_patient_details_cache,
+)
+from subscription_create.external_integrations.pds.schemas import (
+    PatientDetailsResponse,
+)
+
+_LOGGER = Logger()
+
+
+class PatientToVerify(NamedTuple):
+    nhs_number: str
+    patient_name: HumanName
+    birth_date: date
 
 
 class VerifyPatientController:
     _NAME_USES_TO_IGNORE = {"old", "temp"}
 
-    def __init__(self, pds_api_client: Optional[PDSApiClient] = None):
+    def __init__(
+        self,
+        pds_api_client: Optional[PDSApiClient] = None,
+        patient_details_cache: Optional[PatientDetailsCache] = None,
+    ):
         self.pds_api_client: PDSApiClient = pds_api_client or PDSApiClient()
+        # not `or`, an empty cache is falsy as it has a length
+        self.patient_details_cache = (
+            patient_details_cache
+            if patient_details_cache is not None
+            else create_patient_details_cache(self.pds_api_client)
+        )
 
     def verify_patient_data(
         self, *, nhs_number: str, patient_name: HumanName, birth_date: date
     ) -> None:
         try:
-            patient_details = self.pds_api_client.get_patient_details(nhs_number)
+            patient_details = self._get_patient_details(nhs_number)
+        finally:
+            self._log_cache_usage()
+
+        self._check_patient_details(
+            patient_details, patient_name=patient_name, birth_date=birth_date
+        )
+
+    def verify_patients_data(
+        self, patients: List[PatientToVerify], max_workers: int = 4
+    ) -> List[Optional[Exception]]:
+        """Verifies the patients `max_workers` at a time, returning what
+        `verify_patient_data` would have raised for each, or `None`. PDS is
+        asked about each NHS number once, however many patients have it."""
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                lookups: Dict[str, "Future[PatientDetailsResponse]"] = {
+                    nhs_number: executor.submit(self._get_patient_details, nhs_number)
+                    for nhs_number in dict.fromkeys(
+                        patient.nhs_number for patient in patients
+                    )
+                }
+        finally:
+            self._log_cache_usage()
+
+        errors: List[Optional[Exception]] = []
+        for patient in patients:
+            try:
+                self._check_patient_details(
+                    lookups[patient.nhs_number].result(),
+                    patient_name=patient.patient_name,
+                    birth_date=patient.birth_date,
+                )
+                errors.append(None)
+            except Exception as ex:
+                errors.append(ex)
+
+        _LOGGER.info(
+            "Verified patients",
+            extra={
+                "patients": len(patients),
+                "nhs_numbers": len(lookups),
+                "failed": sum(error is not None for error in errors),
+            },
+        )
+        return errors
+
+    def _get_patient_details(self, nhs_number: str) -> PatientDetailsResponse:
+        patient_details_source: Union[PDSApiClient, PatientDetailsCache] = (
+            self.patient_details_cache
+            if self.patient_details_cache is not None
+            else self.pds_api_client
+        )
+        try:
+            return patient_details_source.get_patient_details(nhs_number)
         except (InvalidNHSNumber, MissingNHSNumber):
             raise IncorrectNHSNumber
         except (PatientDoesNotExist, PatientDidButNoLongerExists):
@@ -39,6 +122,13 @@ class VerifyPatientController:
         except (UnknownPDSError, PDSUnavailable):
             raise InternalError
 
+    def _check_patient_details(
+        self,
+        patient_details: PatientDetailsResponse,
+        *,
+        patient_name: HumanName,
+        birth_date: date,
+    ) -> None:
         if not birth_date == patient_details.birthDate:
             raise BirthDateMissmatch
 
@@ -49,6 +139,21 @@ class VerifyPatientController:
         ):
             raise NameMissmatch
 
+    def _log_cache_usage(self) -> None:
+        if self.patient_details_cache is None:
+            return
+
+        _LOGGER.info(
+            "Patient details cache usage",
+            extra={
+                "hits": self.patient_details_cache.hits,
+                "misses": self.patient_details_cache.misses,
+                "hit_ratio": round(self.patient_details_cache.hit_ratio, 3),
+                "revalidated": self.patient_details_cache.revalidated,
+                "stale_served": self.patient_details_cache.stale_served,
+            },
+        )
+
     @staticmethod
     def _do_human_names_match(human_name_1: HumanName, human_name_2: HumanName) -> bool:
         if human_name_1.family.lower() != human_name_2.family.lower():
@@ -1,5 +1,4 @@
 import uuid
-from datetime import datetime, timedelta
 from typing import Optional
 
 import jwt
@@ -16,8 +15,13 @@ from subscription_create.external_integrations.pds.exceptions import (
 from subscription_create.external_integrations.pds.schemas import (
     PatientDetailsResponse,
     AccessTokenResponse,
+    VersionedPatientDetails,
 )
 from subscription_create.external_integrations.pds.settings import get_pds_settings
+from subscription_create.external_integrations.pds.token_store import (
+    AccessTokenStore,
+    get_access_token_store,
+)
 from subscription_create.http_adapter import TimeoutHTTPAdapter, DEFAULT_RETRY_STRATEGY
 
 _LOGGER = Logger()
@@ -28,22 +32,37 @@ class PDSApiClient:
         self,
         base_url: Optional[HttpUrl] = None,
         session: Optional[requests.Session] = None,
+        access_token_store: Optional[AccessTokenStore] = None,
     ):
         self.session: requests.Session = session or requests.Session()
         _adapter = TimeoutHTTPAdapter(max_retries=DEFAULT_RETRY_STRATEGY)
         self.session.mount("http://", _adapter)
         self.session.mount("https://", _adapter)
         self.base_url: HttpUrl = base_url or get_pds_settings().base_url
-        self._access_token: Optional[str] = None
-        self._access_token_expires_at: Optional[datetime] = None
+        self.access_token_store: AccessTokenStore = (
+            access_token_store or get_access_token_store()
+        )
 
     def get_patient_details(self, nhs_number: str) -> PatientDetailsResponse:
+        return self.get_versioned_patient_details(nhs_number).patient_details
+
+    def get_versioned_patient_details(
+        self, nhs_number: str, if_none_match: Optional[str] = None
+    ) -> Optional[VersionedPatientDetails]:
+        """Returns `None` when `if_none_match` is the current ETag of the
+        patient, i.e. PDS answered 304 Not Modified."""
+
         url = f"{self.base_url}/personal-demographics/FHIR/R4/Patient/{nhs_number}"
         headers = {
             "Authorization": f"Bearer {self._get_valid_access_token()}",
             "X-Request-ID": str(uuid.uuid4()),
         }
+        if if_none_match is not None:
+            headers["If-None-Match"] = if_none_match
         response = self.session.get(url=url, headers=headers)
+        if response.status_code == 304:
+            return None
+
         if response.status_code in range(400, 500):
             operation_outcome = OperationOutcome(**response.json())
             _LOGGER.warning(
@@ -59,8 +78,12 @@ class PDSApiClient:
             )
             raise PDSUnavailable
 
-        response_json = response.json()
-        return PatientDetailsResponse(**response_json)
+        patient_details = PatientDetailsResponse(**response.json())
+        etag = response.headers.get("ETag")
+        if etag is None and patient_details.meta and patient_details.meta.versionId:
+            # PDS sends the version as a weak ETag, W/"<versionId>"
+            etag = f'W/"{patient_details.meta.versionId}"'
+        return VersionedPatientDetails(patient_details=patient_details, etag=etag)
 
     def post_oauth2_token(self, encoded_jwt: str) -> AccessTokenResponse:
         url = f"{self.base_url}/oauth2/token"
@@ -81,32 +104,9 @@ class PDSApiClient:
         return AccessTokenResponse(**response.json())
 
     def _get_valid_access_token(self) -> str:
-        if (
-            self._access_token_expires_at is not None
-            and self._access_token_expires_at > datetime.utcnow()
-        ):
-            _LOGGER.info("Reusing valid access token")
-            return self._access_token
-
-        _LOGGER.info(
-            "Creating new access token",
-            extra={
-                "_access_token_expires_at": self._access_token_expires_at,
-            },
-        )
-        access_token_response = self.post_oauth2_token(encoded_jwt=self._generate_jwt())
-        self._access_token = access_token_response.access_token
-        self._access_token_expires_at = datetime.utcnow() + timedelta(
-            seconds=access_token_response.expires_in
+        return self.access_token_store.get_access_token(
+            lambda: self.post_oauth2_token(encoded_jwt=self._generate_jwt())
         )
-        _LOGGER.info(
-            "Created new access token",
-            extra={
-                "_access_token_expires_at": self._access_token_expires_at,
-            },
-        )
-
-        return self._access_token
 
     @staticmethod
     def _generate_jwt() -> str:
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional, Set
+
+import requests
+from aws_lambda_powertools import Logger
+
+from subscription_create.external_integrations.pds.api_client import PDSApiClient
+from subscription_create.external_integrations.pds.exceptions import (
+    PDSUnavailable,
+    UnknownPDSError,
+)
+from subscription_create.external_integrations.pds.schemas import (
+    PatientDetailsResponse,
+    VersionedPatientDetails,
+)
+from subscription_create.external_integrations.pds.settings import (
+    get_patient_details_cache_settings,
+)
+
+_LOGGER = Logger()
+
+# PDS could not be asked (or did not answer), as opposed to answering that the
+#  patient does not exist
+_TRANSIENT_ERRORS = (PDSUnavailable, UnknownPDSError, requests.RequestException)
+
+
+class _Entry(NamedTuple):
+    versioned_patient_details: VersionedPatientDetails
+    fetched_at: float
+
+
+class PatientDetailsCache:
+    """Bounded, TTL evicted cache in front of `PDSApiClient.get_patient_details`.
+
+    Within `ttl_seconds` of being fetched an entry is served without asking
+    PDS. Up to `stale_while_revalidate_seconds` after that it is still served,
+    while it is revalidated in the background, and after that it is
+    revalidated before being served. Revalidation sends the ETag as
+    If-None-Match, so an unchanged patient costs PDS a 304 rather than the
+    full record. When PDS fails or times out, entries younger than
+    `stale_if_error_seconds` are served rather than the error."""
+
+    def __init__(
+        self,
+        pds_api_client: PDSApiClient,
+        max_size: int = 1024,
+        ttl_seconds: int = 5 * 60,
+        stale_while_revalidate_seconds: int = 5 * 60,
+        stale_if_error_seconds: int = 60 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.pds_api_client = pds_api_client
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stale_while_revalidate_seconds = stale_while_revalidate_seconds
+        self.stale_if_error_seconds = stale_if_error_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._revalidating: Set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        # revalidations PDS answered with 304 Not Modified
+        self.revalidated = 0
+        # served when PDS could not be reached
+        self.stale_served = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        requests_made = self.hits + self.misses
+        return self.hits / requests_made if requests_made else 0.0
+
+    def get_patient_details(self, nhs_number: str) -> PatientDetailsResponse:
+        with self._lock:
+            entry = self._get(nhs_number)
+            age = self._clock() - entry.fetched_at if entry else None
+            if entry is not None and age < self.ttl_seconds:
+                self.hits += 1
+                return entry.versioned_patient_details.patient_details
+
+            if entry is not None and age < (
+                self.ttl_seconds + self.stale_while_revalidate_seconds
+            ):
+                self.hits += 1
+                self._revalidate_in_background(nhs_number, entry)
+                return entry.versioned_patient_details.patient_details
+
+            self.misses += 1
+
+        try:
+            return self._revalidate(nhs_number, entry).patient_details
+        except _TRANSIENT_ERRORS as ex:
+            if entry is None or age >= self.stale_if_error_seconds:
+                raise
+
+            _LOGGER.warning("Serving stale patient details, PDS failed: %r", ex)
+            with self._lock:
+                self.stale_served += 1
+            return entry.versioned_patient_details.patient_details
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _revalidate(
+        self, nhs_number: str, entry: Optional[_Entry]
+    ) -> VersionedPatientDetails:
+        etag = entry.versioned_patient_details.etag if entry else None
+        try:
+            versioned_patient_details = (
+                self.pds_api_client.get_versioned_patient_details(
+                    nhs_number, if_none_match=etag
+                )
+            )
+        except _TRANSIENT_ERRORS:
+            raise
+        except Exception:
+            # e.g. the patient no longer exists, which must not be served
+            with self._lock:
+                self._entries.pop(nhs_number, None)
+            raise
+
+        with self._lock:
+            if versioned_patient_details is None:
+                self.revalidated += 1
+                versioned_patient_details = entry.versioned_patient_details
+            self._set(nhs_number, versioned_patient_details)
+
+        return versioned_patient_details
+
+    def _revalidate_in_background(self, nhs_number: str, entry: _Entry) -> None:
+        # one revalidation of a patient at a time, called with the lock held
+        if nhs_number in self._revalidating:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._revalidating.add(nhs_number)
+        self._executor.submit(self._revalidate_quietly, nhs_number, entry)
+
+    def _revalidate_quietly(self, nhs_number: str, entry: _Entry) -> None:
+        try:
+            self._revalidate(nhs_number, entry)
+        except Exception as ex:
+            # the next request past the stale window revalidates again
+            _LOGGER.warning("Background revalidation of patient failed: %r", ex)
+        finally:
+            with self._lock:
+                self._revalidating.discard(nhs_number)
+
+    def _get(self, nhs_number: str) -> Optional[_Entry]:
+        entry = self._entries.get(nhs_number)
+        if entry is None:
+            return None
+
+        max_age = max(
+            self.ttl_seconds + self.stale_while_revalidate_seconds,
+            self.stale_if_error_seconds,
+        )
+        if self._clock() - entry.fetched_at >= max_age:
+            del self._entries[nhs_number]
+            return None
+
+        self._entries.move_to_end(nhs_number)
+        return entry
+
+    def _set(
+        self, nhs_number: str, versioned_patient_details: VersionedPatientDetails
+    ) -> None:
+        self._entries[nhs_number] = _Entry(versioned_patient_details, self._clock())
+        self._entries.move_to_end(nhs_number)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+def create_patient_details_cache(
+    pds_api_client: PDSApiClient,
+) -> Optional[PatientDetailsCache]:
+    settings = get_patient_details_cache_settings()
+    if not settings.enabled:
+        return None
+
+    return PatientDetailsCache(
+        pds_api_client,
+        max_size=settings.max_size,
+        ttl_seconds=settings.ttl_seconds,
+        stale_while_revalidate_seconds=settings.stale_while_revalidate_seconds,
+        stale_if_error_seconds=settings.stale_if_error_seconds,
+    )
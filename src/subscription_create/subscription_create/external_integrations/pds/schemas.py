@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import NamedTuple, Optional
 
 from fhir.resources.patient import Patient
 from pydantic import BaseModel
@@ -13,3 +14,9 @@ class AccessTokenResponse(BaseModel):
 
 class PatientDetailsResponse(Patient):
     ...
+
+
+class VersionedPatientDetails(NamedTuple):
+    patient_details: PatientDetailsResponse
+    # sent back as If-None-Match to revalidate
+    etag: Optional[str]
@@ -1,8 +1,9 @@
 import base64
 import time
 import uuid
+from enum import Enum
 from functools import lru_cache
-from typing import Mapping, Any
+from typing import Mapping, Any, Optional
 
 from pydantic import BaseSettings, HttpUrl, validator, ValidationError
 from pydantic.env_settings import SettingsError
@@ -53,3 +54,48 @@ def get_pds_settings():
         return PDSSettings()
     except ValidationError:
         raise SettingsError("Miss-configured PDS settings")
+
+
+class PatientDetailsCacheSettings(BaseSettings):
+    enabled: bool = True
+    max_size: int = 1024
+    # served without asking PDS
+    ttl_seconds: int = 5 * 60
+    # then served as is while PDS is asked in the background
+    stale_while_revalidate_seconds: int = 5 * 60
+    # and served when PDS fails or times out, up to this age
+    stale_if_error_seconds: int = 60 * 60
+
+    class Config:
+        env_prefix = "PDS_PATIENT_DETAILS_CACHE_"
+
+
+@lru_cache(maxsize=1)
+def get_patient_details_cache_settings() -> PatientDetailsCacheSettings:
+    return PatientDetailsCacheSettings()
+
+
+class AccessTokenStoreBackend(str, Enum):
+    MEMORY = "memory"
+    FILE = "file"
+    DYNAMODB = "dynamodb"
+
+
+class AccessTokenStoreSettings(BaseSettings):
+    backend: AccessTokenStoreBackend = AccessTokenStoreBackend.MEMORY
+    # fetched in the background once the token is this close to expiring
+    refresh_ahead_seconds: int = 60
+    # taken off the token lifetime, for the clocks of containers sharing it
+    clock_skew_seconds: int = 30
+    # survives restarts of the runtime, but not a new container
+    file_path: str = "/tmp/pds-access-token.json"
+    # shared by every container, partition key "token_key"
+    dynamodb_table_name: Optional[str] = None
+
+    class Config:
+        env_prefix = "PDS_ACCESS_TOKEN_STORE_"
+
+
+@lru_cache(maxsize=1)
+def get_access_token_store_settings() -> AccessTokenStoreSettings:
+    return AccessTokenStoreSettings()
@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple, Optional
+
+from aws_lambda_powertools import Logger
+
+from subscription_create.external_integrations.pds.schemas import (
+    AccessTokenResponse,
+)
+from subscription_create.external_integrations.pds.settings import (
+    AccessTokenStoreBackend,
+    get_access_token_store_settings,
+)
+
+_LOGGER = Logger()
+
+
+class StoredAccessToken(NamedTuple):
+    access_token: str
+    # epoch seconds, so it means the same in every container sharing it
+    expires_at: float
+
+
+class AccessTokenStore(ABC):
+    """Hands out the PDS access token, fetching a new one only when needed.
+
+    A token is treated as expiring `clock_skew_seconds` early. Once it is
+    within `refresh_ahead_seconds` of that, it is still handed out while a
+    new one is fetched in the background, so callers only wait for a fetch
+    when there is no usable token at all. Fetches are single flight: callers
+    arriving during one wait for it (or keep using the current token) rather
+    than starting another.
+
+    Backends implement `_read` and `_write`. A backend that cannot be reached
+    is logged and the token kept in memory is used, so the store is never
+    the reason a request fails."""
+
+    def __init__(
+        self,
+        refresh_ahead_seconds: int = 60,
+        clock_skew_seconds: int = 30,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.clock_skew_seconds = clock_skew_seconds
+        self._clock = clock
+        self._token: Optional[StoredAccessToken] = None
+        self._refresh_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.fetches = 0
+
+    def get_access_token(self, fetch: Callable[[], AccessTokenResponse]) -> str:
+        token = self._usable_token(self._token) or self._usable_token(self._load())
+        if token is None:
+            with self._refresh_lock:
+                # another caller may have fetched one while this one waited
+                token = self._usable_token(self._load()) or self._refresh(fetch)
+        elif self._should_refresh_ahead(token):
+            self._refresh_in_background(fetch)
+
+        return token.access_token
+
+    def _usable_token(
+        self, token: Optional[StoredAccessToken]
+    ) -> Optional[StoredAccessToken]:
+        if token is None or token.expires_at - self.clock_skew_seconds <= self._clock():
+            return None
+
+        self._token = token
+        return token
+
+    def _should_refresh_ahead(self, token: StoredAccessToken) -> bool:
+        refresh_at = token.expires_at - self.clock_skew_seconds
+        return refresh_at - self.refresh_ahead_seconds <= self._clock()
+
+    def _refresh(self, fetch: Callable[[], AccessTokenResponse]) -> StoredAccessToken:
+        # called with the refresh lock held
+        fetched_at = self._clock()
+        access_token_response = fetch()
+        self.fetches += 1
+        token = StoredAccessToken(
+            access_token=access_token_response.access_token,
+            expires_at=fetched_at + access_token_response.expires_in,
+        )
+        self._token = token
+        try:
+            self._write(token)
+        except Exception as ex:
+            _LOGGER.warning("Could not write access token store: %s", ex)
+        _LOGGER.info("Fetched new access token", extra={"expires_at": token.expires_at})
+        return token
+
+    def _refresh_in_background(self, fetch: Callable[[], AccessTokenResponse]):
+        if not self._refresh_lock.acquire(blocking=False):
+            # already being fetched
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            self._executor.submit(self._refresh_ahead, fetch)
+        except Exception:
+            self._refresh_lock.release()
+            raise
+
+    def _refresh_ahead(self, fetch: Callable[[], AccessTokenResponse]) -> None:
+        # runs with the refresh lock taken by _refresh_in_background
+        try:
+            token = self._load()
+            if token is None or self._should_refresh_ahead(token):
+                self._refresh(fetch)
+        except Exception as ex:
+            # the current token is still usable, the next caller tries again
+            _LOGGER.warning("Could not refresh access token ahead of expiry: %s", ex)
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self) -> Optional[StoredAccessToken]:
+        try:
+            token = self._read()
+        except Exception as ex:
+            _LOGGER.warning("Could not read access token store: %s", ex)
+            return self._token
+
+        # a token fetched by this container may be newer than the backend's
+        if self._token is not None and (
+            token is None or token.expires_at < self._token.expires_at
+        ):
+            return self._token
+        return token
+
+    @abstractmethod
+    def _read(self) -> Optional[StoredAccessToken]:
+        """The token stored by any client, `None` when there is none."""
+
+    @abstractmethod
+    def _write(self, token: StoredAccessToken) -> None:
+        """Stores the token just fetched for the other clients to use."""
+
+
+class InMemoryAccessTokenStore(AccessTokenStore):
+    """Only shared by the clients of one container."""
+
+    def _read(self) -> Optional[StoredAccessToken]:
+        return self._token
+
+    def _write(self, token: StoredAccessToken) -> None:
+        pass
+
+
+class FileAccessTokenStore(AccessTokenStore):
+    """A file readable only by its owner, e.g. in /tmp to survive restarts of
+    the runtime within a container."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _read(self) -> Optional[StoredAccessToken]:
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, "r") as f:
+            return StoredAccessToken(**json.load(f))
+
+    def _write(self, token: StoredAccessToken) -> None:
+        directory = os.path.dirname(self.path) or "."
+        # NamedTemporaryFile is created with 0600 permissions
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+            json.dump(token._asdict(), f)
+        os.replace(f.name, self.path)
+
+
+class DynamoDBAccessTokenStore(AccessTokenStore):
+    """Shared by every container, so only one of them needs to fetch a token
+    for all of them to use it. `table` is a boto3 DynamoDB Table, or anything
+    with the same `get_item` and `put_item`."""
+
+    def __init__(self, table: Any, token_key: str = "pds-access-token", **kwargs):
+        super().__init__(**kwargs)
+        self.table = table
+        self.token_key = token_key
+
+    def _read(self) -> Optional[StoredAccessToken]:
+        item = self.table.get_item(
+            Key={"token_key": self.token_key}, ConsistentRead=True
+        ).get("Item")
+        if item is None:
+            return None
+
+        return StoredAccessToken(
+            access_token=item["access_token"], expires_at=float(item["expires_at"])
+        )
+
+    def _write(self, token: StoredAccessToken) -> None:
+        self.table.put_item(
+            Item={
+                "token_key": self.token_key,
+                "access_token": token.access_token,
+                # DynamoDB TTL needs whole epoch seconds
+                "expires_at": int(token.expires_at),
+            }
+        )
+
+
+@lru_cache(maxsize=1)
+def get_access_token_store() -> AccessTokenStore:
+    settings = get_access_token_store_settings()
+    timing = {
+        "refresh_ahead_seconds": settings.refresh_ahead_seconds,
+        "clock_skew_seconds": settings.clock_skew_seconds,
+    }
+    if settings.backend == AccessTokenStoreBackend.FILE:
+        return FileAccessTokenStore(path=settings.file_path, **timing)
+
+    if settings.backend == AccessTokenStoreBackend.DYNAMODB:
+        # provided by the Lambda runtime, so not in requirements.txt
+        from boto3 import resource
+
+        return DynamoDBAccessTokenStore(
+            table=resource("dynamodb").Table(settings.dynamodb_table_name), **timing
+        )
+
+    return InMemoryAccessTokenStore(**timing)
@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class SubscriptionCreateSettings(BaseSettings):
+    # patients of a bundle verified against PDS at the same time, keep this
+    #  times the PDS requests a second of one worker under the PDS rate limit
+    max_workers: int = 4
+    # API Gateway gives up after 29 seconds, so larger onboardings are split
+    #  over several bundles
+    max_bundle_entries: int = 100
+
+    class Config:
+        env_prefix = "SUBSCRIPTION_CREATE_"
+
+
+@lru_cache(maxsize=1)
+def get_subscription_create_settings() -> SubscriptionCreateSettings:
+    return SubscriptionCreateSettings()
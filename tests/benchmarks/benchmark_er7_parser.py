@@ -0,0 +1,76 @@
+"""Compares parse time and peak memory of the full hl7apy parse against the
+selective parse as the number of segments ER7Extractor never reads grows.
+
+    PYTHONPATH=src/convert_hl7v2_fhir python -m tests.benchmarks.benchmark_er7_parser
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_parser import (
+    parse_er7_message_selectively,
+)
+
+_RAW_ER7_MESSAGE = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
+_EXTRA_SEGMENTS = (
+    "NK1|{index}|Esterkin^John|FTH|170 Juice Place^^London^^RW21 6KC^GBR^HOME",
+    "OBX|{index}|NM|wbc^Wbc^Local^6690-2^Wbc^LN||7.0|/nl|3.8-11.0||||F|||20120410160227|lab|12^XYZ LAB|",
+    "AL1|{index}|DA|PENICILLIN^Penicillin^Local|SV|Rash",
+    "ZHA|{index}|SIMHOSP|example@example.com",
+)
+
+
+def build_message(extra_segments: int) -> str:
+    return "\r".join(
+        [_RAW_ER7_MESSAGE]
+        + [
+            _EXTRA_SEGMENTS[index % len(_EXTRA_SEGMENTS)].format(index=index + 1)
+            for index in range(extra_segments)
+        ]
+    )
+
+
+def full_parse(raw_er7_message: str):
+    return parse_message(raw_er7_message, find_groups=False)
+
+
+def selective_parse(raw_er7_message: str):
+    return parse_er7_message_selectively(raw_er7_message, find_groups=False)
+
+
+def measure(
+    parse: Callable[[str], object], raw_er7_message: str, repeat: int
+) -> Tuple[float, int]:
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        parse(raw_er7_message)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000 / repeat
+
+    tracemalloc.start()
+    parse(raw_er7_message)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'extra':>6} {'full ms':>9} {'full KiB':>9} {'sel ms':>8} {'sel KiB':>8}")
+    for extra_segments in (0, 10, 50, 200):
+        raw_er7_message = build_message(extra_segments)
+        full_ms, full_bytes = measure(full_parse, raw_er7_message, args.repeat)
+        sel_ms, sel_bytes = measure(selective_parse, raw_er7_message, args.repeat)
+        print(
+            f"{extra_segments:>6} {full_ms:>9.2f} {full_bytes / 1024:>9.1f}"
+            f" {sel_ms:>8.2f} {sel_bytes / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compares messages per second routed by convert_hl7v2_fhir with and without
+the raw ER7 scanner, over a corpus mixing the message types seen on a feed.
+
+    PYTHONPATH=src/convert_hl7v2_fhir python -m tests.benchmarks.benchmark_er7_scanner
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_parser import parse_er7_message
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import scan_er7_header
+from convert_hl7v2_fhir.controllers.hl7.hl7_errors import (
+    check_header_is_supported,
+    check_message_is_supported,
+)
+
+_MSH = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||{message_type}|5|T|2.3|||AL||44|ASCII"
+_EVN = "EVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|"
+_PID = "PID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||"
+_PV1 = "PV1|1|{patient_class}|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
+_OBX = "OBX|{index}|NM|wbc^Wbc^Local^6690-2^Wbc^LN||7.0|/nl|3.8-11.0||||F|||20120410160227|lab|12^XYZ LAB|"
+_OBR = "OBR|1||12376|cbc^CBC|R||20120410160227|||22^GOOF^GOOFY|||Fasting: No|201204101625||71^DUCK^DONALD||||||201204101630|||F||^^^^^R|||||||||||||||||85025|"
+
+
+def _adt(trigger_event: str, patient_class: str) -> str:
+    return "\r".join(
+        (
+            _MSH.format(message_type=f"ADT^{trigger_event}"),
+            _EVN,
+            _PID,
+            _PV1.format(patient_class=patient_class),
+        )
+    )
+
+
+def _oru() -> str:
+    return "\r".join(
+        (
+            _MSH.format(message_type="ORU^R01"),
+            _PID,
+            _OBR,
+            *(_OBX.format(index=index) for index in range(1, 15)),
+        )
+    )
+
+
+# (message, share of the feed)
+_CORPUS_MIX = (
+    (_oru(), 0.4),
+    (_adt("A08", "I"), 0.2),
+    (_adt("A03", "I"), 0.15),
+    (_adt("A01", "E"), 0.1),
+    (_adt("A01", "O"), 0.05),
+    (_adt("A01", "I"), 0.1),
+)
+
+
+def build_corpus(size: int, seed: int = 0) -> List[str]:
+    messages, weights = zip(*_CORPUS_MIX)
+    return random.Random(seed).choices(messages, weights=weights, k=size)
+
+
+def route_with_full_parse(raw_er7_message: str) -> bool:
+    # as handle_er7_message routes a message the scanner let through
+    er7_snapshot = ER7Extractor(
+        er7_message=parse_er7_message(raw_er7_message)
+    ).extract()
+    return check_message_is_supported(er7_snapshot) is None
+
+
+def route_with_scanner(raw_er7_message: str) -> bool:
+    er7_header = scan_er7_header(raw_er7_message)
+    if er7_header is not None and check_header_is_supported(er7_header):
+        return False
+
+    return route_with_full_parse(raw_er7_message)
+
+
+def messages_per_second(route: Callable[[str], bool], corpus: List[str]) -> float:
+    started_at = time.perf_counter()
+    for raw_er7_message in corpus:
+        route(raw_er7_message)
+    return len(corpus) / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, seed=args.seed)
+    assert [route_with_full_parse(m) for m in corpus] == [
+        route_with_scanner(m) for m in corpus
+    ], "scanner routed messages differently to the full parse"
+
+    full_parse = messages_per_second(route_with_full_parse, corpus)
+    scanner = messages_per_second(route_with_scanner, corpus)
+    print(f"full parse: {full_parse:10.1f} messages/s")
+    print(f"scanner:    {scanner:10.1f} messages/s ({scanner / full_parse:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compares the per-message cost of reading fields straight from fresh
+ER7Extractor instances, as the handler used to, against a single
+`ER7Extractor.extract` snapshot.
+
+    PYTHONPATH=src/convert_hl7v2_fhir python -m tests.benchmarks.benchmark_er7_snapshot
+"""
+import argparse
+import time
+from typing import Callable
+
+from hl7apy.core import Message
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+
+_RAW_ER7_MESSAGE = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPD1|||FAMILY PRACTICE^^12345|\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
+
+
+def read_with_extractors(er7_message: Message) -> None:
+    # one extractor per filter, one for the care provider lookup and one for
+    #  the conversion, each field read as many times as it used to be
+    ER7Extractor(er7_message).message_type()
+    ER7Extractor(er7_message).trigger_event()
+    ER7Extractor(er7_message).patient_class()
+    extractor = ER7Extractor(er7_message)
+    extractor.nhs_number()
+    extractor.date_of_birth()
+    extractor = ER7Extractor(er7_message)
+    extractor.event_type_code()
+    extractor.nhs_number()
+    extractor.family_name()
+    extractor.given_name()
+    extractor.date_of_birth()
+    extractor.patient_location()
+    extractor.patient_location()
+    extractor.patient_class()
+    extractor.admission_type()
+    extractor.time_of_admission()
+
+
+def read_with_snapshot(er7_message: Message) -> None:
+    er7_snapshot = ER7Extractor(er7_message).extract()
+    for field in er7_snapshot.FIELDS:
+        getattr(er7_snapshot, field)
+
+
+def microseconds_per_message(
+    read: Callable[[Message], None], er7_message: Message, repeat: int
+) -> float:
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        read(er7_message)
+    return (time.perf_counter() - started_at) * 1_000_000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    er7_message = parse_message(_RAW_ER7_MESSAGE)
+    extractors = microseconds_per_message(
+        read_with_extractors, er7_message, args.repeat
+    )
+    snapshot = microseconds_per_message(read_with_snapshot, er7_message, args.repeat)
+    print(f"extractors: {extractors:10.1f} us/message")
+    print(f"snapshot:   {snapshot:10.1f} us/message")
+    print(f"saving:     {extractors - snapshot:10.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Microbenchmarks of the conversion and notification hot paths, run on the
+raw ER7 fixtures of the convert_hl7v2_fhir integration tests, a typical and
+a large (OBX heavy) synthetic message and the FHIR patients in tests/_inputs.
+
+    PYTHONPATH=src/convert_hl7v2_fhir:src/email_care_provider:src/subscription_create:src/subscription_delete \\
+        python -m tests.benchmarks.benchmark_suite --save baseline.json
+    ... python -m tests.benchmarks.benchmark_suite --compare baseline.json
+
+Timings depend on the machine, so a baseline should be saved and compared
+on the same one (e.g. save on the main branch, compare on the change). A
+comparison exits with status 1 when any benchmark is slower than its
+baseline by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_message_controller import (
+    ER7MessageController,
+)
+from convert_hl7v2_fhir.controllers.hl7.hl7_ack_builder import (
+    HL7Error,
+    HL7ErrorCode,
+    HL7ErrorSeverity,
+    generate_ack_message,
+)
+from convert_hl7v2_fhir.controllers.pseudo_id.pseudo_id_cache import (
+    generate_pseudo_id,
+)
+from convert_hl7v2_fhir.controllers.utils import is_nhs_number_valid
+from email_care_provider.schemas import HANSBundle
+from subscription_create.schemas import HANSPatient
+from subscription_create.utils import (
+    operation_outcome_lambda_response_factory as subscription_create_operation_outcome,
+)
+from subscription_delete.utils import (
+    operation_outcome_lambda_response_factory as subscription_delete_operation_outcome,
+)
+from tests.integration.convert_hl7v2_fhir import test_app
+from tests.synthetic.adt_corpus import CorpusProfile, generate_messages
+
+_VALID_PATIENTS = Path(__file__).parents[1] / "_inputs" / "valid-patients"
+_EXTRACTOR_METHODS = (
+    "nhs_number",
+    "family_name",
+    "given_name",
+    "date_of_birth",
+    "event_type_code",
+    "patient_location",
+    "patient_class",
+    "admission_type",
+    "time_of_admission",
+    "message_type",
+    "trigger_event",
+    "extract",
+)
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[], object]
+
+
+def raw_er7_fixtures() -> Dict[str, str]:
+    return {
+        name[len("RAW_HL7_") :].lower(): value.replace("\n", "")
+        for name, value in vars(test_app).items()
+        if name.startswith("RAW_HL7_MESSAGE_")
+    }
+
+
+def synthetic_er7_messages() -> Dict[str, str]:
+    return {
+        f"synthetic_{name}": next(
+            generate_messages(profile=CorpusProfile(large_message_rate=rate))
+        )
+        for name, rate in (("typical", 0), ("large", 1))
+    }
+
+
+def benchmarks() -> List[Benchmark]:
+    raw_er7_messages = {**raw_er7_fixtures(), **synthetic_er7_messages()}
+    er7_message = parse_message(raw_er7_messages["message_good"])
+    bundle_json = ER7MessageController(
+        er7_extractor=ER7Extractor(er7_message)
+    ).to_fhir_bundle_json()
+    patient_jsons = [path.read_text() for path in sorted(_VALID_PATIENTS.iterdir())]
+    hl7_error = HL7Error(
+        error_code=HL7ErrorCode.DATA_TYPE_ERROR,
+        error_severity=HL7ErrorSeverity.ERROR,
+        error_message="NHS Number in message was invalid",
+    )
+
+    suite = [
+        Benchmark(f"parse_message[{name}]", lambda raw=raw: parse_message(raw))
+        for name, raw in raw_er7_messages.items()
+    ]
+    suite += [
+        # a fresh extractor each time, as the snapshot memoises PV1 validation
+        Benchmark(
+            f"ER7Extractor.{method}",
+            lambda method=method: getattr(ER7Extractor(er7_message), method)(),
+        )
+        for method in _EXTRACTOR_METHODS
+    ]
+    suite += [
+        Benchmark(
+            "ER7MessageController.to_fhir_bundle",
+            lambda: ER7MessageController(
+                er7_extractor=ER7Extractor(er7_message)
+            ).to_fhir_bundle(),
+        ),
+        Benchmark(
+            "ER7MessageController.to_fhir_bundle_json",
+            lambda: ER7MessageController(
+                er7_extractor=ER7Extractor(er7_message)
+            ).to_fhir_bundle_json(),
+        ),
+        Benchmark(
+            "generate_ack_message[accept]",
+            lambda: generate_ack_message("SIMHOSP", "SFAC", "5"),
+        ),
+        Benchmark(
+            "generate_ack_message[reject]",
+            lambda: generate_ack_message("SIMHOSP", "SFAC", "5", hl7_error=hl7_error),
+        ),
+        Benchmark("is_nhs_number_valid", lambda: is_nhs_number_valid("9728002378")),
+        Benchmark("HANSBundle.parse_raw", lambda: HANSBundle.parse_raw(bundle_json)),
+        Benchmark(
+            "HANSPatient.parse_raw",
+            lambda: [HANSPatient.parse_raw(p) for p in patient_jsons],
+        ),
+        Benchmark(
+            "generate_pseudo_id",
+            lambda: generate_pseudo_id("9728002378", date(1961, 6, 8)),
+        ),
+    ]
+    suite += [
+        Benchmark(
+            f"{package}.operation_outcome_lambda_response_factory",
+            lambda factory=factory: factory(
+                status_code=400,
+                severity="error",
+                code="invalid",
+                diagnostics="NHS number coding must be: 03 - Trace required",
+            ),
+        )
+        for package, factory in (
+            ("subscription_create", subscription_create_operation_outcome),
+            ("subscription_delete", subscription_delete_operation_outcome),
+        )
+    ]
+    return suite
+
+
+def microseconds_per_call(run: Callable[[], object], repeat: int) -> float:
+    # the fastest of several runs, as the slower ones only measure noise
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) * 1_000_000 / number
+
+
+def find_regressions(
+    baseline: Dict[str, float], results: Dict[str, float], threshold: float
+) -> Dict[str, Tuple[float, float]]:
+    return {
+        name: (baseline[name], result)
+        for name, result in results.items()
+        if name in baseline and result > baseline[name] * (1 + threshold)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only names containing this")
+    parser.add_argument("--save", type=Path, help="write results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%"
+    )
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else {}
+    results = {}
+    for benchmark in benchmarks():
+        if args.filter not in benchmark.name:
+            continue
+
+        results[benchmark.name] = microseconds_per_call(benchmark.run, args.repeat)
+        change = ""
+        if benchmark.name in baseline:
+            ratio = results[benchmark.name] / baseline[benchmark.name] - 1
+            change = f"{ratio:+8.1%}"
+        print(f"{benchmark.name:60} {results[benchmark.name]:12.1f} us {change}")
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {"python": platform.python_version(), "results": results}, indent=2
+            )
+        )
+
+    regressions = find_regressions(baseline, results, args.threshold)
+    for name, (before, after) in regressions.items():
+        print(f"REGRESSION {name}: {before:.1f} us -> {after:.1f} us")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
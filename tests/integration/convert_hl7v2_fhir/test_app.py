@@ -1,12 +1,47 @@
-from typing import Dict
+import asyncio
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from unittest.mock import MagicMock
 
 import hl7
 import pytest
+from _pytest.capture import CaptureFixture
+from _pytest.monkeypatch import MonkeyPatch
+from hl7apy.parser import parse_message
 from pytest_mock import MockFixture
 
 from convert_hl7v2_fhir import app
 from convert_hl7v2_fhir.app import lambda_handler
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_message_controller import (
+    ER7MessageController,
+)
+from convert_hl7v2_fhir.controllers.er7.settings import (
+    get_er7_parser_settings,
+    get_fhir_bundle_settings,
+)
+from convert_hl7v2_fhir.controllers.idempotency.idempotency_store import (
+    get_idempotency_store,
+)
+from convert_hl7v2_fhir.controllers.idempotency.settings import (
+    get_idempotency_settings,
+)
+from convert_hl7v2_fhir.controllers.hl7.hl7_conversions import ENCOUNTER_CLASS_MAP
+from convert_hl7v2_fhir.instrumentation.settings import get_stage_metrics_settings
+from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
+    ManagementInterfaceCircuitOpen,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.exceptions import (
+    SQSPublisherException,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.publisher import SQSPublisher
+from convert_hl7v2_fhir.internal_integrations.sqs.settings import get_sqs_settings
+from convert_hl7v2_fhir.mllp.framing import frame_message, read_frame
+from convert_hl7v2_fhir.mllp.server import MLLPServer
+from convert_hl7v2_fhir.settings import get_convert_hl7v2_fhir_settings
 from convert_hl7v2_fhir.controllers.hl7.hl7_ack_builder import HL7ErrorCode
 
 RAW_HL7_MESSAGE_GOOD = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPD1|||FAMILY PRACTICE^^12345|\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
@@ -31,9 +66,9 @@ _DUMMY_LAMBDA_CONTEXT = MagicMock(
 
 
 @pytest.fixture()
-def mock_is_patient_added_to_hans(mocker: MockFixture) -> None:
+def mock_find_care_provider(mocker: MockFixture) -> None:
     mocker.patch.object(
-        app, app._is_patient_added_to_hans.__name__, MagicMock(return_value=True)
+        app, app._find_care_provider.__name__, MagicMock(return_value=MagicMock())
     )
 
 
@@ -42,12 +77,58 @@ def mock_send_to_sqs(mocker: MockFixture) -> None:
     mocker.patch.object(app, app._send_to_sqs.__name__)
 
 
+@pytest.fixture()
+def selective_parsing(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ER7_PARSER_SELECTIVE_PARSING", "true")
+    monkeypatch.setenv("ER7_PARSER_FIND_GROUPS", "false")
+    get_er7_parser_settings.cache_clear()
+    yield
+    get_er7_parser_settings.cache_clear()
+
+
+@pytest.fixture()
+def accept_then_process(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("CONVERT_HL7V2_FHIR_ACCEPT_THEN_PROCESS", "true")
+    get_convert_hl7v2_fhir_settings.cache_clear()
+    yield
+    get_convert_hl7v2_fhir_settings.cache_clear()
+
+
+@pytest.fixture()
+def send_to_dead_letter_queue_mock(
+    mocker: MockFixture, monkeypatch: MonkeyPatch
+) -> MagicMock:
+    monkeypatch.setenv("SQS_CONVERTED_QUEUE_URL", "http://sqs/converted-queue")
+    monkeypatch.setenv("SQS_DEAD_LETTER_QUEUE_URL", "http://sqs/dead-letter-queue")
+    get_sqs_settings.cache_clear()
+    yield mocker.patch.object(app, app.send_to_dead_letter_queue.__name__)
+    get_sqs_settings.cache_clear()
+
+
+@pytest.fixture()
+def idempotency_store(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "memory")
+    get_idempotency_settings.cache_clear()
+    get_idempotency_store.cache_clear()
+    yield
+    get_idempotency_settings.cache_clear()
+    get_idempotency_store.cache_clear()
+
+
+@pytest.fixture()
+def stage_metrics(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("STAGE_METRICS_ENABLED", "true")
+    get_stage_metrics_settings.cache_clear()
+    yield
+    get_stage_metrics_settings.cache_clear()
+
+
 def _create_lambda_body(hl7_raw_message: str) -> Dict[str, str]:
     return {"body": hl7_raw_message}
 
 
 def test_lambda_handler__message_body_contains_ack(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     event = _create_lambda_body(RAW_HL7_MESSAGE_GOOD)
 
@@ -61,7 +142,7 @@ def test_lambda_handler__message_body_contains_ack(
 
 
 def test_lambda_handler__ack_correct_recipient(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # when
     response = lambda_handler(
@@ -75,7 +156,7 @@ def test_lambda_handler__ack_correct_recipient(
 
 
 def test_lambda_handler__good_message_correct_accept_code(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # when
     response = lambda_handler(
@@ -88,7 +169,7 @@ def test_lambda_handler__good_message_correct_accept_code(
 
 
 def test_lambda_handler__correct_accept_code_for_invalid_nhs_number(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     response = lambda_handler(
@@ -102,7 +183,7 @@ def test_lambda_handler__correct_accept_code_for_invalid_nhs_number(
 
 
 def test_lambda_handler__correct_accept_code_for_missing_nhs_number(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     response = lambda_handler(
@@ -116,7 +197,7 @@ def test_lambda_handler__correct_accept_code_for_missing_nhs_number(
 
 
 def test_lambda_handler__missing_segment(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_MISSING_SEGMENT)
@@ -131,7 +212,7 @@ def test_lambda_handler__missing_segment(
 
 
 def test_lambda_handler__missing_hospital_and_ward(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_MISSING_HOSPITAL_AND_WARD)
@@ -147,7 +228,7 @@ def test_lambda_handler__missing_hospital_and_ward(
 
 
 def test_lambda_handler__missing_admission_time(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_MISSING_ADMISSION_TIME)
@@ -164,7 +245,7 @@ def test_lambda_handler__missing_admission_time(
 
 
 def test_lambda_handler__missing_family_name(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_MISSING_FAMILY_NAME)
@@ -181,7 +262,7 @@ def test_lambda_handler__missing_family_name(
 
 
 def test_lambda_handler__missing_date_of_birth(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_MISSING_DATE_OF_BIRTH)
@@ -198,7 +279,7 @@ def test_lambda_handler__missing_date_of_birth(
 
 
 def test_lambda_handler__unsupported_message_type(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_NOT_ADT_TYPE)
@@ -213,7 +294,7 @@ def test_lambda_handler__unsupported_message_type(
 
 
 def test_lambda_handler__unsupported_event_code(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_NOT_A01_TRIGGER)
@@ -228,7 +309,7 @@ def test_lambda_handler__unsupported_event_code(
 
 
 def test_lambda_handler__unsupported_patient_class(
-    mock_is_patient_added_to_hans: None, mock_send_to_sqs: None
+    mock_find_care_provider: None, mock_send_to_sqs: None
 ):
     # given
     event = _create_lambda_body(RAW_HL7_MESSAGE_NOT_INPATIENT_CLASS)
@@ -239,3 +320,691 @@ def test_lambda_handler__unsupported_patient_class(
 
     # then
     assert message["MSA"][0][1][0] == "AR"
+
+
+@pytest.mark.parametrize(
+    "raw_hl7_message",
+    [
+        RAW_HL7_MESSAGE_NOT_ADT_TYPE,
+        RAW_HL7_MESSAGE_NOT_A01_TRIGGER,
+        RAW_HL7_MESSAGE_NOT_INPATIENT_CLASS,
+    ],
+)
+def test_lambda_handler__unsupported_messages_are_not_fully_parsed(
+    mocker: MockFixture, raw_hl7_message: str
+):
+    # given
+    parse_er7_message_mock = mocker.patch.object(app, app.parse_er7_message.__name__)
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(raw_hl7_message), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == "AR"
+    assert not parse_er7_message_mock.called
+
+
+@pytest.mark.parametrize(
+    ("raw_hl7_message", "accept_code", "error_code"),
+    [
+        (RAW_HL7_MESSAGE_GOOD, "AA", None),
+        (RAW_HL7_MESSAGE_MISSING_SEGMENT, "AR", "100"),
+        (RAW_HL7_MESSAGE_MISSING_FAMILY_NAME, "AR", "101"),
+    ],
+)
+def test_lambda_handler__selective_parsing(
+    mock_find_care_provider: None,
+    mock_send_to_sqs: None,
+    selective_parsing: None,
+    raw_hl7_message: str,
+    accept_code: str,
+    error_code: str,
+):
+    # when
+    response = lambda_handler(
+        _create_lambda_body(raw_hl7_message), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == accept_code
+    if error_code is not None:
+        assert message["ERR"][0][3][0] == error_code
+
+
+def _generate_adt_a01_corpus(size: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    family_names = ["Esterkin", "O'Brien", 'Say "Hi"', "Müller", "Łukasz", "Ng "]
+    given_names = ["AKI Scenario 6", "Zoë", "Anne-Marie", "José", " Li"]
+    middle_names = ["", "Keith", "Mary Jane", "Ó Sé"]
+    wards = ["RenalWard", "Ward 7, East", "Children's Ward", "ICU/HDU"]
+    hospitals = ["Simulated Hospital", "St. Mary's", "Hôpital Général"]
+    offsets = ["", "+0000", "+0100", "-0500"]
+    corpus = []
+    for index in range(size):
+        admitted_at = f"2023{rng.randint(1, 12):02}{rng.randint(1, 28):02}{rng.randint(0, 23):02}{rng.randint(0, 59):02}{rng.randint(0, 59):02}"
+        corpus.append(
+            "\r".join(
+                (
+                    f"MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|{index}|T|2.3|||AL||44|UNICODE UTF-8",
+                    "EVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|",
+                    f"PID|1||9728002378^^^NHSNBR^NHSNMBR||{rng.choice(family_names)}^{rng.choice(given_names)}^{rng.choice(middle_names)}^^^^CURRENT||{rng.randint(1920, 2020)}{rng.randint(1, 12):02}{rng.randint(1, 28):02}|M|||",
+                    f"PV1|1|{rng.choice(list(ENCOUNTER_CLASS_MAP))}|{rng.choice(wards)}^MainRoom^Bed 1^{rng.choice(hospitals)}^^BED^MainBuilding^5|28b||||||MED|||||||||||||||||||||||||||||||ARRIVED|||{admitted_at}{rng.choice(offsets)}||",
+                )
+            )
+        )
+    return corpus
+
+
+@pytest.mark.parametrize(
+    "raw_hl7_message",
+    [
+        RAW_HL7_MESSAGE_GOOD,
+        RAW_HL7_MESSAGE_NOT_INPATIENT_CLASS,
+        RAW_HL7_MESSAGE_INVALID_NHS_NUMBER,
+        RAW_HL7_MESSAGE_MISSING_NHS_NUMBER,
+        RAW_HL7_MESSAGE_MISSING_SEGMENT,
+        RAW_HL7_MESSAGE_MISSING_FIELD,
+        RAW_HL7_MESSAGE_MISSING_HOSPITAL_AND_WARD,
+        RAW_HL7_MESSAGE_MISSING_ADMISSION_TIME,
+        RAW_HL7_MESSAGE_MISSING_FAMILY_NAME,
+        RAW_HL7_MESSAGE_MISSING_DATE_OF_BIRTH,
+        *_generate_adt_a01_corpus(50),
+    ],
+)
+def test_er7_message_controller__bundle_template_matches_validated_bundle(
+    raw_hl7_message: str,
+):
+    # given
+    controller = ER7MessageController(
+        er7_snapshot=ER7Extractor(parse_message(raw_hl7_message)).extract()
+    )
+
+    # when
+    try:
+        expected = controller.to_fhir_bundle().json()
+    except Exception as ex:
+        # then
+        with pytest.raises(type(ex)):
+            controller.to_fhir_bundle_json()
+        return
+
+    # then
+    assert controller.to_fhir_bundle_json() == expected
+
+
+def test_er7_message_controller__validated_bundle_when_flag_set(
+    monkeypatch: MonkeyPatch, mocker: MockFixture
+):
+    # given
+    monkeypatch.setenv("FHIR_BUNDLE_VALIDATE_BUNDLE", "true")
+    get_fhir_bundle_settings.cache_clear()
+    controller = ER7MessageController(
+        er7_snapshot=ER7Extractor(parse_message(RAW_HL7_MESSAGE_GOOD)).extract()
+    )
+    to_fhir_bundle_spy = mocker.spy(controller, controller.to_fhir_bundle.__name__)
+
+    # when
+    controller.to_fhir_bundle_json()
+    get_fhir_bundle_settings.cache_clear()
+
+    # then
+    assert to_fhir_bundle_spy.called
+
+
+def test_lambda_handler__converted_message_sent_in_one_batch_call(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/converted-queue"),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == "AA"
+    assert sqs_client.send_message_batch.call_count == 1
+
+
+def test_lambda_handler__failed_batch_entry_is_rejected(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "Code": "InvalidParameterValue", "SenderFault": True}],
+    }
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/converted-queue"),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == "AR"
+    assert message["ERR"][0][3][0] == str(HL7ErrorCode.APPLICATION_INTERNAL_ERROR.value)
+    assert "InvalidParameterValue" in str(message["ERR"][0])
+
+
+def test_lambda_handler__batch_file_acknowledges_each_message(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/converted-queue"),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+    raw_batch = "\r".join(
+        (
+            "FHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||FILE1",
+            "BHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||BATCH1",
+            RAW_HL7_MESSAGE_GOOD,
+            RAW_HL7_MESSAGE_NOT_INPATIENT_CLASS,
+            RAW_HL7_MESSAGE_INVALID_NHS_NUMBER,
+            RAW_HL7_MESSAGE_GOOD,
+            "BTS|4",
+            "FTS|1",
+        )
+    )
+
+    # when
+    response = lambda_handler(_create_lambda_body(raw_batch), _DUMMY_LAMBDA_CONTEXT)
+    segments = response["body"].split("\r")
+
+    # then
+    assert segments[0].startswith("FHS|")
+    assert segments[1].split("|")[11] == "BATCH1"
+    assert [s.split("|")[1] for s in segments if s.startswith("MSA")] == [
+        "AA",
+        "AR",
+        "AR",
+        "AA",
+    ]
+    assert segments[-2:] == ["BTS|4", "FTS|1"]
+    assert sqs_client.send_message_batch.call_count == 1
+    assert len(sqs_client.send_message_batch.call_args.kwargs["Entries"]) == 2
+
+
+def test_lambda_handler__batch_rejects_messages_sqs_failed(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "1", "Code": "InvalidParameterValue", "SenderFault": True}],
+    }
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/converted-queue"),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+    raw_batch = "\r".join(
+        (
+            "BHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||BATCH1",
+            RAW_HL7_MESSAGE_GOOD,
+            RAW_HL7_MESSAGE_GOOD,
+            "BTS|2",
+        )
+    )
+
+    # when
+    response = lambda_handler(_create_lambda_body(raw_batch), _DUMMY_LAMBDA_CONTEXT)
+    segments = response["body"].split("\r")
+
+    # then
+    assert not segments[0].startswith("FHS|")
+    assert [s.split("|")[1] for s in segments if s.startswith("MSA")] == ["AA", "AR"]
+
+
+def test_handle_er7_message__concurrent_messages_are_acked_by_their_own_send(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    other_nhs_number = "9728002378"
+    messages = [
+        RAW_HL7_MESSAGE_GOOD,
+        RAW_HL7_MESSAGE_GOOD.replace("2478684691", other_nhs_number),
+    ]
+    # holds each send until the other thread is sending too
+    both_sending = threading.Barrier(len(messages), timeout=5)
+
+    def send_message_batch(QueueUrl: str, Entries: List[Dict]):
+        both_sending.wait()
+        return {
+            "Successful": [],
+            "Failed": [
+                {"Id": entry["Id"], "Code": "InternalError", "SenderFault": False}
+                for entry in Entries
+                if other_nhs_number in entry["MessageBody"]
+            ],
+        }
+
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.side_effect = send_message_batch
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(
+            sqs_client, "http://sqs/converted-queue", max_attempts=1
+        ),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+
+    # when
+    with ThreadPoolExecutor(max_workers=len(messages)) as executor:
+        acks = list(executor.map(app.handle_er7_message, messages))
+
+    # then
+    assert [hl7.parse(ack)["MSA"][0][1][0] for ack in acks] == ["AA", "AR"]
+    assert sqs_client.send_message_batch.call_count == 2
+
+
+def test_handle_er7_message__concurrent_batches_are_acked_by_their_own_flush(
+    mocker: MockFixture, mock_find_care_provider: None
+):
+    # given
+    other_nhs_number = "9728002378"
+    batches = [
+        "\r".join(
+            (
+                "FHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||FILE1",
+                f"BHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||{batch_id}",
+                raw_er7_message,
+                "BTS|1",
+                "FTS|1",
+            )
+        )
+        for batch_id, raw_er7_message in (
+            ("BATCH1", RAW_HL7_MESSAGE_GOOD),
+            (
+                "BATCH2",
+                RAW_HL7_MESSAGE_GOOD.replace("2478684691", other_nhs_number),
+            ),
+        )
+    ]
+    # holds each flush until the other batch is flushing too
+    both_sending = threading.Barrier(len(batches), timeout=5)
+
+    def send_message_batch(QueueUrl: str, Entries: List[Dict]):
+        both_sending.wait()
+        return {
+            "Successful": [],
+            "Failed": [
+                {"Id": entry["Id"], "Code": "InternalError", "SenderFault": False}
+                for entry in Entries
+                if other_nhs_number in entry["MessageBody"]
+            ],
+        }
+
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.side_effect = send_message_batch
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(
+            sqs_client,
+            "http://sqs/converted-queue",
+            max_wait_seconds=60,
+            max_attempts=1,
+        ),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+
+    # when
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        acks = list(executor.map(app.handle_er7_message, batches))
+
+    # then
+    assert [
+        [s.split("|")[1] for s in ack.split("\r") if s.startswith("MSA")]
+        for ack in acks
+    ] == [["AA"], ["AR"]]
+    assert sqs_client.send_message_batch.call_count == 2
+
+
+def test_mllp_server__acknowledges_messages_with_the_lambda_logic(
+    mock_find_care_provider: None, mock_send_to_sqs: None
+):
+    # given
+    messages = [RAW_HL7_MESSAGE_GOOD, RAW_HL7_MESSAGE_INVALID_NHS_NUMBER]
+
+    async def send() -> List[bytes]:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            server = MLLPServer(
+                app.handle_er7_message, executor, host="127.0.0.1", port=0
+            )
+            await server.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"".join(frame_message(m.encode()) for m in messages))
+            await writer.drain()
+            acks = [await read_frame(reader) for _ in messages]
+            writer.close()
+            await server.close()
+            return acks
+
+    # when
+    acks = asyncio.run(send())
+
+    # then
+    assert [hl7.parse(ack.decode())["MSA"][0][1][0] for ack in acks] == ["AA", "AR"]
+
+
+def test_mllp_server__unprocessable_messages_are_rejected_with_error_ack():
+    # given
+    def handler(message: str) -> str:
+        raise RuntimeError("unprocessable")
+
+    batch = "\r".join(
+        [
+            "FHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||F1",
+            "BHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||B1",
+            RAW_HL7_MESSAGE_GOOD,
+            RAW_HL7_MESSAGE_INVALID_NHS_NUMBER,
+            "BTS|2",
+            "FTS|1",
+        ]
+    )
+    messages = [RAW_HL7_MESSAGE_GOOD, batch, "not an HL7 message"]
+
+    async def send() -> List[bytes]:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            server = MLLPServer(
+                handler,
+                executor,
+                error_handler=app.create_error_ack,
+                host="127.0.0.1",
+                port=0,
+            )
+            await server.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"".join(frame_message(m.encode()) for m in messages))
+            await writer.drain()
+            acks = [await read_frame(reader) for _ in messages]
+            writer.close()
+            await server.close()
+            return acks
+
+    # when
+    acks = [ack.decode() for ack in asyncio.run(send())]
+
+    # then
+    message = hl7.parse(acks[0])
+    assert message["MSA"][0][1][0] == "AR"
+    assert message["MSA"][0][2][0] == "5"
+    assert [s.split("|")[1] for s in acks[1].split("\r") if s.startswith("MSA")] == [
+        "AR",
+        "AR",
+    ]
+    assert hl7.parse(acks[2])["MSA"][0][1][0] == "AR"
+
+
+def test_lambda_handler__unparseable_message_is_rejected(mocker: MockFixture):
+    # given
+    mocker.patch.object(
+        app,
+        app.parse_er7_message.__name__,
+        MagicMock(side_effect=ValueError("unparseable")),
+    )
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == "AR"
+    assert message["MSA"][0][2][0] == "5"
+
+
+def test_lambda_handler__open_management_interface_circuit_is_rejected(
+    mocker: MockFixture, mock_send_to_sqs: None
+):
+    # given
+    mocker.patch.object(app, app.get_pseudo_id_cache.__name__)
+    management_interface_api_client = mocker.patch.object(
+        app, app.ManagementInterfaceApiClient.__name__
+    ).return_value
+    management_interface_api_client.get_care_provider.side_effect = (
+        ManagementInterfaceCircuitOpen
+    )
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] != "AA"
+    assert message["ERR"][0][3][0] == str(HL7ErrorCode.APPLICATION_INTERNAL_ERROR.value)
+    assert "Management interface unavailable" in str(message["ERR"][0])
+
+
+def test_lambda_handler__accept_then_process_acks_before_lookup(
+    mocker: MockFixture, accept_then_process: None
+):
+    # given
+    find_care_provider_mock = mocker.patch.object(app, app._find_care_provider.__name__)
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    mocker.patch.object(
+        app,
+        app.get_accepted_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/accepted-queue"),
+    )
+
+    # when
+    accepted = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    rejected = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_NOT_INPATIENT_CLASS), _DUMMY_LAMBDA_CONTEXT
+    )
+
+    # then
+    assert hl7.parse(accepted["body"])["MSA"][0][1][0] == "AA"
+    assert hl7.parse(rejected["body"])["MSA"][0][1][0] == "AR"
+    assert not find_care_provider_mock.called
+    entries = sqs_client.send_message_batch.call_args.kwargs["Entries"]
+    assert [entry["MessageBody"] for entry in entries] == [RAW_HL7_MESSAGE_GOOD]
+
+
+def test_lambda_handler__accept_then_process_rejects_unconvertible_message(
+    mocker: MockFixture, accept_then_process: None
+):
+    # given
+    send_to_accepted_queue_mock = mocker.patch.object(
+        app, app._send_to_accepted_queue.__name__
+    )
+
+    # when
+    response = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_MISSING_FIELD), _DUMMY_LAMBDA_CONTEXT
+    )
+    message = hl7.parse(response["body"])
+
+    # then
+    assert message["MSA"][0][1][0] == "AR"
+    assert message["ERR"][0][3][0] == str(HL7ErrorCode.REQUIRED_FIELD_MISSING.value)
+    assert not send_to_accepted_queue_mock.called
+
+
+def test_accepted_message_handler__converts_and_dead_letters_permanent_failures(
+    mocker: MockFixture,
+    mock_find_care_provider: None,
+    send_to_dead_letter_queue_mock: MagicMock,
+):
+    # given
+    sqs_client = MagicMock()
+    sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    mocker.patch.object(
+        app,
+        app.get_sqs_publisher.__name__,
+        return_value=SQSPublisher(sqs_client, "http://sqs/converted-queue"),
+    )
+    mocker.patch.object(
+        app, app.care_provider_lookup_to_message_attributes.__name__, return_value={}
+    )
+    event = {
+        "Records": [
+            {"messageId": "good-1", "body": RAW_HL7_MESSAGE_GOOD},
+            {"messageId": "missing-field", "body": RAW_HL7_MESSAGE_MISSING_FIELD},
+            {"messageId": "good-2", "body": RAW_HL7_MESSAGE_GOOD},
+        ]
+    }
+
+    # when
+    response = app.accepted_message_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert response == {"batchItemFailures": []}
+    queue_message, reason = send_to_dead_letter_queue_mock.call_args[0]
+    assert queue_message["messageId"] == "missing-field"
+    assert reason == "MissingFamilyNameError"
+    assert sqs_client.send_message_batch.call_count == 1
+    assert len(sqs_client.send_message_batch.call_args.kwargs["Entries"]) == 2
+
+
+def test_lambda_handler__retransmission_replays_ack(
+    mocker: MockFixture, idempotency_store: None
+):
+    # given
+    find_care_provider_mock = mocker.patch.object(
+        app, app._find_care_provider.__name__, MagicMock(return_value=MagicMock())
+    )
+    send_to_sqs_mock = mocker.patch.object(app, app._send_to_sqs.__name__)
+
+    # when
+    first = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    retransmitted = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+
+    # then
+    assert retransmitted["body"] == first["body"]
+    assert find_care_provider_mock.call_count == 1
+    assert send_to_sqs_mock.call_count == 1
+    assert get_idempotency_store().hits == 1
+
+
+def test_lambda_handler__transient_failure_is_not_replayed(
+    mocker: MockFixture, idempotency_store: None, mock_find_care_provider: None
+):
+    # given
+    send_to_sqs_mock = mocker.patch.object(
+        app,
+        app._send_to_sqs.__name__,
+        MagicMock(side_effect=[SQSPublisherException("unreachable"), None]),
+    )
+
+    # when
+    first = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+    retransmitted = lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_GOOD), _DUMMY_LAMBDA_CONTEXT
+    )
+
+    # then
+    assert hl7.parse(first["body"])["MSA"][0][1][0] == "AR"
+    assert hl7.parse(retransmitted["body"])["MSA"][0][1][0] == "AA"
+    assert send_to_sqs_mock.call_count == 2
+
+
+def test_accepted_message_handler__returns_transient_failures_to_queue(
+    mocker: MockFixture, send_to_dead_letter_queue_mock: MagicMock
+):
+    # given
+    mocker.patch.object(
+        app,
+        app._find_care_provider.__name__,
+        MagicMock(side_effect=ManagementInterfaceCircuitOpen),
+    )
+    mocker.patch.object(app, app.get_sqs_publisher.__name__)
+    event = {"Records": [{"messageId": "good-1", "body": RAW_HL7_MESSAGE_GOOD}]}
+
+    # when
+    response = app.accepted_message_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert response == {"batchItemFailures": [{"itemIdentifier": "good-1"}]}
+    assert not send_to_dead_letter_queue_mock.called
+
+
+def test_lambda_handler__emits_stage_latency_metrics(
+    capsys: CaptureFixture,
+    stage_metrics: None,
+    mock_find_care_provider: None,
+    mock_send_to_sqs: None,
+):
+    # when
+    lambda_handler(
+        _create_lambda_body(RAW_HL7_MESSAGE_INVALID_NHS_NUMBER), _DUMMY_LAMBDA_CONTEXT
+    )
+    emitted = [
+        json.loads(line)
+        for line in capsys.readouterr().out.splitlines()
+        if '"CloudWatchMetrics"' in line
+    ]
+
+    # then
+    assert len(emitted) == 1
+    assert (emitted[0]["outcome"], emitted[0]["error_code"]) == (
+        "AR",
+        str(HL7ErrorCode.DATA_TYPE_ERROR.value),
+    )
+    metric_names = {
+        metric["Name"]
+        for metric in emitted[0]["_aws"]["CloudWatchMetrics"][0]["Metrics"]
+    }
+    assert metric_names == {
+        "scanLatency",
+        "idempotencyLatency",
+        "parseLatency",
+        "extractLatency",
+        # the NHS number is only validated once it is read, for the bundle
+        "convertLatency",
+        "totalLatency",
+    }
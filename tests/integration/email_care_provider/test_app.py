@@ -0,0 +1,239 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockFixture
+from urllib3.exceptions import MaxRetryError
+
+from email_care_provider import app
+from email_care_provider.app import lambda_handler
+from email_care_provider.controllers.notify_care_provider import (
+    NotifyCareProviderController,
+)
+from email_care_provider.controllers.notify_batch import get_notify_batch_controller
+from email_care_provider.controllers.pseudo_id.batch_pseudo_id_service import (
+    BatchPseudoIdService,
+)
+from email_care_provider.external_integrations.notify.settings import (
+    get_notify_settings,
+)
+from email_care_provider.internal_integrations.management_interface.exceptions import (
+    CareProviderLocationNotFound,
+)
+from email_care_provider.internal_integrations.sqs.settings import get_sqs_settings
+
+HANS_BUNDLE = """{"resourceType":"Bundle","meta":{"profile":["https://fhir.simplifier.net/Hospital-Activity-Notification-Service/StructureDefinition/ActivityNotification-Bundle"]},"type":"message","entry":[{"fullUrl":"urn:uuid:00000000-0000-0000-0000-000000000001","resource":{"resourceType":"MessageHeader","id":"00000000-0000-0000-0000-000000000001","meta":{"profile":["https://fhir.simplifier.net/Hospital-Activity-Notification-Service/StructureDefinition/ActivityNotification-UKCore-MessageHeader"]},"eventCoding":{"system":"http://terminology.hl7.org/CodeSystem/v2-0003","code":"A01"},"source":{"endpoint":"http://example.com/fhir/R4"},"responsible":{"reference":"urn:uuid:00000000-0000-0000-0000-000000000002"},"focus":[{"reference":"urn:uuid:00000000-0000-0000-0000-000000000003"}]}},{"fullUrl":"urn:uuid:00000000-0000-0000-0000-000000000004","resource":{"resourceType":"Patient","id":"00000000-0000-0000-0000-000000000004","meta":{"profile":["https://fhir.simplifier.net/Hospital-Activity-Notification-Service/StructureDefinition/ActivityNotification-UKCore-Patient"]},"identifier":[{"extension":[{"url":"https://fhir.hl7.org.uk/StructureDefinition/Extension-UKCore-NHSNumberVerificationStatus","valueCodeableConcept":{"coding":[{"system":"https://fhir.hl7.org.uk/CodeSystem/UKCore-NHSNumberVerificationStatusEngland","code":"01","display":"Number present and verified"}]}}],"system":"https://fhir.nhs.uk/Id/nhs-number","value":"2478684691"}],"name":[{"use":"usual","family":"Esterkin","given":["AKI Scenario 6"]}],"birthDate":"1989-01-18"}},{"fullUrl":"urn:uuid:00000000-0000-0000-0000-000000000005","resource":{"resourceType":"Location","id":"00000000-0000-0000-0000-000000000005","meta":{"profile":["https://fhir.hl7.org.uk/StructureDefinition/UKCore-Location"]},"identifier":[{"system":"https://fhir.nhs.uk/Id/ods-site-code","value":"XXXY1"}],"status":"active","name":"RenalWard, Simulated Hospital","address":{"line":["RenalWard","Simulated Hospital"],"city":"Exampletown","postalCode":"XX20 5XX"}}},{"fullUrl":"urn:uuid:00000000-0000-0000-0000-000000000002","resource":{"resourceType":"Organization","id":"00000000-0000-0000-0000-000000000002","meta":{"profile":["https://fhir.hl7.org.uk/StructureDefinition/UKCore-Organization"]},"identifier":[{"system":"https://fhir.nhs.uk/Id/ods-organization-code","value":"XXX"}],"name":"SIMULATED HOSPITAL NHS FOUNDATION TRUST"}},{"fullUrl":"urn:uuid:00000000-0000-0000-0000-000000000003","resource":{"resourceType":"Encounter","id":"00000000-0000-0000-0000-000000000003","meta":{"profile":["https://fhir.simplifier.net/Hospital-Activity-Notification-Service/StructureDefinition/ActivityNotification-UKCore-Encounter"]},"extension":[{"url":"https://fhir.hl7.org.uk/StructureDefinition/Extension-UKCore-AdmissionMethod","valueCodeableConcept":{"coding":[{"system":"https://fhir.hl7.org.uk/CodeSystem/UKCore-AdmissionMethodEngland","code":"28"}]}}],"status":"in-progress","class":{"system":"http://terminology.hl7.org/CodeSystem/v3-ActCode","code":"IMP","display":"inpatient encounter"},"subject":{"reference":"urn:uuid:00000000-0000-0000-0000-000000000004"},"period":{"start":"2020-05-08T13:06:43+00:00"},"location":[{"location":{"reference":"urn:uuid:00000000-0000-0000-0000-000000000005"},"status":"active"}]}}]}"""
+CARE_PROVIDER = """{"resourceType": "Organization", "name": "Your Care Provider Branch Name", "telecom": [{"system": "email", "value": "example@nhs.net", "use": "work"}]}"""
+
+_DUMMY_LAMBDA_CONTEXT = MagicMock(
+    function_name="test",
+    function_memory_size="test",
+    function_arn="test",
+    function_request_id="test",
+)
+
+
+@pytest.fixture(autouse=True)
+def _set_notify_settings(monkeypatch: MonkeyPatch):
+    monkeypatch.setenv("NOTIFY_API_KEY", f"hans_test-{uuid4()}-{uuid4()}")
+    get_notify_settings.cache_clear()
+    get_notify_batch_controller.cache_clear()
+    get_sqs_settings.cache_clear()
+
+
+@pytest.fixture()
+def send_email_to_care_provider_mock(mocker: MockFixture) -> MagicMock:
+    return mocker.patch.object(
+        NotifyCareProviderController,
+        NotifyCareProviderController.send_email_to_care_provider.__name__,
+    )
+
+
+@pytest.fixture()
+def send_to_dead_letter_queue_mock(
+    mocker: MockFixture, monkeypatch: MonkeyPatch
+) -> MagicMock:
+    monkeypatch.setenv("SQS_DEAD_LETTER_QUEUE_URL", "http://sqs/dead-letter-queue")
+    return mocker.patch.object(app, app.send_to_dead_letter_queue.__name__)
+
+
+@pytest.fixture()
+def generate_pseudo_ids_mock(mocker: MockFixture) -> MagicMock:
+    return mocker.patch.object(
+        BatchPseudoIdService,
+        BatchPseudoIdService.generate_pseudo_ids.__name__,
+        MagicMock(
+            side_effect=lambda patients: {
+                patient: f"pseudo-id-{patient[0]}" for patient in patients
+            }
+        ),
+    )
+
+
+def _create_sqs_record(
+    body: str = HANS_BUNDLE,
+    message_attributes: Optional[Dict[str, Any]] = None,
+    message_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return {
+        "messageId": message_id or str(uuid4()),
+        "body": body,
+        "messageAttributes": message_attributes or {},
+    }
+
+
+def _carried_message_attributes() -> Dict[str, Any]:
+    return {
+        "HANSMessageAttributesVersion": {"stringValue": "1", "dataType": "String"},
+        "CareRecipientPseudoId": {"stringValue": "carried", "dataType": "String"},
+        "CareProvider": {"stringValue": CARE_PROVIDER, "dataType": "String"},
+        "CareProviderRetrievedAt": {
+            "stringValue": str(datetime.now(timezone.utc).timestamp()),
+            "dataType": "Number",
+        },
+    }
+
+
+def test_lambda_handler__pseudo_ids_are_computed_once_for_the_batch(
+    send_email_to_care_provider_mock: MagicMock, generate_pseudo_ids_mock: MagicMock
+):
+    # given
+    event = {"Records": [_create_sqs_record(), _create_sqs_record()]}
+
+    # when
+    lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert generate_pseudo_ids_mock.call_count == 1
+    assert send_email_to_care_provider_mock.call_count == 2
+    for call in send_email_to_care_provider_mock.call_args_list:
+        care_provider_lookup = call[1]["care_provider_lookup"]
+        assert care_provider_lookup.care_recipient_pseudo_id == "pseudo-id-2478684691"
+        assert care_provider_lookup.care_provider is None
+
+
+def test_lambda_handler__carried_care_provider_lookup_is_used(
+    send_email_to_care_provider_mock: MagicMock, generate_pseudo_ids_mock: MagicMock
+):
+    # given
+    event = {
+        "Records": [
+            _create_sqs_record(message_attributes=_carried_message_attributes())
+        ]
+    }
+
+    # when
+    lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    care_provider_lookup = send_email_to_care_provider_mock.call_args[1][
+        "care_provider_lookup"
+    ]
+    assert care_provider_lookup.care_recipient_pseudo_id == "carried"
+    assert care_provider_lookup.care_provider.name == "Your Care Provider Branch Name"
+    assert not list(generate_pseudo_ids_mock.call_args[0][0])
+
+
+def test_lambda_handler__only_failed_records_are_reported(
+    send_email_to_care_provider_mock: MagicMock, generate_pseudo_ids_mock: MagicMock
+):
+    # given
+    send_email_to_care_provider_mock.side_effect = [
+        MaxRetryError(pool=None, url="http://test"),
+        None,
+    ]
+    event = {
+        "Records": [
+            _create_sqs_record(message_id="failed"),
+            _create_sqs_record(message_id="succeeded"),
+        ]
+    }
+
+    # when
+    response = lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert send_email_to_care_provider_mock.call_count == 2
+    assert response == {"batchItemFailures": [{"itemIdentifier": "failed"}]}
+
+
+def test_lambda_handler__malformed_record_does_not_fail_the_batch(
+    send_email_to_care_provider_mock: MagicMock, generate_pseudo_ids_mock: MagicMock
+):
+    # given
+    event = {
+        "Records": [
+            _create_sqs_record(body='{"resourceType": "Bundle"', message_id="bad"),
+            _create_sqs_record(message_id="good"),
+        ]
+    }
+
+    # when
+    response = lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert send_email_to_care_provider_mock.call_count == 1
+    assert response == {"batchItemFailures": [{"itemIdentifier": "bad"}]}
+
+
+def test_lambda_handler__successful_batch_reports_no_failures(
+    send_email_to_care_provider_mock: MagicMock, generate_pseudo_ids_mock: MagicMock
+):
+    # when
+    response = lambda_handler(
+        {"Records": [_create_sqs_record()]}, _DUMMY_LAMBDA_CONTEXT
+    )
+
+    # then
+    assert response == {"batchItemFailures": []}
+
+
+def test_lambda_handler__permanent_failures_go_to_the_dead_letter_queue(
+    send_email_to_care_provider_mock: MagicMock,
+    generate_pseudo_ids_mock: MagicMock,
+    send_to_dead_letter_queue_mock: MagicMock,
+):
+    # given
+    send_email_to_care_provider_mock.side_effect = [
+        CareProviderLocationNotFound(),
+        MaxRetryError(pool=None, url="http://test"),
+    ]
+    event = {
+        "Records": [
+            _create_sqs_record(message_id="permanent"),
+            _create_sqs_record(message_id="transient"),
+        ]
+    }
+
+    # when
+    response = lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert response == {"batchItemFailures": [{"itemIdentifier": "transient"}]}
+    queue_message, reason = send_to_dead_letter_queue_mock.call_args[0]
+    assert queue_message["messageId"] == "permanent"
+    assert reason == "CareProviderLocationNotFound"
+
+
+def test_lambda_handler__malformed_bundle_goes_to_the_dead_letter_queue(
+    send_email_to_care_provider_mock: MagicMock,
+    generate_pseudo_ids_mock: MagicMock,
+    send_to_dead_letter_queue_mock: MagicMock,
+):
+    # given
+    event = {
+        "Records": [
+            _create_sqs_record(body='{"resourceType": "Bundle", "type": "message"}')
+        ]
+    }
+
+    # when
+    response = lambda_handler(event, _DUMMY_LAMBDA_CONTEXT)
+
+    # then
+    assert response == {"batchItemFailures": []}
+    assert send_to_dead_letter_queue_mock.call_args[0][1] == "MalformedHANSBundle"
+    assert not send_email_to_care_provider_mock.called
@@ -0,0 +1,389 @@
+"""Drives the four lambda handlers at a fixed request rate against local
+stand-ins for PDS, the management interface, GOV.UK Notify and SQS, and
+reports throughput, latency percentiles and error rate for each.
+
+    PYTHONPATH=src/convert_hl7v2_fhir:src/email_care_provider:src/subscription_create:src/subscription_delete \\
+        python -m tests.load.run_load --rate 20 --duration 30
+
+Stand-in latency and errors are set for every route with --latency-ms,
+--jitter-ms and --error-rate, or for one route with e.g.
+--behaviour management_interface:2000:0.1 (2s latency, 10% of requests
+answered with a 503). Injected 5xx are retried by TimeoutHTTPAdapter, which
+shows in the per-route request counts.
+
+Latency is measured from when a request was due rather than when it
+started, so time spent queued behind --concurrency busy workers counts.
+Email records are taken from what the convert handler sent to SQS, so run
+convert first (the default order) to exercise the usual path.
+
+The convert handler is sent the same good message each time, or messages
+from a corpus of tests.synthetic.adt_corpus: read from a file with --corpus
+(starting over when it runs out) or generated as sent with --synthetic. As a
+corpus holds messages that are rightly rejected, any ACK then counts as a
+success, and the ACKs are tallied by acknowledgement and error code.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from unittest.mock import patch
+from uuid import uuid4
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from tests.load.stand_ins import InProcessSQS, StandInBehaviour, StandInServer
+from tests.synthetic.adt_corpus import generate_messages, read_corpus
+
+HANDLERS = (
+    "convert_hl7v2_fhir",
+    "email_care_provider",
+    "subscription_create",
+    "subscription_delete",
+)
+CONVERTED_QUEUE_URL = "http://in-process-sqs/converted"
+DEAD_LETTER_QUEUE_URL = "http://in-process-sqs/dead-letter"
+
+_VALID_PATIENTS = Path(__file__).parents[1] / "_inputs" / "valid-patients"
+_LAMBDA_CONTEXT = SimpleNamespace(
+    function_name="load-test",
+    memory_limit_in_mb=512,
+    invoked_function_arn="arn:aws:lambda:eu-west-2:000000000000:function:load-test",
+    aws_request_id="load-test",
+)
+
+
+class HandlerReport(NamedTuple):
+    handler: str
+    requests: int
+    errors: int
+    elapsed_seconds: float
+    latencies_ms: List[float]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def percentile(self, percent: float) -> float:
+        # nearest rank
+        ranked = sorted(self.latencies_ms)
+        if not ranked:
+            return 0.0
+        return ranked[max(0, min(len(ranked), round(percent / 100 * len(ranked))) - 1)]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "handler": self.handler,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "throughput_per_second": self.throughput,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+        }
+
+
+def drive(
+    handler: str,
+    invoke: Callable[[], bool],
+    rate: float,
+    duration_seconds: float,
+    concurrency: int,
+) -> HandlerReport:
+    """Calls `invoke` `rate` times a second for `duration_seconds`, `invoke`
+    returns whether the call succeeded (an exception counts as an error)."""
+
+    def timed(due_at: float) -> Tuple[float, bool]:
+        try:
+            succeeded = invoke()
+        except Exception:
+            succeeded = False
+        return (time.perf_counter() - due_at) * 1000, succeeded
+
+    total = max(1, int(rate * duration_seconds))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started_at = time.perf_counter()
+        futures = []
+        for index in range(total):
+            due_at = started_at + index / rate
+            time.sleep(max(0.0, due_at - time.perf_counter()))
+            futures.append(executor.submit(timed, due_at))
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started_at
+
+    return HandlerReport(
+        handler=handler,
+        requests=total,
+        errors=sum(1 for _, succeeded in results if not succeeded),
+        elapsed_seconds=elapsed,
+        latencies_ms=[latency for latency, _ in results],
+    )
+
+
+def configure_environment(base_url: str) -> None:
+    """Points every lambda at the stand-ins. Must run before the lambdas are
+    imported, as some read their settings at import time."""
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    os.environ.update(
+        {
+            "AWS_DEFAULT_REGION": "eu-west-2",
+            "MANAGEMENT_INTERFACE_BASE_URL": base_url,
+            "NOTIFY_BASE_URL": base_url,
+            "NOTIFY_API_KEY": f"load_test-{uuid4()}-{uuid4()}",
+            "PDS_BASE_URL": base_url,
+            "PDS_API_KEY": "load-test",
+            "PDS_JWT_SUB": "load-test",
+            "PDS_JWT_ISS": "load-test",
+            "PDS_JWT_AUD": f"{base_url}/oauth2/token",
+            "PDS_JWKS_KID": "load-test",
+            "PDS_JWT_RSA_PRIVATE_KEY": private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.NoEncryption(),
+            ).decode(),
+            "SQS_CONVERTED_QUEUE_URL": CONVERTED_QUEUE_URL,
+            "SQS_DEAD_LETTER_QUEUE_URL": DEAD_LETTER_QUEUE_URL,
+        }
+    )
+    # handler logs would drown out the report
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+
+def er7_messages(
+    corpus: Optional[Path] = None, synthetic_seed: Optional[int] = None
+) -> Optional[Iterator[str]]:
+    """The messages for the convert handler, None for the good message."""
+
+    if corpus is not None:
+
+        def forever() -> Iterator[str]:
+            while True:
+                yield from read_corpus(corpus)
+
+        return forever()
+
+    if synthetic_seed is not None:
+        return generate_messages(synthetic_seed)
+
+    return None
+
+
+def create_invokers(
+    stand_in_server: StandInServer,
+    sqs: InProcessSQS,
+    email_batch_size: int,
+    messages: Optional[Iterator[str]] = None,
+    ack_outcomes: Optional[Counter] = None,
+) -> Dict[str, Callable[[], bool]]:
+    from convert_hl7v2_fhir.app import _ack_outcome
+    from convert_hl7v2_fhir.app import lambda_handler as convert_handler
+    from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+    from convert_hl7v2_fhir.controllers.er7.er7_message_controller import (
+        ER7MessageController,
+    )
+    from convert_hl7v2_fhir.controllers.er7.er7_parser import parse_er7_message
+    from email_care_provider.app import lambda_handler as email_handler
+    from subscription_create.app import lambda_handler as subscription_create_handler
+    from subscription_delete.app import lambda_handler as subscription_delete_handler
+    from tests.integration.convert_hl7v2_fhir.test_app import RAW_HL7_MESSAGE_GOOD
+
+    patient_jsons = [path.read_text() for path in sorted(_VALID_PATIENTS.iterdir())]
+    for patient_json in patient_jsons:
+        stand_in_server.add_patient(json.loads(patient_json))
+    patients = cycle(patient_jsons)
+    # without the care provider attributes convert_hl7v2_fhir adds, the email
+    #  lambda works out the pseudo ID (and looks up the care provider) itself
+    fallback_bundle = ER7MessageController(
+        er7_extractor=ER7Extractor(parse_er7_message(RAW_HL7_MESSAGE_GOOD))
+    ).to_fhir_bundle_json()
+
+    lock = threading.Lock()
+    ack_outcomes = Counter() if ack_outcomes is None else ack_outcomes
+
+    def convert() -> bool:
+        if messages is None:
+            response = convert_handler({"body": RAW_HL7_MESSAGE_GOOD}, _LAMBDA_CONTEXT)
+            return "\rMSA|AA|" in response["body"]
+
+        # a generator cannot be advanced by two threads at once
+        with lock:
+            message = next(messages)
+        response = convert_handler({"body": message}, _LAMBDA_CONTEXT)
+        accept_code, error_code = _ack_outcome(response["body"])
+        with lock:
+            ack_outcomes[f"{accept_code} {error_code}"] += 1
+        return accept_code in ("AA", "AR")
+
+    converted_records = []
+
+    def email() -> bool:
+        records = sqs.receive_records(CONVERTED_QUEUE_URL, email_batch_size)
+        converted_records.extend(records)
+        if not records:
+            # the queue has run dry, resend what convert_hl7v2_fhir sent before
+            records = [
+                {**record, "messageId": str(uuid4())}
+                for record in converted_records[-email_batch_size:]
+            ] or [
+                {"messageId": str(uuid4()), "body": fallback_bundle}
+                for _ in range(email_batch_size)
+            ]
+        response = email_handler({"Records": records}, _LAMBDA_CONTEXT)
+        return not response["batchItemFailures"]
+
+    def subscription_create() -> bool:
+        response = subscription_create_handler(
+            {"body": next(patients)}, _LAMBDA_CONTEXT
+        )
+        return response["statusCode"] == 201
+
+    def subscription_delete() -> bool:
+        response = subscription_delete_handler(
+            {"pathParameters": {"id": str(uuid4())}}, _LAMBDA_CONTEXT
+        )
+        return response["statusCode"] == 200
+
+    return {
+        "convert_hl7v2_fhir": convert,
+        "email_care_provider": email,
+        "subscription_create": subscription_create,
+        "subscription_delete": subscription_delete,
+    }
+
+
+def run(
+    handlers: List[str],
+    rate: float,
+    duration_seconds: float,
+    concurrency: int,
+    default_behaviour: StandInBehaviour,
+    behaviours: Dict[str, StandInBehaviour],
+    email_batch_size: int = 10,
+    seed: Optional[int] = None,
+    messages: Optional[Iterator[str]] = None,
+) -> Tuple[List[HandlerReport], StandInServer, Counter]:
+    sqs = InProcessSQS()
+    ack_outcomes = Counter()
+    with StandInServer(behaviours, default_behaviour, seed=seed) as stand_in_server:
+        configure_environment(stand_in_server.base_url)
+        with patch(
+            "convert_hl7v2_fhir.internal_integrations.sqs.publisher.client",
+            return_value=sqs,
+        ), patch(
+            "email_care_provider.internal_integrations.sqs.dead_letter_queue.client",
+            return_value=sqs,
+        ):
+            invokers = create_invokers(
+                stand_in_server, sqs, email_batch_size, messages, ack_outcomes
+            )
+            reports = [
+                drive(handler, invokers[handler], rate, duration_seconds, concurrency)
+                for handler in handlers
+            ]
+
+    return reports, stand_in_server, ack_outcomes
+
+
+def _parse_behaviour(value: str) -> Tuple[str, StandInBehaviour]:
+    route, latency_ms, error_rate = value.split(":")
+    return route, StandInBehaviour(
+        latency_seconds=float(latency_ms) / 1000, error_rate=float(error_rate)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--handlers", nargs="+", choices=HANDLERS, default=HANDLERS)
+    parser.add_argument("--rate", type=float, default=10, help="requests a second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--email-batch-size", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument(
+        "--behaviour",
+        action="append",
+        type=_parse_behaviour,
+        default=[],
+        metavar="ROUTE:LATENCY_MS:ERROR_RATE",
+        help="pds_token, pds_patient, management_interface or notify",
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--corpus", type=Path, help="ER7 corpus file for convert")
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="generate ER7 messages for convert, from --seed (or 0)",
+    )
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    reports, stand_in_server, ack_outcomes = run(
+        handlers=args.handlers,
+        rate=args.rate,
+        duration_seconds=args.duration,
+        concurrency=args.concurrency,
+        default_behaviour=StandInBehaviour(
+            latency_seconds=args.latency_ms / 1000,
+            latency_jitter_seconds=args.jitter_ms / 1000,
+            error_rate=args.error_rate,
+        ),
+        behaviours=dict(args.behaviour),
+        email_batch_size=args.email_batch_size,
+        seed=args.seed,
+        messages=er7_messages(
+            args.corpus, (args.seed or 0) if args.synthetic else None
+        ),
+    )
+
+    print(
+        f"{'handler':24}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}"
+    )
+    for report in reports:
+        print(
+            f"{report.handler:24}{report.requests:10d}{report.throughput:10.1f}"
+            f"{report.percentile(50):10.1f}{report.percentile(95):10.1f}"
+            f"{report.percentile(99):10.1f}{report.error_rate:10.1%}"
+        )
+    print("\nstand-in requests (injected errors):")
+    for route, count in sorted(stand_in_server.requests.items()):
+        print(f"  {route:22}{count:8d} ({stand_in_server.errors[route]})")
+
+    if ack_outcomes:
+        print("\nconvert_hl7v2_fhir ACKs (acknowledgement code, error code):")
+        for outcome, count in sorted(ack_outcomes.items()):
+            print(f"  {outcome:22}{count:8d}")
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "handlers": [report.as_dict() for report in reports],
+                    "stand_in_requests": dict(stand_in_server.requests),
+                    "stand_in_errors": dict(stand_in_server.errors),
+                    "convert_hl7v2_fhir_acks": dict(ack_outcomes),
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Local stand-ins for the services the lambdas call, for load testing
+without reaching real NHS services.
+
+`StandInServer` answers, on one local HTTP port, the routes the lambdas use
+of the PDS FHIR API (and its OAuth2 token endpoint), the management
+interface and GOV.UK Notify. `InProcessSQS` takes the place of the boto3
+SQS client.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+CARE_PROVIDER = {
+    "resourceType": "Organization",
+    "name": "Load Test Care Provider",
+    "telecom": [{"system": "email", "value": "load-test@nhs.net", "use": "work"}],
+}
+
+_PDS_PATIENT_PATH = re.compile(r"^/personal-demographics/FHIR/R4/Patient/(\w+)$")
+
+
+class StandInBehaviour(NamedTuple):
+    # added to every response, with up to `latency_jitter_seconds` on top
+    latency_seconds: float = 0.0
+    latency_jitter_seconds: float = 0.0
+    # fraction of requests answered with `error_status` instead
+    error_rate: float = 0.0
+    # 503 is retried by TimeoutHTTPAdapter, so the retries can be observed
+    error_status: int = 503
+
+
+class StandInServer:
+    """Threaded HTTP server with the behaviour of each route configurable.
+
+    Routes are named "pds_token", "pds_patient", "management_interface" and
+    "notify". Requests (including injected errors) are counted by route."""
+
+    def __init__(
+        self,
+        behaviours: Optional[Dict[str, StandInBehaviour]] = None,
+        default_behaviour: StandInBehaviour = StandInBehaviour(),
+        seed: Optional[int] = None,
+    ):
+        self.behaviours = behaviours or {}
+        self.default_behaviour = default_behaviour
+        self.patients: Dict[str, Dict[str, Any]] = {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def add_patient(self, patient: Dict[str, Any]) -> None:
+        # PDS returns the record, so the subscription request matches it
+        self.patients[patient["identifier"][0]["value"]] = patient
+
+    def start(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def respond(self, method: str, path: str) -> Tuple[int, Dict[str, Any]]:
+        route, respond = self._route(method, path)
+        behaviour = self.behaviours.get(route, self.default_behaviour)
+        with self._lock:
+            self.requests[route] += 1
+            delay = behaviour.latency_seconds + (
+                self._random.uniform(0, behaviour.latency_jitter_seconds)
+            )
+            failed = self._random.random() < behaviour.error_rate
+            if failed:
+                self.errors[route] += 1
+
+        time.sleep(delay)
+        if failed:
+            return behaviour.error_status, {"error": "injected by the stand-in"}
+
+        return respond(path)
+
+    def _route(
+        self, method: str, path: str
+    ) -> Tuple[str, Callable[[str], Tuple[int, Dict[str, Any]]]]:
+        if method == "POST" and path == "/oauth2/token":
+            return "pds_token", self._pds_token
+        if method == "GET" and _PDS_PATIENT_PATH.match(path):
+            return "pds_patient", self._pds_patient
+        if method == "POST" and path == "/care-provider-location/_search/":
+            return "management_interface", lambda _: (200, CARE_PROVIDER)
+        if method == "POST" and path == "/v2/notifications/email":
+            return "notify", self._notify
+        return "unknown", lambda _: (404, {"error": "no such stand-in route"})
+
+    @staticmethod
+    def _pds_token(path: str) -> Tuple[int, Dict[str, Any]]:
+        return 200, {
+            "access_token": uuid4().hex,
+            "expires_in": 599,
+            "token_type": "Bearer",
+            "issued_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _pds_patient(self, path: str) -> Tuple[int, Dict[str, Any]]:
+        nhs_number = _PDS_PATIENT_PATH.match(path).group(1)
+        patient = self.patients.get(nhs_number)
+        if patient is None:
+            return 404, {
+                "resourceType": "OperationOutcome",
+                "issue": [
+                    {
+                        "severity": "error",
+                        "code": "value",
+                        "details": {
+                            "coding": [
+                                {
+                                    "system": "https://fhir.nhs.uk/R4/CodeSystem/Spine-ErrorOrWarningCode",
+                                    "code": "RESOURCE_NOT_FOUND",
+                                }
+                            ]
+                        },
+                    }
+                ],
+            }
+
+        return 200, {
+            "resourceType": "Patient",
+            "id": nhs_number,
+            "name": patient["name"],
+            "birthDate": patient["birthDate"],
+        }
+
+    @staticmethod
+    def _notify(path: str) -> Tuple[int, Dict[str, Any]]:
+        notification_id = str(uuid4())
+        return 201, {
+            "id": notification_id,
+            "reference": None,
+            "content": {"subject": "Admission", "body": "", "from_email": ""},
+            "uri": f"/v2/notifications/{notification_id}",
+            "template": {"id": str(uuid4()), "version": 1, "uri": ""},
+        }
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def _respond(self, method: str):
+                # read the body so the connection can be kept alive
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                status, body = stand_in.respond(method, self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class InProcessSQS:
+    """Stand-in for the SendMessage and SendMessageBatch calls of a boto3 SQS
+    client, holding the messages by queue URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queues: Dict[str, List[Dict[str, Any]]] = {}
+
+    def send_message(
+        self,
+        QueueUrl: str,
+        MessageBody: str,
+        MessageAttributes: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        message_id = self._append(QueueUrl, MessageBody, MessageAttributes or {})
+        return {"MessageId": message_id}
+
+    def send_message_batch(
+        self, QueueUrl: str, Entries: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        successful = [
+            {
+                "Id": entry["Id"],
+                "MessageId": self._append(
+                    QueueUrl, entry["MessageBody"], entry.get("MessageAttributes", {})
+                ),
+            }
+            for entry in Entries
+        ]
+        return {"Successful": successful, "Failed": []}
+
+    def receive_records(self, queue_url: str, max_records: int) -> List[Dict[str, Any]]:
+        """Takes up to `max_records` messages off the queue as the records of
+        an SQS lambda event."""
+
+        with self._lock:
+            queue = self.queues.get(queue_url, [])
+            messages, self.queues[queue_url] = queue[:max_records], queue[max_records:]
+
+        return [
+            {
+                "messageId": message["MessageId"],
+                "body": message["MessageBody"],
+                "messageAttributes": {
+                    name: {
+                        "dataType": attribute["DataType"],
+                        "stringValue": attribute.get("StringValue"),
+                    }
+                    for name, attribute in message["MessageAttributes"].items()
+                },
+            }
+            for message in messages
+        ]
+
+    def _append(
+        self, queue_url: str, body: str, message_attributes: Dict[str, Any]
+    ) -> str:
+        message_id = str(uuid4())
+        with self._lock:
+            self.queues.setdefault(queue_url, []).append(
+                {
+                    "MessageId": message_id,
+                    "MessageBody": body,
+                    "MessageAttributes": message_attributes,
+                }
+            )
+        return message_id
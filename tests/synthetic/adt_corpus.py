@@ -0,0 +1,263 @@
+"""Seeded generator of synthetic ER7 messages, mostly HL7v2 ADT, for the
+benchmarks and load tests.
+
+    python -m tests.synthetic.adt_corpus --seed 1 --count 1000000 --output corpus.er7
+    python -m tests.synthetic.adt_corpus --seed 1 --count 1000 --mllp | nc localhost 2575
+
+Messages vary in type and trigger event, patient class, whether the NHS
+number is in PID-2 or PID-3 (and whether it passes the modulus 11 check or
+is there at all), names, the UTC offset of the admit time, the optional
+segments sent and size, up to messages carrying hundreds of OBX segments.
+
+They are generated lazily, so a corpus of any size is written in constant
+memory, and the same seed and options always give the same corpus. A corpus
+file has one message a line (segments are separated by carriage returns as
+usual), or is a stream of MLLP frames with --mllp.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import count as count_from
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional
+
+_START_BLOCK = b"\x0b"
+_END_BLOCK = b"\x1c\x0d"
+
+_FAMILY_NAMES = """
+Smith Jones Williams Taylor Brown Davies Evans Wilson Thomas Johnson
+Roberts Robinson Thompson Wright Walker White Edwards Hughes Green Hall
+Lewis Harris Clarke Patel Jackson Wood Turner Martin Cooper Hill Ward
+Morris Moore Clark Lee King Baker Harrison Morgan Allen James Scott
+Phillips Watson Davis Parker Price Bennett Young Griffiths Mitchell
+Kelly Cook Carter Richardson Bailey Collins Bell Shaw Murphy Miller Cox
+Richards Khan Marshall Anderson Simpson Ellis Adams Singh Begum
+Wilkinson Foster Chapman Powell O'Brien Smith-Jones McDonald Nguyen
+Okafor Kowalski Ahmed Esterkin Puckey
+""".split()
+_GIVEN_NAMES = """
+Oliver George Harry Noah Jack Leo Arthur Muhammad Oscar Charlie Jacob
+Thomas Henry William Olivia Amelia Isla Ava Ivy Freya Lily Florence Mia
+Willow Rosie Sophia Isabella Grace Margaret Susan David John Peter Mary
+Patricia Miles Kathy Aoife Siobhan Chidi Priya Anne-Marie Jean-Luc
+""".split()
+_TITLES = ("Mr", "Mrs", "Miss", "Ms", "Dr", "Mx", "")
+_STREETS = ("High Street", "Station Road", "Church Lane", "Juice Place", "Mill Road")
+_TOWNS = ("London", "Leeds", "Bristol", "Manchester", "Norwich", "Exeter")
+_WARDS = ("RenalWard", "Cardiology", "AMU", "Ward 7B", "Maternity", "ICU")
+_HOSPITALS = ("Simulated Hospital", "St Elsewhere", "Royal Infirmary")
+_OBSERVATIONS = (
+    ("wbc^Wbc^Local^6690-2^Wbc^LN", "/nl", "3.8-11.0", 3.8, 11.0),
+    ("neutros^Neutros^Local^770-8^Neutros^LN", "%", "40-82", 40, 82),
+    ("hgb^Hgb^Local^718-7^Hgb^LN", "g/dl", "12.0-14.1", 12.0, 14.1),
+    ("plt^Platelets^Local^777-3^Platelets^LN", "/nl", "140-400", 140, 400),
+    ("crea^Creatinine^Local^2160-0^Creatinine^LN", "umol/l", "45-90", 45, 90),
+    ("k^Potassium^Local^2823-3^Potassium^LN", "mmol/l", "3.5-5.3", 3.5, 5.3),
+)
+
+
+class CorpusProfile(NamedTuple):
+    """How often each variation appears. Weights are relative, rates are the
+    fraction of messages."""
+
+    trigger_events: Dict[str, float] = {
+        "A01": 60,
+        "A02": 8,
+        "A03": 12,
+        "A04": 8,
+        "A08": 8,
+        "A11": 2,
+        "A13": 2,
+    }
+    patient_classes: Dict[str, float] = {"I": 70, "E": 12, "O": 10, "P": 4, "R": 4}
+    # only the pilot partner's "28b" is mapped to a FHIR admission method
+    admission_types: Dict[str, float] = {"28b": 100}
+    # UTC offsets of the admit time, "" for none
+    utc_offsets: Dict[str, float] = {"": 40, "+0000": 25, "+0100": 30, "-0500": 5}
+    # sent as ORU^R01 rather than ADT
+    non_adt_rate: float = 0.02
+    # NHS number in PID-2 rather than in the PID-3 list
+    nhs_number_in_pid2_rate: float = 0.3
+    invalid_nhs_number_rate: float = 0.03
+    missing_nhs_number_rate: float = 0.01
+    # each of PD1, NK1, AL1 and DG1 is sent at this rate
+    optional_segment_rate: float = 0.5
+    # messages with `large_message_obx` OBX segments, the rest have up to 5
+    large_message_rate: float = 0.01
+    large_message_obx: int = 500
+
+
+def nhs_number(rand: random.Random, valid: bool = True) -> str:
+    """A 10 digit number passing (or failing) the modulus 11 check."""
+
+    while True:
+        main_part = "".join(str(rand.randint(0, 9)) for _ in range(9))
+        total = sum((10 - index) * int(digit) for index, digit in enumerate(main_part))
+        check_digit = (11 - total % 11) % 11
+        # a check digit of 10 means the number is never issued
+        if check_digit != 10:
+            break
+
+    if not valid:
+        # only one check digit passes, any other fails
+        check_digit = (check_digit + rand.randint(1, 9)) % 10
+    return f"{main_part}{check_digit}"
+
+
+class _MessageGenerator:
+    def __init__(self, seed: int, profile: CorpusProfile):
+        self.seed = seed
+        self.profile = profile
+        self.rand = random.Random(seed)
+        self._epoch = datetime(2023, 1, 1)
+
+    def _pick(self, weights: Dict[str, float]) -> str:
+        return self.rand.choices(tuple(weights), weights=tuple(weights.values()))[0]
+
+    def _chance(self, rate: float) -> bool:
+        return self.rand.random() < rate
+
+    def _timestamp(self, at: datetime) -> str:
+        return at.strftime("%Y%m%d%H%M%S")
+
+    def message(self, index: int) -> str:
+        rand, profile = self.rand, self.profile
+        sent_at = self._epoch + timedelta(seconds=index * 7 + rand.randint(0, 6))
+        admitted_at = sent_at - timedelta(minutes=rand.randint(0, 600))
+        if self._chance(profile.non_adt_rate):
+            message_type, trigger_event = "ORU", "R01"
+        else:
+            message_type, trigger_event = "ADT", self._pick(profile.trigger_events)
+
+        mrn = f"{rand.randint(0, 10**10 - 1):010d}^^^SIMULATOR MRN^MRN"
+        pid2, pid3 = mrn, mrn
+        if not self._chance(profile.missing_nhs_number_rate):
+            valid = not self._chance(profile.invalid_nhs_number_rate)
+            nhs = f"{nhs_number(rand, valid)}^^^NHSNBR^NHSNMBR"
+            if self._chance(profile.nhs_number_in_pid2_rate):
+                pid2 = nhs
+            else:
+                pid3 = f"{mrn}~{nhs}"
+
+        family_name = rand.choice(_FAMILY_NAMES)
+        given_name = rand.choice(_GIVEN_NAMES)
+        middle_names = " ".join(rand.sample(_GIVEN_NAMES, rand.randint(0, 2)))
+        sex = rand.choice("MFU")
+        born_on = self._epoch - timedelta(days=rand.randint(0, 100 * 365))
+        address = (
+            f"{rand.randint(1, 300)} {rand.choice(_STREETS)}^^{rand.choice(_TOWNS)}"
+            f"^^RW{rand.randint(1, 99)} {rand.randint(1, 9)}KC^GBR^HOME"
+        )
+        doctor = f"C{rand.randint(1, 999):03d}^{rand.choice(_FAMILY_NAMES)}^{rand.choice(_GIVEN_NAMES)}^^^Dr^^^DRNBR^PRSNL^^^ORGDR"
+        location = (
+            f"{rand.choice(_WARDS)}^Room {rand.randint(1, 20)}^Bed {rand.randint(1, 8)}"
+            f"^{rand.choice(_HOSPITALS)}^^BED^Main Building^{rand.randint(1, 9)}"
+        )
+        admit_time = self._timestamp(admitted_at) + self._pick(profile.utc_offsets)
+
+        segments = [
+            f"MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|{self._timestamp(sent_at)}||{message_type}^{trigger_event}|{self.seed}-{index}|P|2.3|||AL||44|ASCII",
+            f"EVN|{trigger_event}|{self._timestamp(sent_at)}|||{doctor}|",
+            f"PID|1|{pid2}|{pid3}||{family_name}^{given_name}^{middle_names}^^{rand.choice(_TITLES)}^^CURRENT||{self._timestamp(born_on)}|{sex}|||{address}||0{rand.randint(10**9, 10**10 - 1)}^HOME|||||||||||||||||||",
+        ]
+        if self._chance(profile.optional_segment_rate):
+            segments.append(f"PD1|||FAMILY PRACTICE^^{rand.randint(10000, 99999)}|")
+        segments.append(
+            f"PV1|1|{self._pick(profile.patient_classes)}|{location}|{self._pick(profile.admission_types)}|||{doctor}|||MED|||||||||{rand.getrandbits(63)}^^^^visitid||||||||||||||||||||||ARRIVED|||{admit_time}||"
+        )
+        if self._chance(profile.optional_segment_rate):
+            segments.append(
+                f"NK1|1|{family_name}^{rand.choice(_GIVEN_NAMES)}|{rand.choice(('FTH', 'MTH', 'SPO', 'CHD'))}|{address}"
+            )
+        if self._chance(profile.optional_segment_rate):
+            segments.append("AL1|1|DA|PENICILLIN^Penicillin^Local|SV|Rash")
+        if self._chance(profile.optional_segment_rate):
+            segments.append(f"DG1|1||N17.9^Acute kidney failure^I10||{admit_time}|A")
+
+        observations = (
+            profile.large_message_obx
+            if self._chance(profile.large_message_rate)
+            else rand.randint(0, 5)
+        )
+        for set_id in range(1, observations + 1):
+            code, units, reference_range, low, high = rand.choice(_OBSERVATIONS)
+            value = round(rand.uniform(low * 0.8, high * 1.2), 1)
+            flag = "L" if value < low else "H" if value > high else ""
+            segments.append(
+                f"OBX|{set_id}|NM|{code}||{value}|{units}|{reference_range}|{flag}|||F|||{admit_time}|lab|12^XYZ LAB|"
+            )
+
+        return "\r".join(segments)
+
+
+def generate_messages(
+    seed: int = 0, count: Optional[int] = None, profile: CorpusProfile = CorpusProfile()
+) -> Iterator[str]:
+    """Yields `count` messages, or never stops if `count` is None. Message
+    control IDs are "<seed>-<index>", so unique within a corpus."""
+
+    generator = _MessageGenerator(seed, profile)
+    indices = count_from() if count is None else range(count)
+    return (generator.message(index) for index in indices)
+
+
+def write_corpus(stream: BinaryIO, messages: Iterable[str], mllp: bool = False) -> int:
+    written = 0
+    for message in messages:
+        if mllp:
+            stream.write(_START_BLOCK + message.encode() + _END_BLOCK)
+        else:
+            stream.write(message.encode() + b"\n")
+        written += 1
+    return written
+
+
+def read_corpus(path: Path) -> Iterator[str]:
+    """Streams the messages of a corpus file written without --mllp."""
+
+    # split on newlines only, the carriage returns separate segments
+    with open(path, encoding="utf-8", newline="\n") as corpus:
+        for line in corpus:
+            if line.strip():
+                yield line.rstrip("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument(
+        "--output", type=Path, help="file to write, stdout if not given"
+    )
+    parser.add_argument("--mllp", action="store_true", help="write MLLP frames")
+    parser.add_argument("--large-message-rate", type=float)
+    parser.add_argument("--large-message-obx", type=int)
+    parser.add_argument("--invalid-nhs-number-rate", type=float)
+    parser.add_argument("--non-adt-rate", type=float)
+    args = parser.parse_args()
+
+    overrides = {
+        field: getattr(args, field)
+        for field in (
+            "large_message_rate",
+            "large_message_obx",
+            "invalid_nhs_number_rate",
+            "non_adt_rate",
+        )
+        if getattr(args, field) is not None
+    }
+    messages = generate_messages(args.seed, args.count, CorpusProfile(**overrides))
+    if args.output is None:
+        write_corpus(sys.stdout.buffer, messages, mllp=args.mllp)
+        sys.stdout.buffer.flush()
+        return
+
+    with open(args.output, "wb") as output:
+        write_corpus(output, messages, mllp=args.mllp)
+
+
+if __name__ == "__main__":
+    main()
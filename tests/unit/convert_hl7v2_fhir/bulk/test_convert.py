@@ -0,0 +1,140 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from convert_hl7v2_fhir.bulk.convert import (
+    BulkConverter,
+    Checkpoint,
+    ConversionOutcome,
+    convert_er7_message,
+)
+from convert_hl7v2_fhir.bulk.exceptions import (
+    CheckpointMismatchError,
+    UnresumableInputError,
+)
+from convert_hl7v2_fhir.bulk.reader import SourceMessage
+
+_GOOD = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|{id}|T|2.3|||AL||44|ASCII\rEVN|A01|20230411130643|||C006^Buckley^Mark^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|9728002378^^^NHSNBR^NHSNMBR|9728002378^^^NHSNBR^NHSNMBR||PUCKEY^Miles^Keith^^^^CURRENT||19610608000000|M||||||||||||||||||||||\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^Main Building^5|28b||||||MED|||||||||||||||||||||||||||||||ARRIVED|||20200508130643||"
+_NOT_ADMISSION = _GOOD.replace("ADT^A01", "ADT^A03")
+_INVALID_NHS_NUMBER = _GOOD.replace("9728002378", "9728002379")
+
+
+def _write_corpus(path: Path, messages) -> str:
+    path.write_bytes("".join(f"{message}\n" for message in messages).encode())
+    return str(path)
+
+
+def _converter(tmp_path: Path, inputs, **kwargs) -> BulkConverter:
+    return BulkConverter(
+        inputs=inputs,
+        bundles_path=tmp_path / "bundles.ndjson",
+        report_path=tmp_path / "report.ndjson",
+        checkpoint_path=tmp_path / "checkpoint.json",
+        max_workers=2,
+        chunk_size=2,
+        chunks_per_worker=1,
+        **kwargs,
+    )
+
+
+def _lines(path: Path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.parametrize(
+    "raw_er7_message,outcome,error_code",
+    [
+        (_GOOD, ConversionOutcome.CONVERTED, None),
+        (_NOT_ADMISSION, ConversionOutcome.SKIPPED, 201),
+        (_INVALID_NHS_NUMBER, ConversionOutcome.FAILED, 102),
+    ],
+)
+def test_convert_er7_message(raw_er7_message: str, outcome, error_code):
+    # when
+    result = convert_er7_message(SourceMessage("-", 0, raw_er7_message.format(id=7)))
+
+    # then
+    assert result.outcome == outcome
+    assert result.error_code == error_code
+    assert result.message_control_id == "7"
+    assert (result.bundle_json is not None) is (outcome == ConversionOutcome.CONVERTED)
+
+
+def test_bulk_converter__writes_bundles_in_input_order_and_reports_failures(
+    tmp_path: Path,
+):
+    # given
+    corpus = _write_corpus(
+        tmp_path / "corpus.er7",
+        [
+            _GOOD.format(id=1),
+            _INVALID_NHS_NUMBER.format(id=2),
+            _NOT_ADMISSION.format(id=3),
+            *(_GOOD.format(id=id) for id in range(4, 9)),
+        ],
+    )
+
+    # when
+    checkpoint = _converter(tmp_path, [corpus]).run()
+
+    # then
+    assert (checkpoint.converted, checkpoint.skipped, checkpoint.failed) == (6, 1, 1)
+    bundles = _lines(tmp_path / "bundles.ndjson")
+    assert [b["entry"][0]["resource"]["resourceType"] for b in bundles] == [
+        "MessageHeader"
+    ] * 6
+    assert _lines(tmp_path / "report.ndjson") == [
+        {
+            "source": corpus,
+            "index": 1,
+            "outcome": "failed",
+            "message_control_id": "2",
+            "error_code": 102,
+            "error_message": "NHS Number in message was invalid",
+        }
+    ]
+    assert Checkpoint.load(tmp_path / "checkpoint.json") == checkpoint
+
+
+def test_bulk_converter__resumes_from_checkpoint(tmp_path: Path):
+    # given
+    corpus = _write_corpus(
+        tmp_path / "corpus.er7", [_GOOD.format(id=id) for id in range(5)]
+    )
+    converter = _converter(tmp_path, [corpus])
+    converter.run()
+    bundles = (tmp_path / "bundles.ndjson").read_bytes().splitlines(keepends=True)
+    # as if the run stopped after two messages, part way through the next write
+    (tmp_path / "bundles.ndjson").write_bytes(b"".join(bundles[:3]) + b'{"resou')
+    Checkpoint(
+        inputs=[corpus],
+        messages=2,
+        bundles_bytes=len(b"".join(bundles[:2])),
+        converted=2,
+    ).save(tmp_path / "checkpoint.json")
+
+    # when
+    checkpoint = converter.run(resume=True)
+
+    # then
+    assert (checkpoint.messages, checkpoint.converted) == (5, 5)
+    assert len(_lines(tmp_path / "bundles.ndjson")) == 5
+
+
+def test_bulk_converter__rejects_checkpoint_for_other_inputs(tmp_path: Path):
+    # given
+    Checkpoint(inputs=["other.er7"], messages=2).save(tmp_path / "checkpoint.json")
+
+    # when / then
+    with pytest.raises(CheckpointMismatchError):
+        _converter(tmp_path, ["corpus.er7"]).run(resume=True)
+
+
+def test_bulk_converter__refuses_to_resume_from_stdin(tmp_path: Path):
+    # given
+    Checkpoint(inputs=["-"], messages=2).save(tmp_path / "checkpoint.json")
+
+    # when / then
+    with pytest.raises(UnresumableInputError):
+        _converter(tmp_path, ["-"]).run(resume=True)
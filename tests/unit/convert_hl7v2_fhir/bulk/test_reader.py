@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from convert_hl7v2_fhir.bulk.reader import (
+    SourceMessage,
+    iter_er7_messages,
+    iter_sources,
+    split_er7_messages,
+)
+
+_MESSAGE_1 = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|1|T|2.3\rEVN|A01|20200508130643"
+_MESSAGE_2 = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|2|T|2.3\rPV1|1|I"
+
+
+def test_split_er7_messages__one_message_a_line():
+    assert list(split_er7_messages([f"{_MESSAGE_1}\n", f"{_MESSAGE_2}\n"])) == [
+        _MESSAGE_1,
+        _MESSAGE_2,
+    ]
+
+
+def test_split_er7_messages__one_segment_a_line():
+    # given
+    lines = [f"{segment}\r\n" for segment in f"{_MESSAGE_1}\r{_MESSAGE_2}".split("\r")]
+
+    # when
+    messages = list(split_er7_messages(lines))
+
+    # then
+    assert messages == [_MESSAGE_1, _MESSAGE_2]
+
+
+def test_split_er7_messages__drops_mllp_framing_and_batch_envelope():
+    # given
+    lines = [
+        "FHS|^~\\&|SIMHOSP\r",
+        "BHS|^~\\&|SIMHOSP\r",
+        f"\x0b{_MESSAGE_1}\r\x1c\r",
+        f"\x0b{_MESSAGE_2}\r\x1c\r",
+        "BTS|2\r",
+        "FTS|1\r",
+    ]
+
+    # when
+    messages = list(split_er7_messages(lines))
+
+    # then
+    assert messages == [_MESSAGE_1, _MESSAGE_2]
+
+
+def test_iter_sources__expands_directories_in_name_order(tmp_path: Path):
+    # given
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "2.hl7").write_text(_MESSAGE_2)
+    (tmp_path / "1.hl7").write_text(_MESSAGE_1)
+
+    # when
+    sources = list(iter_sources([str(tmp_path), "-"]))
+
+    # then
+    assert sources == [str(tmp_path / "1.hl7"), str(tmp_path / "b" / "2.hl7"), "-"]
+
+
+def test_iter_er7_messages__positions_messages_within_their_source(tmp_path: Path):
+    # given
+    corpus = tmp_path / "corpus.er7"
+    # carriage returns inside a line are segment separators, not line breaks
+    corpus.write_bytes(f"{_MESSAGE_1}\n{_MESSAGE_2}\n".encode())
+
+    # when
+    messages = list(iter_er7_messages([str(corpus)]))
+
+    # then
+    assert messages == [
+        SourceMessage(str(corpus), 0, _MESSAGE_1),
+        SourceMessage(str(corpus), 1, _MESSAGE_2),
+    ]
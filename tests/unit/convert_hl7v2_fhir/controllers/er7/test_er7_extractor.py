@@ -1,7 +1,9 @@
 import datetime
 
 import pytest
+from hl7apy.core import Segment
 from hl7apy.exceptions import ValidationError
+from pytest_mock import MockFixture
 
 from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
 from convert_hl7v2_fhir.controllers.er7.exceptions import (
@@ -92,3 +94,54 @@ def test_er7_extractor__nhs_number_in_pid_2_field_but_not_in_pid_3_field():
     extractor = ER7Extractor(er7_message=er7_message)
 
     assert extractor.nhs_number() == "2478684691"
+
+
+def test_er7_extractor__extract_good_message():
+    extractor = ER7Extractor(er7_message=parse_message(RAW_ER7_MESSAGE_GOOD))
+
+    er7_snapshot = extractor.extract()
+
+    for field in er7_snapshot.FIELDS:
+        assert getattr(er7_snapshot, field) == getattr(extractor, field)()
+
+
+def test_er7_extractor__extract_validates_pv1_once(mocker: MockFixture):
+    # given
+    extractor = ER7Extractor(er7_message=parse_message(RAW_ER7_MESSAGE_GOOD))
+    validate_spy = mocker.spy(Segment, Segment.validate.__name__)
+
+    # when
+    extractor.extract()
+
+    # then
+    assert validate_spy.call_count == 1
+
+
+def test_er7_extractor__extract_raises_failures_when_read():
+    # given
+    extractor = ER7Extractor(er7_message=parse_message(RAW_ER7_MESSAGE_MISSING_SEGMENT))
+
+    # when
+    er7_snapshot = extractor.extract()
+
+    # then
+    assert er7_snapshot.nhs_number == "2478684691"
+    with pytest.raises(ValidationError):
+        er7_snapshot.patient_class
+    with pytest.raises(ValidationError):
+        er7_snapshot.patient_location
+
+
+def test_er7_extractor__extract_is_immutable():
+    er7_snapshot = ER7Extractor(
+        er7_message=parse_message(RAW_ER7_MESSAGE_GOOD)
+    ).extract()
+
+    with pytest.raises(AttributeError):
+        er7_snapshot.nhs_number = "9728002378"
+
+    with pytest.raises(AttributeError):
+        er7_snapshot._nhs_number = "9728002378"
+
+    with pytest.raises(AttributeError):
+        er7_snapshot.extra_field = "value"
@@ -0,0 +1,80 @@
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_parser import (
+    parse_er7_message,
+    parse_er7_message_selectively,
+)
+from convert_hl7v2_fhir.controllers.er7.settings import get_er7_parser_settings
+
+RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPD1|||FAMILY PRACTICE^^12345|\rNK1|1|Esterkin^John|FTH|\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||\rOBX|1|NM|wbc^Wbc^Local^6690-2^Wbc^LN||7.0|/nl|3.8-11.0||||F|||20120410160227|lab|12^XYZ LAB|\rOBX|2|NM|neutros^Neutros^Local^770-8^Neutros^LN||68|%|40-82||||F|||20120410160227|lab|12^XYZ LAB|\rAL1|1|DA|PENICILLIN\rZHA|SIMHOSP|example@example.com\r"
+
+
+@pytest.fixture()
+def er7_parser_settings(monkeypatch: MonkeyPatch):
+    get_er7_parser_settings.cache_clear()
+    yield monkeypatch
+    get_er7_parser_settings.cache_clear()
+
+
+@pytest.mark.parametrize("find_groups", [True, False])
+def test_parse_er7_message_selectively__extracts_same_values_as_full_parse(
+    find_groups: bool,
+):
+    # given
+    full_extractor = ER7Extractor(
+        parse_message(RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS, find_groups=find_groups)
+    )
+
+    # when
+    selective_extractor = ER7Extractor(
+        parse_er7_message_selectively(
+            RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS, find_groups=find_groups
+        )
+    )
+
+    # then
+    for field in (
+        "nhs_number",
+        "family_name",
+        "given_name",
+        "date_of_birth",
+        "event_type_code",
+        "patient_location",
+        "patient_class",
+        "admission_type",
+        "time_of_admission",
+        "message_type",
+        "trigger_event",
+    ):
+        assert getattr(selective_extractor, field)() == getattr(full_extractor, field)()
+
+
+def test_parse_er7_message_selectively__skips_other_segments():
+    # when
+    er7_message = parse_er7_message_selectively(RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS)
+
+    # then
+    assert [s.name for s in er7_message.children] == ["MSH", "EVN", "PID", "PV1"]
+
+
+def test_parse_er7_message__full_parse_by_default(er7_parser_settings: MonkeyPatch):
+    er7_message = parse_er7_message(RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS)
+
+    assert "OBX" in [s.name for s in er7_message.children]
+
+
+def test_parse_er7_message__selective_parsing_enabled(
+    er7_parser_settings: MonkeyPatch,
+):
+    # given
+    er7_parser_settings.setenv("ER7_PARSER_SELECTIVE_PARSING", "true")
+    er7_parser_settings.setenv("ER7_PARSER_FIND_GROUPS", "false")
+
+    # when
+    er7_message = parse_er7_message(RAW_ER7_MESSAGE_WITH_EXTRA_SEGMENTS)
+
+    # then
+    assert [s.name for s in er7_message.children] == ["MSH", "EVN", "PID", "PV1"]
@@ -0,0 +1,96 @@
+import pytest
+from hl7apy.parser import parse_message
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_scanner import (
+    ER7Header,
+    scan_er7_header,
+)
+
+RAW_ER7_MESSAGE_GOOD = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPD1|||FAMILY PRACTICE^^12345|\rPV1|1|I|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
+RAW_ER7_MESSAGE_EMERGENCY = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3|||AL||44|ASCII\rEVN|A01|20200508130643|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|\rPID|1|2590157853^^^SIMULATOR MRN^MRN|2590157853^^^SIMULATOR MRN^MRN~2478684691^^^NHSNBR^NHSNMBR||Esterkin^AKI Scenario 6^^^Miss^^CURRENT||19890118000000|F|||170 Juice Place^^London^^RW21 6KC^GBR^HOME||020 5368 1665^HOME|||||||||R^Other - Chinese^^^||||||||\rPD1|||FAMILY PRACTICE^^12345|\rPV1|1|E|RenalWard^MainRoom^Bed 1^Simulated Hospital^^BED^MainBuilding^5|28b|||C006^Wolf^Kathy^^^Dr^^^DRNBR^PRSNL^^^ORGDR|||MED|||||||||6145914547062969032^^^^visitid||||||||||||||||||||||ARRIVED|||20200508130643||"
+RAW_ER7_MESSAGE_DISCHARGE = "MSH|^~\\&|SendingApp|SendingFacility|HL7API|PKB|20160102101112||ADT^A03|ABC0000000001|P|2.4\rPID|||9999999999^^^NHS^NH||Smith^John^Joe^^Mr||19700101|M|||Flat name^1, The Road^London^London^SW1A 1AA^GBR||01234567890^PRN~07123456789^PRS|^NET^^john.smith@company.com~01234098765^WPN||||||||||||||||N|\rPV1|1|I|^^^^^^^^My Ward||||^Jones^Stuart^James^^Dr^|^Smith^William^^^Dr^|^Foster^Terry^^^Mr^||||||||||V00001|||||||||||||||||||||||||201508011000|201508011200"
+RAW_ER7_MESSAGE_RESULTS = "MSH|^~\\&|SendingApp|SendingFac|ReceivingApp|ReceivingFac|20120411070545||ORU^R01|59689|P|2.3\rPID|1|12345|12345^^^MIE&1.2.840.114398.1.100&ISO^MR||MOUSE^MINNIE^S||19240101|F|||123 MOUSEHOLE LN^^FORT WAYNE^IN^46808|||||||||||||||||||\rPV1|1|O|||||71^DUCK^DONALD||||||||||||12376|||||||||||||||||||||||||20120410160227||||||\rOBX|1|NM|wbc^Wbc^Local^6690-2^Wbc^LN||7.0|/nl|3.8-11.0||||F|||20120410160227|lab|12^XYZ LAB|"
+RAW_ER7_MESSAGE_ALTERNATIVE_SEPARATORS = (
+    "MSH#$*\\&#SIMHOSP#SFAC#RAPP#RFAC#20200508130643##ADT$A01#5#T#2.3\rPV1#1#O"
+)
+
+
+@pytest.mark.parametrize(
+    "raw_er7_message",
+    [
+        RAW_ER7_MESSAGE_GOOD,
+        RAW_ER7_MESSAGE_EMERGENCY,
+        RAW_ER7_MESSAGE_DISCHARGE,
+    ],
+)
+def test_scan_er7_header__agrees_with_full_parse(raw_er7_message: str):
+    # given
+    er7_message = parse_message(raw_er7_message)
+    extractor = ER7Extractor(er7_message=er7_message)
+
+    # when
+    er7_header = scan_er7_header(raw_er7_message)
+
+    # then
+    assert er7_header == ER7Header(
+        sending_application=er7_message.msh.sending_application.value,
+        sending_facility=er7_message.msh.sending_facility.value,
+        message_control_id=er7_message.msh.message_control_id.value,
+        message_type=extractor.message_type(),
+        trigger_event=extractor.trigger_event(),
+        patient_class=extractor.patient_class(),
+    )
+
+
+def test_scan_er7_header__not_adt_message():
+    er7_header = scan_er7_header(RAW_ER7_MESSAGE_RESULTS)
+
+    assert er7_header.message_type == "ORU"
+    assert er7_header.trigger_event == "R01"
+    assert er7_header.message_control_id == "59689"
+
+
+def test_scan_er7_header__uses_declared_separators():
+    er7_header = scan_er7_header(RAW_ER7_MESSAGE_ALTERNATIVE_SEPARATORS)
+
+    assert er7_header.message_type == "ADT"
+    assert er7_header.trigger_event == "A01"
+    assert er7_header.patient_class == "O"
+
+
+@pytest.mark.parametrize(
+    "raw_er7_message",
+    [
+        "",
+        "PID|1",
+        "MSH|^~\\&|SIMHOSP|SFAC",
+        "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|",
+        "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT~ORU^A01|5|T|2.3",
+    ],
+)
+def test_scan_er7_header__falls_back_when_header_cannot_be_scanned(
+    raw_er7_message: str,
+):
+    assert scan_er7_header(raw_er7_message) is None
+
+
+@pytest.mark.parametrize(
+    "pv1_segments",
+    [
+        "",
+        "\rPV1|1|",
+        "\rPV1|1|I^X",
+        "\rPV1|1|\\E\\",
+        "\rPV1|1|I\rPV1|1|E",
+    ],
+)
+def test_scan_er7_header__patient_class_unknown_when_pv1_cannot_be_scanned(
+    pv1_segments: str,
+):
+    raw_er7_message = (
+        "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|5|T|2.3"
+        + pv1_segments
+    )
+
+    assert scan_er7_header(raw_er7_message).patient_class is None
@@ -0,0 +1,81 @@
+import hl7
+
+from convert_hl7v2_fhir.controllers.hl7.hl7_ack_builder import (
+    generate_batch_ack_message,
+)
+from convert_hl7v2_fhir.controllers.hl7.hl7_batch import (
+    is_hl7_batch,
+    iter_hl7_batch_messages,
+    scan_hl7_batch_header,
+)
+
+_MESSAGE_1 = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|1|T|2.3\rEVN|A01|20200508130643"
+_MESSAGE_2 = "MSH|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||ADT^A01|2|T|2.3\rPV1|1|I"
+_FILE_HEADER = "FHS|^~\\&|SIMHOSP|SFAC|RAPP|RFAC|20200508130643||||FILE1"
+_BATCH_HEADER = "BHS|^~\\&|BATCHAPP|BATCHFAC|RAPP|RFAC|20200508130643||||BATCH1"
+
+
+def test_is_hl7_batch():
+    assert is_hl7_batch(f"{_FILE_HEADER}\r{_MESSAGE_1}") is True
+    assert is_hl7_batch(f"{_BATCH_HEADER}\r{_MESSAGE_1}") is True
+    assert is_hl7_batch(_MESSAGE_1) is False
+
+
+def test_scan_hl7_batch_header__prefers_batch_header():
+    # given
+    raw = f"{_FILE_HEADER}\r{_BATCH_HEADER}\r{_MESSAGE_1}\rBTS|1\rFTS|1"
+
+    # when
+    header = scan_hl7_batch_header(raw)
+
+    # then
+    assert header.sending_application == "BATCHAPP"
+    assert header.sending_facility == "BATCHFAC"
+    assert header.batch_control_id == "BATCH1"
+    assert header.file_control_id == "FILE1"
+
+
+def test_scan_hl7_batch_header__without_file_header():
+    # when
+    header = scan_hl7_batch_header(f"{_BATCH_HEADER}\r{_MESSAGE_1}\rBTS|1")
+
+    # then
+    assert header.batch_control_id == "BATCH1"
+    assert header.file_control_id is None
+
+
+def test_iter_hl7_batch_messages__splits_messages_and_drops_envelope():
+    # given
+    raw = f"{_FILE_HEADER}\r{_BATCH_HEADER}\r{_MESSAGE_1}\r{_MESSAGE_2}\rBTS|2\rFTS|1\r"
+
+    # when
+    messages = list(iter_hl7_batch_messages(raw))
+
+    # then
+    assert messages == [_MESSAGE_1, _MESSAGE_2]
+
+
+def test_generate_batch_ack_message__wraps_acks_in_envelope():
+    # given
+    acks = [
+        "MSH|^~\\&|HANS|NHSENGLAND\rMSA|AA|1",
+        "MSH|^~\\&|HANS|NHSENGLAND\rMSA|AA|2",
+    ]
+
+    # when
+    batch_ack = generate_batch_ack_message(
+        receiving_application="BATCHAPP",
+        receiving_facility="BATCHFAC",
+        replying_to_batch_id="BATCH1",
+        ack_messages=acks,
+        replying_to_file_id="FILE1",
+    )
+    segments = batch_ack.split("\r")
+
+    # then
+    assert segments[0].startswith("FHS|")
+    assert hl7.parse(segments[1])["BHS"][0][5][0] == "BATCHAPP"
+    assert segments[1].split("|")[11] == "BATCH1"
+    assert segments[0].split("|")[11] == "FILE1"
+    assert segments[-2:] == ["BTS|2", "FTS|1"]
+    assert [s for s in segments if s.startswith("MSA")] == ["MSA|AA|1", "MSA|AA|2"]
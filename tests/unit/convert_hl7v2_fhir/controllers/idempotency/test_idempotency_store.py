@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from convert_hl7v2_fhir.controllers.idempotency.idempotency_store import (
+    DynamoDBIdempotencyStore,
+    IdempotencyStore,
+    InMemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+    create_idempotency_key,
+)
+
+_KEY = create_idempotency_key("SIMHOSP", "SFAC", "5")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeDynamoDBTable:
+    """In-process stand-in for the get_item and put_item of a boto3 Table."""
+
+    def __init__(self):
+        self.items: Dict[str, Dict[str, Any]] = {}
+
+    def get_item(self, Key: Dict[str, str], ConsistentRead: bool = False):
+        item = self.items.get(Key["idempotency_key"])
+        return {"Item": dict(item)} if item is not None else {}
+
+    def put_item(self, Item: Dict[str, Any]):
+        self.items[Item["idempotency_key"]] = dict(Item)
+
+
+def _create_store(backend: str, clock: FakeClock, tmp_path: Path) -> IdempotencyStore:
+    if backend == "memory":
+        return InMemoryIdempotencyStore(ttl_seconds=60, clock=clock)
+    if backend == "sqlite":
+        return SQLiteIdempotencyStore(
+            str(tmp_path / "idempotency.sqlite3"), ttl_seconds=60, clock=clock
+        )
+    return DynamoDBIdempotencyStore(FakeDynamoDBTable(), ttl_seconds=60, clock=clock)
+
+
+_BACKENDS = ["memory", "sqlite", "dynamodb"]
+
+
+def test_create_idempotency_key__none_without_control_id():
+    assert create_idempotency_key("SIMHOSP", "SFAC", "") is None
+    assert _KEY != create_idempotency_key("OTHERHOSP", "SFAC", "5")
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+def test_idempotency_store__returns_remembered_ack(backend: str, tmp_path: Path):
+    # given
+    store = _create_store(backend, FakeClock(), tmp_path)
+
+    # when
+    before = store.get_ack(_KEY)
+    store.put_ack(_KEY, "MSH|ack")
+    after = store.get_ack(_KEY)
+
+    # then
+    assert (before, after) == (None, "MSH|ack")
+    assert (store.hits, store.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+def test_idempotency_store__ack_expires(backend: str, tmp_path: Path):
+    # given
+    clock = FakeClock()
+    store = _create_store(backend, clock, tmp_path)
+    store.put_ack(_KEY, "MSH|ack")
+
+    # when
+    clock.now += 61
+
+    # then
+    assert store.get_ack(_KEY) is None
+
+
+def test_in_memory_idempotency_store__evicts_least_recently_used():
+    # given
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_size=2)
+    store.put_ack("a", "ack a")
+    store.put_ack("b", "ack b")
+
+    # when
+    store.get_ack("a")
+    store.put_ack("c", "ack c")
+
+    # then
+    assert [store.get_ack(key) for key in "abc"] == ["ack a", None, "ack c"]
+
+
+def test_sqlite_idempotency_store__survives_restart(tmp_path: Path):
+    # given
+    path = str(tmp_path / "idempotency.sqlite3")
+    SQLiteIdempotencyStore(path, ttl_seconds=60).put_ack(_KEY, "MSH|ack")
+
+    # when
+    store = SQLiteIdempotencyStore(path, ttl_seconds=60)
+
+    # then
+    assert store.get_ack(_KEY) == "MSH|ack"
+
+
+def test_idempotency_store__unreachable_backend_is_a_miss():
+    # given
+    class UnreachableTable:
+        def get_item(self, **kwargs):
+            raise ConnectionError("unreachable")
+
+        def put_item(self, **kwargs):
+            raise ConnectionError("unreachable")
+
+    store = DynamoDBIdempotencyStore(UnreachableTable(), ttl_seconds=60)
+
+    # when
+    store.put_ack(_KEY, "MSH|ack")
+
+    # then
+    assert store.get_ack(_KEY) is None
+
+
+def test_idempotency_store__backend_must_get_and_put_acks():
+    # given
+    class WriteOnlyIdempotencyStore(IdempotencyStore):
+        def _put(self, key: str, ack: str, expires_at: float) -> None:
+            pass
+
+    # then
+    with pytest.raises(TypeError):
+        WriteOnlyIdempotencyStore(ttl_seconds=60)
@@ -0,0 +1,175 @@
+import json
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+
+from convert_hl7v2_fhir.controllers.pseudo_id import pseudo_id_cache
+from convert_hl7v2_fhir.controllers.pseudo_id.pseudo_id_cache import (
+    PseudoIdCache,
+    generate_pseudo_id,
+)
+
+NHS_NUMBER = "9728002432"
+BIRTH_DATE = date(1958, 6, 10)
+
+
+@pytest.fixture()
+def generate_pseudo_id_mock(mocker: MockFixture) -> MagicMock:
+    return mocker.patch.object(
+        pseudo_id_cache,
+        generate_pseudo_id.__name__,
+        MagicMock(side_effect=lambda nhs_number, birth_date: nhs_number[::-1]),
+    )
+
+
+def test_generate_pseudo_id():
+    assert (
+        generate_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+        == "3c8dc4bb3c6b63269c7b91e09cabe3db162d03eb3559568e2cbade6a41290ccef1605d103eb74915fb2474bf698ddcd6835f004b843bc93ec80dc14337df18a0"
+    )
+
+
+def test_pseudo_id_cache__repeated_lookup_is_a_hit(generate_pseudo_id_mock: MagicMock):
+    # given
+    cache = PseudoIdCache()
+
+    # when
+    first = cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+    second = cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert first == second == NHS_NUMBER[::-1]
+    assert generate_pseudo_id_mock.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_pseudo_id_cache__raw_identifiers_are_not_used_as_keys(
+    generate_pseudo_id_mock: MagicMock,
+):
+    # given
+    cache = PseudoIdCache()
+
+    # when
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert all(NHS_NUMBER not in key for key in cache._entries)
+
+
+def test_pseudo_id_cache__expired_entries_are_recomputed(
+    generate_pseudo_id_mock: MagicMock,
+):
+    # given
+    now = [1000.0]
+    cache = PseudoIdCache(ttl_seconds=60, clock=lambda: now[0])
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # when
+    now[0] += 61
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert generate_pseudo_id_mock.call_count == 2
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_pseudo_id_cache__least_recently_used_entry_is_evicted(
+    generate_pseudo_id_mock: MagicMock,
+):
+    # given
+    cache = PseudoIdCache(max_size=2)
+    cache.get_pseudo_id("9728002432", BIRTH_DATE)
+    cache.get_pseudo_id("9728002440", BIRTH_DATE)
+    cache.get_pseudo_id("9728002432", BIRTH_DATE)
+
+    # when
+    cache.get_pseudo_id("9728002483", BIRTH_DATE)
+
+    # then
+    assert len(cache) == 2
+    cache.get_pseudo_id("9728002432", BIRTH_DATE)
+    cache.get_pseudo_id("9728002440", BIRTH_DATE)
+    assert generate_pseudo_id_mock.call_count == 4
+
+
+def test_pseudo_id_cache__persisted_between_instances(
+    generate_pseudo_id_mock: MagicMock, tmp_path: Path
+):
+    # given
+    persist_path = str(tmp_path / "pseudo-id-cache.json")
+    PseudoIdCache(hmac_key=b"secret", persist_path=persist_path).get_pseudo_id(
+        NHS_NUMBER, BIRTH_DATE
+    )
+
+    # when
+    cache = PseudoIdCache(hmac_key=b"secret", persist_path=persist_path)
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert cache.hits == 1
+    assert generate_pseudo_id_mock.call_count == 1
+    assert NHS_NUMBER not in Path(persist_path).read_text()
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        '{"key": "pseudo-id"}',
+        '[["key", "pseudo-id"]]',
+        '[["key", "pseudo-id", "soon"]]',
+    ],
+)
+def test_pseudo_id_cache__malformed_file_is_an_empty_cache(
+    generate_pseudo_id_mock: MagicMock, tmp_path: Path, contents: str
+):
+    # given
+    persist_path = tmp_path / "pseudo-id-cache.json"
+    persist_path.write_text(contents)
+
+    # when
+    cache = PseudoIdCache(hmac_key=b"secret", persist_path=str(persist_path))
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(cache) == 1
+
+
+def test_pseudo_id_cache__not_persisted_without_hmac_key(
+    generate_pseudo_id_mock: MagicMock, tmp_path: Path
+):
+    # given
+    persist_path = tmp_path / "pseudo-id-cache.json"
+
+    # when
+    PseudoIdCache(persist_path=str(persist_path)).get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # then
+    assert not persist_path.exists()
+
+
+def test_pseudo_id_cache__persisted_at_most_once_per_interval(
+    generate_pseudo_id_mock: MagicMock, tmp_path: Path
+):
+    # given
+    now = [1_000.0]
+    persist_path = tmp_path / "pseudo-id-cache.json"
+    cache = PseudoIdCache(
+        hmac_key=b"secret",
+        persist_path=str(persist_path),
+        persist_interval_seconds=30,
+        clock=lambda: now[0],
+    )
+    cache.get_pseudo_id(NHS_NUMBER, BIRTH_DATE)
+
+    # when
+    now[0] += 10
+    cache.get_pseudo_id("9728002440", BIRTH_DATE)
+
+    # then
+    assert len(json.loads(persist_path.read_text())) == 1
+    cache.flush()
+    assert len(json.loads(persist_path.read_text())) == 2
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from _pytest.capture import CaptureFixture
+
+from convert_hl7v2_fhir.instrumentation.stage_timer import (
+    MetricsStageTimer,
+    StageTimer,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stage_timer__no_op_records_nothing(capsys: CaptureFixture):
+    # given
+    stage_timer = StageTimer()
+
+    # when
+    with stage_timer.stage("parse"):
+        pass
+    stage_timer.emit(outcome="AA", error_code="none")
+
+    # then
+    assert stage_timer.stage("parse") is stage_timer.stage("convert")
+    assert capsys.readouterr().out == ""
+
+
+def test_metrics_stage_timer__adds_up_repeated_stages():
+    # given
+    clock = FakeClock()
+    stage_timer = MetricsStageTimer(namespace="HANS", clock=clock)
+
+    # when
+    for _ in range(2):
+        with stage_timer.stage("parse"):
+            clock.now += 0.25
+
+    # then
+    assert stage_timer.durations == {"parse": 500.0}
+
+
+def test_metrics_stage_timer__stage_is_timed_when_it_raises():
+    # given
+    clock = FakeClock()
+    stage_timer = MetricsStageTimer(namespace="HANS", clock=clock)
+
+    # when
+    with pytest.raises(ValueError):
+        with stage_timer.stage("parse"):
+            clock.now += 0.1
+            raise ValueError()
+
+    # then
+    assert stage_timer.durations == {"parse": pytest.approx(100.0)}
+
+
+def test_metrics_stage_timer__emits_embedded_metric_format(capsys: CaptureFixture):
+    # given
+    clock = FakeClock()
+    stage_timer = MetricsStageTimer(namespace="HANS", clock=clock)
+    with stage_timer.stage("pseudo_id"):
+        clock.now += 0.2
+
+    # when
+    stage_timer.emit(outcome="AR", error_code="102")
+    emitted = json.loads(capsys.readouterr().out)
+
+    # then
+    metric_directive = emitted["_aws"]["CloudWatchMetrics"][0]
+    assert metric_directive["Namespace"] == "HANS"
+    assert {"outcome", "error_code"} <= set(metric_directive["Dimensions"][0])
+    assert metric_directive["Metrics"] == [
+        {"Name": "pseudo_idLatency", "Unit": "Milliseconds"}
+    ]
+    assert (emitted["outcome"], emitted["error_code"]) == ("AR", "102")
+    assert emitted["pseudo_idLatency"] == [pytest.approx(200.0)]
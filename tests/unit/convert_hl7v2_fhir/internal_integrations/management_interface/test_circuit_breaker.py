@@ -0,0 +1,197 @@
+from typing import Any, Dict
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from convert_hl7v2_fhir.internal_integrations.management_interface.circuit_breaker import (
+    CircuitBreaker,
+    CircuitState,
+    DynamoDBCircuitBreaker,
+    InMemoryCircuitBreaker,
+)
+from convert_hl7v2_fhir.internal_integrations.management_interface.exceptions import (
+    CareProviderLocationNotFound,
+    ManagementInterfaceCircuitOpen,
+    ManagementInterfaceNotAvailable,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeDynamoDBTable:
+    """In-process stand-in for the get_item and put_item of a boto3 Table."""
+
+    def __init__(self):
+        self.items: Dict[str, Dict[str, Any]] = {}
+
+    def get_item(self, Key: Dict[str, str], ConsistentRead: bool = False):
+        item = self.items.get(Key["circuit_name"])
+        return {"Item": dict(item)} if item is not None else {}
+
+    def put_item(self, Item: Dict[str, Any]):
+        self.items[Item["circuit_name"]] = dict(Item)
+
+
+def _fail(exception: Exception = ManagementInterfaceNotAvailable()):
+    def function():
+        raise exception
+
+    return function
+
+
+def _open(circuit_breaker: CircuitBreaker) -> None:
+    for _ in range(circuit_breaker.failure_threshold):
+        with pytest.raises(ManagementInterfaceNotAvailable):
+            circuit_breaker.call(_fail())
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def circuit_breaker(clock: FakeClock) -> CircuitBreaker:
+    return InMemoryCircuitBreaker(
+        "test", failure_threshold=3, open_seconds=30, clock=clock
+    )
+
+
+def test_circuit_breaker__opens_after_consecutive_failures(
+    circuit_breaker: CircuitBreaker,
+):
+    # given
+    function = MagicMock()
+
+    # when
+    _open(circuit_breaker)
+
+    # then
+    assert circuit_breaker.state == CircuitState.OPEN
+    with pytest.raises(ManagementInterfaceCircuitOpen):
+        circuit_breaker.call(function)
+    assert not function.called
+    assert circuit_breaker.rejected == 1
+
+
+@pytest.mark.parametrize(
+    "exception", (CareProviderLocationNotFound(), ValueError("unexpected"))
+)
+def test_circuit_breaker__answers_are_not_failures(
+    circuit_breaker: CircuitBreaker, exception: Exception
+):
+    # given
+    with pytest.raises(ManagementInterfaceNotAvailable):
+        circuit_breaker.call(_fail())
+    with pytest.raises(requests.ConnectionError):
+        circuit_breaker.call(_fail(requests.ConnectionError()))
+
+    # when
+    with pytest.raises(type(exception)):
+        circuit_breaker.call(_fail(exception))
+    with pytest.raises(ManagementInterfaceNotAvailable):
+        circuit_breaker.call(_fail())
+
+    # then
+    assert circuit_breaker.state == CircuitState.CLOSED
+
+
+def test_circuit_breaker__half_open_lets_one_call_through(
+    circuit_breaker: CircuitBreaker, clock: FakeClock
+):
+    # given
+    _open(circuit_breaker)
+    clock.now += 30
+
+    def function():
+        # others are turned away while this call tries the circuit
+        with pytest.raises(ManagementInterfaceCircuitOpen):
+            circuit_breaker.call(MagicMock())
+        return "care provider"
+
+    # when
+    assert circuit_breaker.state == CircuitState.HALF_OPEN
+    result = circuit_breaker.call(function)
+
+    # then
+    assert result == "care provider"
+    assert circuit_breaker.state == CircuitState.CLOSED
+
+
+def test_circuit_breaker__half_open_failure_opens_again(
+    circuit_breaker: CircuitBreaker, clock: FakeClock
+):
+    # given
+    _open(circuit_breaker)
+    clock.now += 30
+
+    # when
+    with pytest.raises(ManagementInterfaceNotAvailable):
+        circuit_breaker.call(_fail())
+
+    # then
+    assert circuit_breaker.state == CircuitState.OPEN
+    clock.now += 29
+    assert circuit_breaker.state == CircuitState.OPEN
+
+
+def test_dynamodb_circuit_breaker__shares_open_circuit(clock: FakeClock):
+    # given
+    table = FakeDynamoDBTable()
+    circuit_breaker = DynamoDBCircuitBreaker(
+        table, "test", failure_threshold=3, refresh_seconds=5, clock=clock
+    )
+    other_circuit_breaker = DynamoDBCircuitBreaker(
+        table, "test", failure_threshold=3, refresh_seconds=5, clock=clock
+    )
+    other_circuit_breaker.call(MagicMock())
+
+    # when
+    _open(circuit_breaker)
+
+    # then
+    other_circuit_breaker.call(MagicMock())
+    clock.now += 5
+    with pytest.raises(ManagementInterfaceCircuitOpen):
+        other_circuit_breaker.call(MagicMock())
+
+    # and when it is closed again
+    clock.now += 30
+    circuit_breaker.call(MagicMock())
+    clock.now += 5
+    other_circuit_breaker.call(MagicMock())
+    assert other_circuit_breaker.state == CircuitState.CLOSED
+
+
+def test_dynamodb_circuit_breaker__unreachable_store_is_ignored(clock: FakeClock):
+    # given
+    table = MagicMock()
+    table.get_item.side_effect = ConnectionError
+    table.put_item.side_effect = ConnectionError
+    circuit_breaker = DynamoDBCircuitBreaker(
+        table, "test", failure_threshold=3, clock=clock
+    )
+
+    # when
+    _open(circuit_breaker)
+
+    # then
+    assert circuit_breaker.state == CircuitState.OPEN
+
+
+def test_circuit_breaker__backend_must_read_and_write_the_circuit():
+    # given
+    class ReadOnlyCircuitBreaker(CircuitBreaker):
+        def _read(self):
+            return None
+
+    # then
+    with pytest.raises(TypeError):
+        ReadOnlyCircuitBreaker("test")
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from convert_hl7v2_fhir.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+    CareProviderResponse,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.message_attributes import (
+    care_provider_lookup_to_message_attributes,
+)
+
+
+def test_care_provider_lookup_to_message_attributes():
+    # given
+    retrieved_at = datetime(2023, 4, 11, 13, 6, 43, tzinfo=timezone.utc)
+    care_provider_lookup = CareProviderLookup(
+        care_recipient_pseudo_id="3c8dc4bb3c6b63269c7b91e09cabe3db",
+        care_provider=CareProviderResponse(
+            name="Your Care Provider Branch Name",
+            telecom=[{"system": "email", "value": "example@nhs.net", "use": "work"}],
+        ),
+        retrieved_at=retrieved_at,
+    )
+
+    # when
+    message_attributes = care_provider_lookup_to_message_attributes(
+        care_provider_lookup
+    )
+
+    # then
+    assert message_attributes["HANSMessageAttributesVersion"]["StringValue"] == "1"
+    assert (
+        message_attributes["CareRecipientPseudoId"]["StringValue"]
+        == "3c8dc4bb3c6b63269c7b91e09cabe3db"
+    )
+    assert (
+        CareProviderResponse.parse_raw(
+            message_attributes["CareProvider"]["StringValue"]
+        )
+        .telecom[0]
+        .value
+        == "example@nhs.net"
+    )
+    assert (
+        float(message_attributes["CareProviderRetrievedAt"]["StringValue"])
+        == retrieved_at.timestamp()
+    )
+
+
+def test_care_provider_lookup_to_message_attributes__pseudo_id_only():
+    # when
+    message_attributes = care_provider_lookup_to_message_attributes(
+        CareProviderLookup(care_recipient_pseudo_id="3c8dc4bb3c6b63269c7b91e09cabe3db")
+    )
+
+    # then
+    assert "CareProvider" not in message_attributes
+    assert "CareProviderRetrievedAt" not in message_attributes
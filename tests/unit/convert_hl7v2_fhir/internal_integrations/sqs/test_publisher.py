@@ -0,0 +1,212 @@
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from convert_hl7v2_fhir.internal_integrations.sqs.exceptions import (
+    SQSBatchEntriesFailed,
+)
+from convert_hl7v2_fhir.internal_integrations.sqs.publisher import (
+    MAX_BATCH_BYTES,
+    SQSPublisher,
+)
+
+_QUEUE_URL = "http://sqs/converted-queue"
+
+
+class FakeSQSClient:
+    """In-process stand-in for the SendMessageBatch call of a boto3 SQS client.
+
+    `failures` maps a message body to the error codes to return for it on
+    successive calls, a code starting with "Sender" is a sender fault."""
+
+    def __init__(self, failures: Optional[Dict[str, List[str]]] = None):
+        self.failures = {body: list(codes) for body, codes in (failures or {}).items()}
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.messages: List[Dict[str, Any]] = []
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]):
+        assert QueueUrl == _QUEUE_URL
+        assert len(Entries) <= 10
+        self.batches.append(Entries)
+        successful, failed = [], []
+        for entry in Entries:
+            codes = self.failures.get(entry["MessageBody"], [])
+            if codes:
+                code = codes.pop(0)
+                failed.append(
+                    {
+                        "Id": entry["Id"],
+                        "Code": code,
+                        "SenderFault": code.startswith("Sender"),
+                    }
+                )
+            else:
+                self.messages.append(entry)
+                successful.append({"Id": entry["Id"], "MessageId": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sqs_publisher__sends_full_batches_and_flushes_the_rest():
+    # given
+    sqs_client = FakeSQSClient()
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL, max_wait_seconds=60)
+
+    # when
+    for index in range(25):
+        publisher.publish(f"message {index}")
+    publisher.flush()
+
+    # then
+    assert [len(batch) for batch in sqs_client.batches] == [10, 10, 5]
+    assert [m["MessageBody"] for m in sqs_client.messages] == [
+        f"message {index}" for index in range(25)
+    ]
+
+
+def test_sqs_publisher__single_message_is_one_round_trip():
+    # given
+    sqs_client = FakeSQSClient()
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL)
+    message_attributes = {"Version": {"DataType": "String", "StringValue": "1"}}
+
+    # when
+    publisher.publish("message", message_attributes=message_attributes)
+    publisher.flush()
+    publisher.flush()
+
+    # then
+    assert len(sqs_client.batches) == 1
+    assert sqs_client.messages[0]["MessageAttributes"] == message_attributes
+
+
+def test_sqs_publisher__flushes_before_exceeding_the_batch_payload_limit():
+    # given
+    sqs_client = FakeSQSClient()
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL, max_wait_seconds=60)
+    large_body = "x" * (MAX_BATCH_BYTES // 2 + 1)
+
+    # when
+    publisher.publish(large_body)
+    publisher.publish(large_body)
+
+    # then
+    assert [len(batch) for batch in sqs_client.batches] == [1]
+
+
+def test_sqs_publisher__flushes_when_oldest_message_has_waited_too_long():
+    # given
+    sqs_client = FakeSQSClient()
+    clock = FakeClock()
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL, max_wait_seconds=1, clock=clock)
+
+    # when
+    publisher.publish("first")
+    clock.now = 0.5
+    publisher.publish("second")
+    assert not sqs_client.batches
+    clock.now = 1.0
+    publisher.publish("third")
+
+    # then
+    assert [len(batch) for batch in sqs_client.batches] == [3]
+
+
+def test_sqs_publisher__retries_entries_failed_by_sqs():
+    # given
+    sqs_client = FakeSQSClient(failures={"second": ["InternalError"]})
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL)
+
+    # when
+    for body in ("first", "second", "third"):
+        publisher.publish(body)
+    publisher.flush()
+
+    # then
+    assert [len(batch) for batch in sqs_client.batches] == [3, 1]
+    assert sorted(m["MessageBody"] for m in sqs_client.messages) == [
+        "first",
+        "second",
+        "third",
+    ]
+
+
+@pytest.mark.parametrize(
+    "failures",
+    [
+        ["SenderInvalidMessageContents"],
+        ["InternalError", "InternalError"],
+    ],
+)
+def test_sqs_publisher__raises_entries_that_still_fail(failures: List[str]):
+    # given
+    sqs_client = FakeSQSClient(failures={"second": failures})
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL)
+    publisher.publish("first")
+    publisher.publish("second")
+
+    # when
+    with pytest.raises(SQSBatchEntriesFailed) as ex:
+        publisher.flush()
+
+    # then
+    assert [m["MessageBody"] for m in sqs_client.messages] == ["first"]
+    assert [entry["Code"] for entry in ex.value.failed_entries] == failures[-1:]
+
+
+def test_sqs_publisher__failed_entries_carry_their_correlation_ids():
+    # given
+    sqs_client = FakeSQSClient(failures={"second": ["SenderInvalidMessageContents"]})
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL)
+    for index, body in enumerate(("first", "second", "third")):
+        publisher.publish(body, correlation_id=index)
+
+    # when
+    with pytest.raises(SQSBatchEntriesFailed) as ex:
+        publisher.flush()
+
+    # then
+    assert list(ex.value.correlation_ids) == [1]
+
+
+def test_sqs_publisher__send_leaves_buffered_messages_alone():
+    # given
+    sqs_client = FakeSQSClient(failures={"sent": ["SenderInvalidMessageContents"]})
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL, max_wait_seconds=60)
+    publisher.publish("buffered")
+
+    # when
+    with pytest.raises(SQSBatchEntriesFailed):
+        publisher.send("sent")
+    publisher.send("also sent")
+
+    # then
+    assert [[e["MessageBody"] for e in batch] for batch in sqs_client.batches] == [
+        ["sent"],
+        ["also sent"],
+    ]
+    publisher.flush()
+    assert sqs_client.messages[-1]["MessageBody"] == "buffered"
+
+
+def test_sqs_publisher__own_buffer_is_flushed_on_its_own():
+    # given
+    sqs_client = FakeSQSClient()
+    publisher = SQSPublisher(sqs_client, _QUEUE_URL, max_wait_seconds=60)
+    batch_publisher = publisher.with_own_buffer()
+    publisher.publish("shared")
+    batch_publisher.publish("batch")
+
+    # when
+    batch_publisher.flush()
+
+    # then
+    assert [m["MessageBody"] for m in sqs_client.messages] == ["batch"]
+    assert batch_publisher.max_wait_seconds == 60
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import pytest
+
+from convert_hl7v2_fhir.mllp.exceptions import MLLPFramingError
+from convert_hl7v2_fhir.mllp.framing import END_BLOCK, frame_message, read_frame
+from convert_hl7v2_fhir.mllp.server import MLLPServer
+
+
+def _read_frame_from(data: bytes) -> bytes:
+    async def read() -> bytes:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_frame(reader)
+
+    return asyncio.run(read())
+
+
+def test_read_frame__returns_message_inside_frame():
+    assert _read_frame_from(b"\r\n" + frame_message(b"MSH|1")) == b"MSH|1"
+
+
+def test_read_frame__returns_none_at_end_of_stream():
+    assert _read_frame_from(b"") is None
+
+
+@pytest.mark.parametrize(
+    "data", [b"MSH|1" + END_BLOCK, b"\x0bMSH|1", b"junk" + frame_message(b"MSH|1")]
+)
+def test_read_frame__rejects_unframed_data(data: bytes):
+    with pytest.raises(MLLPFramingError):
+        _read_frame_from(data)
+
+
+async def _send_pipelined(
+    handler: Callable[[str], str], connections: List[List[str]]
+) -> List[List[bytes]]:
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        server = MLLPServer(handler, executor, host="127.0.0.1", port=0)
+        await server.start()
+
+        async def send(messages: List[str]) -> List[bytes]:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            # every message is written before any ACK is read
+            writer.write(b"".join(frame_message(m.encode()) for m in messages))
+            await writer.drain()
+            acks = [await read_frame(reader) for _ in messages]
+            writer.close()
+            return acks
+
+        try:
+            return await asyncio.gather(*(send(m) for m in connections))
+        finally:
+            await server.close()
+
+
+def test_mllp_server__pipelined_acks_are_written_in_order():
+    # given
+    def handler(message: str) -> str:
+        # later messages finish first
+        time.sleep(0.05 / int(message))
+        return f"ACK {message}"
+
+    connections = [[str(i) for i in range(1, 6)] for _ in range(4)]
+
+    # when
+    acks = asyncio.run(_send_pipelined(handler, connections))
+
+    # then
+    assert acks == [[f"ACK {i}".encode() for i in range(1, 6)]] * 4
+
+
+def test_mllp_server__messages_are_processed_concurrently():
+    # given
+    def handler(message: str) -> str:
+        time.sleep(0.2)
+        return message
+
+    # when
+    start = time.monotonic()
+    asyncio.run(_send_pipelined(handler, [[str(i) for i in range(8)]]))
+
+    # then
+    assert time.monotonic() - start < 0.2 * 4
+
+
+def test_mllp_server__failed_message_closes_connection_without_ack():
+    # given
+    def handler(message: str) -> str:
+        if message == "bad":
+            raise ValueError(message)
+        return message
+
+    async def send() -> List[bytes]:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            server = MLLPServer(handler, executor, host="127.0.0.1", port=0)
+            await server.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for message in (b"good", b"bad", b"after"):
+                writer.write(frame_message(message))
+            await writer.drain()
+            acks = [await read_frame(reader), await read_frame(reader)]
+            writer.close()
+            await server.close()
+            return acks
+
+    # when
+    acks = asyncio.run(send())
+
+    # then
+    assert acks == [b"good", None]
+
+
+def test_mllp_server__failed_message_is_answered_by_error_handler():
+    # given
+    def handler(message: str) -> str:
+        if message == "bad":
+            raise ValueError(message)
+        return message
+
+    def error_handler(message: str, ex: Exception) -> str:
+        return f"{type(ex).__name__} {message}"
+
+    async def send() -> List[bytes]:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            server = MLLPServer(
+                handler,
+                executor,
+                error_handler=error_handler,
+                host="127.0.0.1",
+                port=0,
+            )
+            await server.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for message in (b"good", b"bad", b"after"):
+                writer.write(frame_message(message))
+            await writer.drain()
+            acks = [await read_frame(reader) for _ in range(3)]
+            writer.close()
+            await server.close()
+            return acks
+
+    # when
+    acks = asyncio.run(send())
+
+    # then
+    assert acks == [b"good", b"ValueError bad", b"after"]
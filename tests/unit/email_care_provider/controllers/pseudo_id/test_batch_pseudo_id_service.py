@@ -0,0 +1,94 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockFixture
+
+from email_care_provider.controllers.pseudo_id import batch_pseudo_id_service
+from email_care_provider.controllers.pseudo_id.batch_pseudo_id_service import (
+    BatchPseudoIdService,
+    generate_pseudo_id,
+    memory_aware_worker_limit,
+)
+from email_care_provider.controllers.pseudo_id.settings import get_pseudo_id_settings
+
+
+@pytest.fixture(autouse=True)
+def _clear_pseudo_id_settings():
+    get_pseudo_id_settings.cache_clear()
+    yield
+    get_pseudo_id_settings.cache_clear()
+
+
+@pytest.mark.parametrize(
+    ("lambda_memory_size_mb", "reserved_memory_mb", "worker_limit"),
+    [(128, 128, 1), (512, 128, 6), (1024, 128, 14), (10240, 256, 156)],
+)
+def test_memory_aware_worker_limit(
+    lambda_memory_size_mb: int, reserved_memory_mb: int, worker_limit: int
+):
+    assert (
+        memory_aware_worker_limit(lambda_memory_size_mb, reserved_memory_mb)
+        == worker_limit
+    )
+
+
+def test_batch_pseudo_id_service__workers_limited_by_lambda_memory(
+    monkeypatch: MonkeyPatch,
+):
+    # given
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "512")
+
+    # when
+    batch_pseudo_id_service = BatchPseudoIdService(max_workers=100)
+
+    # then
+    assert batch_pseudo_id_service.max_workers == 6
+
+
+def test_batch_pseudo_id_service__generate_pseudo_ids(mocker: MockFixture):
+    # given
+    generate_pseudo_id_patched = mocker.patch.object(
+        batch_pseudo_id_service,
+        generate_pseudo_id.__name__,
+        MagicMock(side_effect=lambda nhs_number, birth_date: nhs_number[::-1]),
+    )
+    patients = [
+        ("9728002432", date(1958, 6, 10)),
+        ("9728002440", date(1961, 6, 8)),
+        ("9728002432", date(1958, 6, 10)),
+    ]
+
+    # when
+    pseudo_ids = BatchPseudoIdService(max_workers=4).generate_pseudo_ids(patients)
+
+    # then
+    assert pseudo_ids == {
+        ("9728002432", date(1958, 6, 10)): "2342008279",
+        ("9728002440", date(1961, 6, 8)): "0442008279",
+    }
+    assert generate_pseudo_id_patched.call_count == 2
+
+
+def test_batch_pseudo_id_service__failed_pseudo_ids_are_left_out(
+    mocker: MockFixture,
+):
+    # given
+    mocker.patch.object(
+        batch_pseudo_id_service,
+        generate_pseudo_id.__name__,
+        MagicMock(side_effect=[ValueError, "0442008279"]),
+    )
+
+    # when
+    pseudo_ids = BatchPseudoIdService(max_workers=1).generate_pseudo_ids(
+        [("9728002432", date(1958, 6, 10)), ("9728002440", date(1961, 6, 8))]
+    )
+
+    # then
+    assert pseudo_ids == {("9728002440", date(1961, 6, 8)): "0442008279"}
+
+
+def test_batch_pseudo_id_service__empty_batch():
+    assert BatchPseudoIdService().generate_pseudo_ids([]) == {}
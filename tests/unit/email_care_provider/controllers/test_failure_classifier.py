@@ -0,0 +1,59 @@
+import pytest
+import requests
+from notifications_python_client.errors import HTTPError
+from urllib3.exceptions import MaxRetryError
+
+from email_care_provider.controllers.failure_classifier import (
+    FailureClass,
+    FailureClassifier,
+)
+from email_care_provider.exceptions import MalformedHANSBundle
+from email_care_provider.internal_integrations.management_interface.exceptions import (
+    CareProviderLocationNotFound,
+    ManagementInterfaceCircuitOpen,
+    ManagementInterfaceNotAvailable,
+    ManagementInterfaceRequestRefused,
+)
+
+
+def _notify_http_error(status_code: int) -> HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return HTTPError(response)
+
+
+@pytest.mark.parametrize(
+    ("exception", "failure_class"),
+    [
+        (MalformedHANSBundle(), FailureClass.PERMANENT),
+        (CareProviderLocationNotFound(), FailureClass.PERMANENT),
+        (_notify_http_error(400), FailureClass.PERMANENT),
+        (_notify_http_error(403), FailureClass.PERMANENT),
+        (_notify_http_error(429), FailureClass.TRANSIENT),
+        (_notify_http_error(500), FailureClass.TRANSIENT),
+        (ManagementInterfaceNotAvailable(), FailureClass.TRANSIENT),
+        (ManagementInterfaceCircuitOpen(), FailureClass.TRANSIENT),
+        (ManagementInterfaceRequestRefused(401), FailureClass.TRANSIENT),
+        (ManagementInterfaceRequestRefused(403), FailureClass.TRANSIENT),
+        (ManagementInterfaceRequestRefused(429), FailureClass.TRANSIENT),
+        (MaxRetryError(pool=None, url="http://test"), FailureClass.TRANSIENT),
+        (requests.exceptions.ConnectTimeout(), FailureClass.TRANSIENT),
+    ],
+)
+def test_failure_classifier__classify(
+    exception: Exception, failure_class: FailureClass
+):
+    assert FailureClassifier().classify(exception)[0] == failure_class
+
+
+def test_failure_classifier__counts_each_class():
+    # given
+    failure_classifier = FailureClassifier()
+
+    # when
+    failure_classifier.classify(CareProviderLocationNotFound())
+    failure_classifier.classify(ManagementInterfaceNotAvailable())
+    failure_classifier.classify(ManagementInterfaceNotAvailable())
+
+    # then
+    assert failure_classifier.counts == {"permanent": 1, "transient": 2}
@@ -0,0 +1,100 @@
+import time
+from datetime import date
+from unittest.mock import MagicMock
+
+from urllib3.exceptions import MaxRetryError
+
+from email_care_provider.controllers.notify_batch import (
+    NotifyBatchController,
+    QueuedNotification,
+)
+from email_care_provider.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+)
+
+
+def _queued_notification(message_id: str, nhs_number: str = "9728002432"):
+    bundle = MagicMock()
+    bundle.patient.identifier[0].value = nhs_number
+    bundle.patient.birthDate = date(1958, 6, 10)
+    return QueuedNotification(message_id=message_id, bundle=bundle)
+
+
+def test_notify_batch_controller__records_are_sent_concurrently():
+    # given
+    notify_care_provider_controller = MagicMock()
+    notify_care_provider_controller.send_email_to_care_provider.side_effect = (
+        lambda **kwargs: time.sleep(0.2)
+    )
+    batch_pseudo_id_service = MagicMock()
+    batch_pseudo_id_service.generate_pseudo_ids.return_value = {}
+    notify_batch_controller = NotifyBatchController(
+        notify_care_provider_controller=notify_care_provider_controller,
+        batch_pseudo_id_service=batch_pseudo_id_service,
+        max_workers=10,
+    )
+
+    # when
+    started_at = time.monotonic()
+    results = notify_batch_controller.send_emails(
+        [_queued_notification(str(i)) for i in range(10)]
+    )
+
+    # then
+    assert time.monotonic() - started_at < 1
+    assert [result.message_id for result in results] == [str(i) for i in range(10)]
+    assert all(result.succeeded for result in results)
+
+
+def test_notify_batch_controller__results_are_reported_per_record():
+    # given
+    error = MaxRetryError(pool=None, url="http://test")
+    notify_care_provider_controller = MagicMock()
+    notify_care_provider_controller.send_email_to_care_provider.side_effect = (
+        lambda **kwargs: (_ for _ in ()).throw(error)
+        if kwargs["patient_nhs_number"] == "9728002440"
+        else None
+    )
+    batch_pseudo_id_service = MagicMock()
+    batch_pseudo_id_service.generate_pseudo_ids.return_value = {}
+
+    # when
+    results = NotifyBatchController(
+        notify_care_provider_controller=notify_care_provider_controller,
+        batch_pseudo_id_service=batch_pseudo_id_service,
+    ).send_emails(
+        [
+            _queued_notification("1", nhs_number="9728002432"),
+            _queued_notification("2", nhs_number="9728002440"),
+        ]
+    )
+
+    # then
+    assert results[0].succeeded
+    assert not results[1].succeeded
+    assert results[1].exception is error
+
+
+def test_notify_batch_controller__batch_pseudo_ids_are_passed_on():
+    # given
+    notify_care_provider_controller = MagicMock()
+    batch_pseudo_id_service = MagicMock()
+    batch_pseudo_id_service.generate_pseudo_ids.side_effect = lambda patients: {
+        patient: "pseudo-id" for patient in patients
+    }
+
+    # when
+    NotifyBatchController(
+        notify_care_provider_controller=notify_care_provider_controller,
+        batch_pseudo_id_service=batch_pseudo_id_service,
+    ).send_emails([_queued_notification("1")])
+
+    # then
+    care_provider_lookup = (
+        notify_care_provider_controller.send_email_to_care_provider.call_args[1][
+            "care_provider_lookup"
+        ]
+    )
+    assert care_provider_lookup == CareProviderLookup(
+        care_recipient_pseudo_id="pseudo-id"
+    )
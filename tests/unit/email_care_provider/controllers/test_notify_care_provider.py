@@ -1,9 +1,15 @@
 from datetime import date, datetime
 from unittest.mock import MagicMock
 
+from pytest_mock import MockFixture
+
 from email_care_provider.controllers.notify_care_provider import (
     NotifyCareProviderController,
 )
+from email_care_provider.internal_integrations.management_interface.schemas import (
+    CareProviderLookup,
+    CareProviderResponse,
+)
 
 
 def test_notify_care_provider_controller__generate_pseudo_id():
@@ -57,3 +63,72 @@ def test_notify_care_provider_controller__dates_are_correctly_passed_to_template
     ].pop("personalisation")
     assert personalisation["event_time_str"] == str(admitted_at.time())
     assert personalisation["event_date_str"] == str(admitted_at.date())
+
+
+def test_notify_care_provider_controller__care_provider_lookup_is_reused():
+    # given
+    management_interface_api_client_mock = MagicMock()
+    notifications_api_client_mock = MagicMock()
+    care_provider_lookup = CareProviderLookup(
+        care_recipient_pseudo_id="3c8dc4bb3c6b63269c7b91e09cabe3db",
+        care_provider=CareProviderResponse(
+            name="Your Care Provider Branch Name",
+            telecom=[{"system": "email", "value": "example@nhs.net", "use": "work"}],
+        ),
+    )
+
+    # when
+    NotifyCareProviderController(
+        management_interface_api_client=management_interface_api_client_mock,
+        notifications_api_client=notifications_api_client_mock,
+    ).send_email_to_care_provider(
+        patient_nhs_number="9728002432",
+        patient_given_name="John",
+        patient_family_name="Doe",
+        patient_birth_date=date(1958, 6, 10),
+        location_name="The Best Hospital",
+        admitted_at=datetime(2022, 10, 10, 8, 30),
+        care_provider_lookup=care_provider_lookup,
+    )
+
+    # then
+    assert not management_interface_api_client_mock.get_care_provider.called
+    assert (
+        notifications_api_client_mock.send_email_notification.call_args[1][
+            "email_address"
+        ]
+        == "example@nhs.net"
+    )
+
+
+def test_notify_care_provider_controller__carried_pseudo_id_is_used_for_lookup(
+    mocker: MockFixture,
+):
+    # given
+    generate_pseudo_id_patched = mocker.patch.object(
+        NotifyCareProviderController,
+        NotifyCareProviderController._generate_pseudo_id.__name__,
+    )
+    management_interface_api_client_mock = MagicMock()
+
+    # when
+    NotifyCareProviderController(
+        management_interface_api_client=management_interface_api_client_mock,
+        notifications_api_client=MagicMock(),
+    ).send_email_to_care_provider(
+        patient_nhs_number="9728002432",
+        patient_given_name="John",
+        patient_family_name="Doe",
+        patient_birth_date=date(1958, 6, 10),
+        location_name="The Best Hospital",
+        admitted_at=datetime(2022, 10, 10, 8, 30),
+        care_provider_lookup=CareProviderLookup(
+            care_recipient_pseudo_id="3c8dc4bb3c6b63269c7b91e09cabe3db"
+        ),
+    )
+
+    # then
+    assert not generate_pseudo_id_patched.called
+    management_interface_api_client_mock.get_care_provider.assert_called_once_with(
+        care_recipient_pseudo_id="3c8dc4bb3c6b63269c7b91e09cabe3db"
+    )
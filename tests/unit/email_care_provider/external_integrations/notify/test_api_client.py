@@ -0,0 +1,49 @@
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+import requests
+from notifications_python_client.errors import HTTPError
+
+from email_care_provider.external_integrations.notify.api_client import (
+    NotifyApiClient,
+)
+
+API_KEY = f"hans_test-{uuid4()}-{uuid4()}"
+
+
+def test_notify_api_client__requests_go_through_the_session():
+    # given
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value.json.return_value = {"id": "notification-id"}
+    notify_api_client = NotifyApiClient(api_key=API_KEY, session=session)
+
+    # when
+    response = notify_api_client.send_email_notification(
+        email_address="example@nhs.net", template_id=str(uuid4())
+    )
+
+    # then
+    assert response == {"id": "notification-id"}
+    assert session.request.call_args[0][0] == "POST"
+
+
+@pytest.mark.parametrize("response_status_code", (400, 403, 500, 503))
+def test_notify_api_client__error_responses_raise_http_error(
+    response_status_code: int,
+):
+    # given
+    session = MagicMock(spec=requests.Session)
+    response = requests.Response()
+    response.status_code = response_status_code
+    session.request.return_value = response
+    notify_api_client = NotifyApiClient(api_key=API_KEY, session=session)
+
+    # then
+    with pytest.raises(HTTPError) as ex:
+        # when
+        notify_api_client.send_email_notification(
+            email_address="example@nhs.net", template_id=str(uuid4())
+        )
+
+    assert ex.value.status_code == response_status_code
@@ -7,8 +7,15 @@ import pytest
 from email_care_provider.internal_integrations.management_interface.api_client import (
     ManagementInterfaceApiClient,
 )
+from email_care_provider.internal_integrations.management_interface.circuit_breaker import (
+    InMemoryCircuitBreaker,
+)
 from email_care_provider.internal_integrations.management_interface.exceptions import (
+    CareProviderLocationNotFound,
     ManagementInterfaceApiClientException,
+    ManagementInterfaceCircuitOpen,
+    ManagementInterfaceNotAvailable,
+    ManagementInterfaceRequestRefused,
 )
 
 
@@ -32,6 +39,35 @@ def test_management_interface_api_client__not_ok_statuses_are_handled(
         )
 
 
+@pytest.mark.parametrize(
+    ("response_status_code", "exception"),
+    (
+        (401, ManagementInterfaceRequestRefused),
+        (403, ManagementInterfaceRequestRefused),
+        (429, ManagementInterfaceRequestRefused),
+        (404, CareProviderLocationNotFound),
+    ),
+)
+def test_management_interface_api_client__refused_requests_are_told_apart(
+    response_status_code: int, exception: type
+):
+    # given
+    session = MagicMock(spec=requests.Session)
+    session.post.return_value.status_code = response_status_code
+    management_interface_api_client = ManagementInterfaceApiClient(
+        base_url="http://test",
+        session=session,
+        circuit_breaker=InMemoryCircuitBreaker("test"),
+    )
+
+    # then
+    with pytest.raises(exception):
+        # when
+        management_interface_api_client.get_care_provider(
+            care_recipient_pseudo_id=str(uuid4())
+        )
+
+
 def test_management_interface_api_client__ok_response():
     # given
     session = MagicMock(spec=requests.Session)
@@ -62,3 +98,28 @@ def test_management_interface_api_client__ok_response():
     # then
     assert care_provider.name
     assert "nhs" in care_provider.telecom[0].value
+
+
+def test_management_interface_api_client__fails_fast_once_circuit_is_open():
+    # given
+    session = MagicMock(spec=requests.Session)
+    session.post.return_value.status_code = 503
+    management_interface_api_client = ManagementInterfaceApiClient(
+        base_url="http://test",
+        session=session,
+        circuit_breaker=InMemoryCircuitBreaker("test", failure_threshold=2),
+    )
+    pseudo_id = str(uuid4())
+    for _ in range(2):
+        with pytest.raises(ManagementInterfaceNotAvailable):
+            management_interface_api_client.get_care_provider(
+                care_recipient_pseudo_id=pseudo_id
+            )
+
+    # then
+    with pytest.raises(ManagementInterfaceCircuitOpen):
+        # when
+        management_interface_api_client.get_care_provider(
+            care_recipient_pseudo_id=pseudo_id
+        )
+    assert session.post.call_count == 2
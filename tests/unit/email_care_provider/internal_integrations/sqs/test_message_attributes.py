@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from email_care_provider.internal_integrations.sqs.message_attributes import (
+    care_provider_lookup_from_message_attributes,
+)
+
+PSEUDO_ID = "3c8dc4bb3c6b63269c7b91e09cabe3db"
+CARE_PROVIDER = """{
+  "resourceType": "Organization",
+  "name": "Your Care Provider Branch Name",
+  "telecom": [{"system": "email", "value": "example@nhs.net", "use": "work"}]
+}"""
+
+
+def _message_attributes(
+    version: str = "1",
+    care_provider: Optional[str] = CARE_PROVIDER,
+    retrieved_at: Optional[datetime] = None,
+) -> Dict[str, Dict[str, Any]]:
+    message_attributes = {
+        "HANSMessageAttributesVersion": {"stringValue": version, "dataType": "String"},
+        "CareRecipientPseudoId": {"stringValue": PSEUDO_ID, "dataType": "String"},
+    }
+    if care_provider is not None:
+        message_attributes["CareProvider"] = {
+            "stringValue": care_provider,
+            "dataType": "String",
+        }
+        message_attributes["CareProviderRetrievedAt"] = {
+            "stringValue": str(
+                (retrieved_at or datetime.now(timezone.utc)).timestamp()
+            ),
+            "dataType": "Number",
+        }
+    return message_attributes
+
+
+def test_care_provider_lookup_from_message_attributes__fresh_lookup():
+    # when
+    care_provider_lookup = care_provider_lookup_from_message_attributes(
+        _message_attributes()
+    )
+
+    # then
+    assert care_provider_lookup.care_recipient_pseudo_id == PSEUDO_ID
+    assert care_provider_lookup.care_provider.telecom[0].value == "example@nhs.net"
+
+
+def test_care_provider_lookup_from_message_attributes__stale_care_provider_is_dropped():
+    # when
+    care_provider_lookup = care_provider_lookup_from_message_attributes(
+        _message_attributes(retrieved_at=datetime.now(timezone.utc) - timedelta(days=1))
+    )
+
+    # then
+    assert care_provider_lookup.care_recipient_pseudo_id == PSEUDO_ID
+    assert care_provider_lookup.care_provider is None
+
+
+def test_care_provider_lookup_from_message_attributes__malformed_care_provider_is_dropped():
+    # when
+    care_provider_lookup = care_provider_lookup_from_message_attributes(
+        _message_attributes(care_provider='{"resourceType": "Patient"}')
+    )
+
+    # then
+    assert care_provider_lookup.care_recipient_pseudo_id == PSEUDO_ID
+    assert care_provider_lookup.care_provider is None
+
+
+def test_care_provider_lookup_from_message_attributes__unknown_version_is_ignored():
+    assert (
+        care_provider_lookup_from_message_attributes(_message_attributes(version="0"))
+        is None
+    )
+
+
+def test_care_provider_lookup_from_message_attributes__missing_attributes():
+    assert care_provider_lookup_from_message_attributes({}) is None
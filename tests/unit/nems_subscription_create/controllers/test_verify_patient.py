@@ -1,9 +1,28 @@
+from datetime import date
 from unittest.mock import MagicMock
 
 import pytest
 from fhir.resources.humanname import HumanName
 
-from subscription_create.controllers.verify_patient import VerifyPatientController
+from subscription_create.controllers.exceptions import (
+    BirthDateMissmatch,
+    NameMissmatch,
+    PatientNotFound,
+)
+from subscription_create.controllers.verify_patient import (
+    PatientToVerify,
+    VerifyPatientController,
+)
+from subscription_create.external_integrations.pds.exceptions import (
+    PatientDoesNotExist,
+)
+from subscription_create.external_integrations.pds.patient_details_cache import (
+    PatientDetailsCache,
+)
+from subscription_create.external_integrations.pds.schemas import (
+    PatientDetailsResponse,
+    VersionedPatientDetails,
+)
 
 
 @pytest.mark.parametrize(
@@ -47,3 +66,87 @@ def test_verify_patient_controller__do_human_names_match(
         verify_patient_controller._do_human_names_match(human_name_1, human_name_2)
         is do_names_match
     )
+
+
+def _patient_to_verify(
+    nhs_number: str, family: str = "Simon", birth_date: str = "2012-07-19"
+) -> PatientToVerify:
+    return PatientToVerify(
+        nhs_number=nhs_number,
+        patient_name=HumanName(given=["Orpah"], family=family),
+        birth_date=date.fromisoformat(birth_date),
+    )
+
+
+def _get_patient_details(nhs_number: str) -> PatientDetailsResponse:
+    if nhs_number == "9000000009":
+        raise PatientDoesNotExist
+
+    return PatientDetailsResponse(
+        id=nhs_number,
+        name=[{"family": "Simon", "given": ["Orpah"]}],
+        birthDate="2012-07-19",
+    )
+
+
+def test_verify_patient_controller__verify_patients_data():
+    # given
+    patient_details_cache = MagicMock()
+    patient_details_cache.get_patient_details.side_effect = _get_patient_details
+    verify_patient_controller = VerifyPatientController(
+        pds_api_client=MagicMock(), patient_details_cache=patient_details_cache
+    )
+
+    # when
+    errors = verify_patient_controller.verify_patients_data(
+        [
+            _patient_to_verify("9728002440"),
+            _patient_to_verify("9728002440", family="Smith"),
+            _patient_to_verify("9000000009"),
+            _patient_to_verify("9728002432", birth_date="2012-07-20"),
+            _patient_to_verify("9000000009"),
+        ],
+        max_workers=2,
+    )
+
+    # then
+    assert [type(error) for error in errors] == [
+        type(None),
+        NameMissmatch,
+        PatientNotFound,
+        BirthDateMissmatch,
+        PatientNotFound,
+    ]
+    # each NHS number is only looked up once
+    assert sorted(
+        call.args[0]
+        for call in patient_details_cache.get_patient_details.call_args_list
+    ) == ["9000000009", "9728002432", "9728002440"]
+
+
+def test_verify_patient_controller__empty_patient_details_cache_is_used():
+    # given
+    pds_api_client = MagicMock()
+    pds_api_client.get_versioned_patient_details.side_effect = (
+        lambda nhs_number, if_none_match=None: VersionedPatientDetails(
+            patient_details=_get_patient_details(nhs_number), etag='W/"1"'
+        )
+    )
+    patient_details_cache = PatientDetailsCache(pds_api_client)
+    verify_patient_controller = VerifyPatientController(
+        pds_api_client=pds_api_client, patient_details_cache=patient_details_cache
+    )
+
+    # when
+    for _ in range(3):
+        verify_patient_controller.verify_patient_data(
+            nhs_number="9728002440",
+            patient_name=HumanName(given=["Orpah"], family="Simon"),
+            birth_date=date(2012, 7, 19),
+        )
+
+    # then
+    assert verify_patient_controller.patient_details_cache is patient_details_cache
+    assert (patient_details_cache.hits, patient_details_cache.misses) == (2, 1)
+    assert pds_api_client.get_versioned_patient_details.call_count == 1
+    assert not pds_api_client.get_patient_details.called
@@ -1,4 +1,5 @@
-from datetime import timedelta, datetime
+import time
+from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
@@ -14,6 +15,18 @@ from subscription_create.external_integrations.pds.schemas import (
 from subscription_create.external_integrations.pds.api_client import (
     PDSApiClient,
 )
+from subscription_create.external_integrations.pds.token_store import (
+    InMemoryAccessTokenStore,
+    StoredAccessToken,
+)
+
+_PATIENT_JSON = {
+    "resourceType": "Patient",
+    "id": "9728002440",
+    "meta": {"versionId": "2"},
+    "name": [{"family": "Simon", "given": ["Orpah"]}],
+    "birthDate": "2012-07-19",
+}
 
 
 def test_pds_api_client__generate_jwt():
@@ -67,18 +80,22 @@ def test_post_oauth2_token__handles_server_error_responses(response_status_code:
 @pytest.mark.parametrize(
     "access_token_expires_at",
     (
-        datetime.utcnow() + timedelta(minutes=60),
-        datetime.utcnow() - timedelta(minutes=60),
+        time.time() + 60 * 60,
+        time.time() - 60 * 60,
     ),
 )
 def test_get_patient_details__get_valid_access_token__subsequent_authorization(
-    mocker: MockFixture, access_token_expires_at: datetime
+    mocker: MockFixture, access_token_expires_at: float
 ):
     # given
     session = MagicMock(spec=requests.Session)
-    pds_api_client = PDSApiClient(session=session)
-    pds_api_client._access_token = "123456789012345"
-    pds_api_client._access_token_expires_at = access_token_expires_at
+    access_token_store = InMemoryAccessTokenStore()
+    access_token_store._token = StoredAccessToken(
+        access_token="123456789012345", expires_at=access_token_expires_at
+    )
+    pds_api_client = PDSApiClient(
+        session=session, access_token_store=access_token_store
+    )
     post_oauth2_token_patched = mocker.patch.object(
         PDSApiClient,
         PDSApiClient.post_oauth2_token.__name__,
@@ -96,7 +113,58 @@ def test_get_patient_details__get_valid_access_token__subsequent_authorization(
     pds_api_client._get_valid_access_token()
 
     # then
-    if access_token_expires_at > datetime.utcnow():
+    if access_token_expires_at > time.time():
         assert not post_oauth2_token_patched.called
     else:
         assert post_oauth2_token_patched.called
+
+
+def test_get_versioned_patient_details__sends_etag_and_handles_not_modified(
+    mocker: MockFixture,
+):
+    # given
+    mocker.patch.object(
+        PDSApiClient,
+        PDSApiClient._get_valid_access_token.__name__,
+        MagicMock(return_value="123456789012345"),
+    )
+    session = MagicMock(spec=requests.Session)
+    session.get.return_value.status_code = 304
+    pds_api_client = PDSApiClient(session=session)
+
+    # when
+    versioned_patient_details = pds_api_client.get_versioned_patient_details(
+        "9728002440", if_none_match='W/"2"'
+    )
+
+    # then
+    assert versioned_patient_details is None
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == 'W/"2"'
+
+
+@pytest.mark.parametrize("etag_header", ('W/"3"', None))
+def test_get_versioned_patient_details__reads_etag(
+    mocker: MockFixture, etag_header: str
+):
+    # given
+    mocker.patch.object(
+        PDSApiClient,
+        PDSApiClient._get_valid_access_token.__name__,
+        MagicMock(return_value="123456789012345"),
+    )
+    session = MagicMock(spec=requests.Session)
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = _PATIENT_JSON
+    session.get.return_value.headers = {"ETag": etag_header} if etag_header else {}
+    pds_api_client = PDSApiClient(session=session)
+
+    # when
+    versioned_patient_details = pds_api_client.get_versioned_patient_details(
+        "9728002440"
+    )
+
+    # then
+    assert "If-None-Match" not in session.get.call_args.kwargs["headers"]
+    assert versioned_patient_details.patient_details.name[0].family == "Simon"
+    # the version in meta when PDS leaves the header out
+    assert versioned_patient_details.etag == (etag_header or 'W/"2"')
@@ -0,0 +1,173 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from subscription_create.external_integrations.pds.exceptions import (
+    PatientDidButNoLongerExists,
+    PDSUnavailable,
+)
+from subscription_create.external_integrations.pds.patient_details_cache import (
+    PatientDetailsCache,
+)
+from subscription_create.external_integrations.pds.schemas import (
+    PatientDetailsResponse,
+    VersionedPatientDetails,
+)
+
+_NHS_NUMBER = "9728002440"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _versioned_patient_details(
+    family: str = "Simon", etag: str = 'W/"1"'
+) -> VersionedPatientDetails:
+    return VersionedPatientDetails(
+        patient_details=PatientDetailsResponse(
+            id=_NHS_NUMBER,
+            name=[{"family": family, "given": ["Orpah"]}],
+            birthDate="2012-07-19",
+        ),
+        etag=etag,
+    )
+
+
+@pytest.fixture
+def clock() -> _Clock:
+    return _Clock()
+
+
+@pytest.fixture
+def pds_api_client() -> MagicMock:
+    pds_api_client = MagicMock()
+    pds_api_client.get_versioned_patient_details.return_value = (
+        _versioned_patient_details()
+    )
+    return pds_api_client
+
+
+@pytest.fixture
+def cache(pds_api_client: MagicMock, clock: _Clock) -> PatientDetailsCache:
+    return PatientDetailsCache(
+        pds_api_client,
+        ttl_seconds=60,
+        stale_while_revalidate_seconds=60,
+        stale_if_error_seconds=600,
+        clock=clock,
+    )
+
+
+def test_get_patient_details__serves_fresh_entry_without_asking_pds(
+    cache: PatientDetailsCache, pds_api_client: MagicMock
+):
+    # when
+    first = cache.get_patient_details(_NHS_NUMBER)
+    second = cache.get_patient_details(_NHS_NUMBER)
+
+    # then
+    assert second is first
+    pds_api_client.get_versioned_patient_details.assert_called_once_with(
+        _NHS_NUMBER, if_none_match=None
+    )
+    assert (cache.hits, cache.misses, cache.hit_ratio) == (1, 1, 0.5)
+
+
+def test_get_patient_details__serves_stale_entry_while_revalidating(
+    cache: PatientDetailsCache, pds_api_client: MagicMock, clock: _Clock
+):
+    # given
+    cache.get_patient_details(_NHS_NUMBER)
+    pds_api_client.get_versioned_patient_details.return_value = (
+        _versioned_patient_details(family="Smith", etag='W/"2"')
+    )
+    clock.now += 90
+
+    # when
+    stale = cache.get_patient_details(_NHS_NUMBER)
+    cache._executor.shutdown(wait=True)
+    revalidated = cache.get_patient_details(_NHS_NUMBER)
+
+    # then
+    assert stale.name[0].family == "Simon"
+    assert revalidated.name[0].family == "Smith"
+    pds_api_client.get_versioned_patient_details.assert_called_with(
+        _NHS_NUMBER, if_none_match='W/"1"'
+    )
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_get_patient_details__keeps_entry_pds_says_is_not_modified(
+    cache: PatientDetailsCache, pds_api_client: MagicMock, clock: _Clock
+):
+    # given
+    first = cache.get_patient_details(_NHS_NUMBER)
+    pds_api_client.get_versioned_patient_details.return_value = None
+    clock.now += 150
+
+    # when
+    second = cache.get_patient_details(_NHS_NUMBER)
+
+    # then
+    assert second is first
+    assert cache.revalidated == 1
+    # and is fresh again
+    clock.now += 30
+    cache.get_patient_details(_NHS_NUMBER)
+    assert pds_api_client.get_versioned_patient_details.call_count == 2
+
+
+def test_get_patient_details__serves_stale_entry_when_pds_fails(
+    cache: PatientDetailsCache, pds_api_client: MagicMock, clock: _Clock
+):
+    # given
+    first = cache.get_patient_details(_NHS_NUMBER)
+    pds_api_client.get_versioned_patient_details.side_effect = PDSUnavailable
+    clock.now += 300
+
+    # when
+    second = cache.get_patient_details(_NHS_NUMBER)
+
+    # then
+    assert second is first
+    assert cache.stale_served == 1
+    # but not once past the stale-if-error window
+    clock.now += 300
+    with pytest.raises(PDSUnavailable):
+        cache.get_patient_details(_NHS_NUMBER)
+
+
+def test_get_patient_details__evicts_patient_pds_no_longer_has(
+    cache: PatientDetailsCache, pds_api_client: MagicMock, clock: _Clock
+):
+    # given
+    cache.get_patient_details(_NHS_NUMBER)
+    pds_api_client.get_versioned_patient_details.side_effect = (
+        PatientDidButNoLongerExists
+    )
+    clock.now += 300
+
+    # then
+    with pytest.raises(PatientDidButNoLongerExists):
+        # when
+        cache.get_patient_details(_NHS_NUMBER)
+    assert len(cache) == 0
+
+
+def test_get_patient_details__evicts_least_recently_used(
+    pds_api_client: MagicMock, clock: _Clock
+):
+    # given
+    cache = PatientDetailsCache(pds_api_client, max_size=2, clock=clock)
+
+    # when
+    for nhs_number in ("1", "2", "1", "3"):
+        cache.get_patient_details(nhs_number)
+
+    # then
+    assert list(cache._entries) == ["1", "3"]
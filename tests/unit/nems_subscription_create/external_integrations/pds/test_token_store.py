@@ -0,0 +1,221 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from subscription_create.external_integrations.pds.schemas import (
+    AccessTokenResponse,
+)
+from subscription_create.external_integrations.pds.token_store import (
+    AccessTokenStore,
+    DynamoDBAccessTokenStore,
+    FileAccessTokenStore,
+    InMemoryAccessTokenStore,
+    StoredAccessToken,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _access_token_response(access_token: str = "new") -> AccessTokenResponse:
+    return AccessTokenResponse(
+        access_token=access_token,
+        expires_in=600,
+        issued_at=datetime.utcnow(),
+        token_type="Bearer",
+    )
+
+
+def _wait_for_background_refresh(store) -> None:
+    store._executor.shutdown(wait=True)
+    store._executor = None
+
+
+@pytest.fixture
+def clock() -> _Clock:
+    return _Clock()
+
+
+@pytest.fixture
+def fetch() -> MagicMock:
+    return MagicMock(return_value=_access_token_response())
+
+
+@pytest.fixture
+def store(clock: _Clock) -> InMemoryAccessTokenStore:
+    return InMemoryAccessTokenStore(
+        refresh_ahead_seconds=60, clock_skew_seconds=30, clock=clock
+    )
+
+
+def test_get_access_token__fetches_once_then_reuses(
+    store: InMemoryAccessTokenStore, fetch: MagicMock
+):
+    # when
+    access_tokens = [store.get_access_token(fetch) for _ in range(3)]
+
+    # then
+    assert access_tokens == ["new"] * 3
+    assert fetch.call_count == 1
+    assert store._token.expires_at == 1600.0
+
+
+def test_get_access_token__treats_token_within_clock_skew_as_expired(
+    store: InMemoryAccessTokenStore, fetch: MagicMock
+):
+    # given
+    store._token = StoredAccessToken(access_token="old", expires_at=1029.0)
+
+    # when
+    access_token = store.get_access_token(fetch)
+
+    # then
+    assert access_token == "new"
+    assert fetch.call_count == 1
+
+
+def test_get_access_token__refreshes_ahead_of_expiry_in_background(
+    store: InMemoryAccessTokenStore, fetch: MagicMock
+):
+    # given
+    store._token = StoredAccessToken(access_token="old", expires_at=1080.0)
+
+    # when
+    access_token = store.get_access_token(fetch)
+    _wait_for_background_refresh(store)
+
+    # then
+    assert access_token == "old"
+    assert fetch.call_count == 1
+    assert store.get_access_token(fetch) == "new"
+
+
+def test_get_access_token__keeps_current_token_when_refresh_ahead_fails(
+    store: InMemoryAccessTokenStore, fetch: MagicMock
+):
+    # given
+    store._token = StoredAccessToken(access_token="old", expires_at=1080.0)
+    fetch.side_effect = ConnectionError
+
+    # when
+    access_token = store.get_access_token(fetch)
+    _wait_for_background_refresh(store)
+
+    # then
+    assert access_token == "old"
+    assert store._token.access_token == "old"
+    assert not store._refresh_lock.locked()
+
+
+def test_get_access_token__single_flight_refresh(store: InMemoryAccessTokenStore):
+    # given
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def fetch() -> AccessTokenResponse:
+        fetching.set()
+        release.wait(timeout=5)
+        return _access_token_response()
+
+    fetch_mock = MagicMock(side_effect=fetch)
+    threads = [
+        threading.Thread(target=store.get_access_token, args=(fetch_mock,))
+        for _ in range(5)
+    ]
+
+    # when
+    for thread in threads:
+        thread.start()
+    fetching.wait(timeout=5)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # then
+    assert fetch_mock.call_count == 1
+
+
+def test_file_access_token_store__shares_token_between_stores(
+    tmp_path: Path, clock: _Clock, fetch: MagicMock
+):
+    # given
+    path = str(tmp_path / "access-token.json")
+    first_store = FileAccessTokenStore(path=path, clock=clock)
+    second_store = FileAccessTokenStore(path=path, clock=clock)
+
+    # when
+    first_store.get_access_token(fetch)
+    access_token = second_store.get_access_token(fetch)
+
+    # then
+    assert access_token == "new"
+    assert fetch.call_count == 1
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_file_access_token_store__unreadable_file_fetches(
+    tmp_path: Path, clock: _Clock, fetch: MagicMock
+):
+    # given
+    path = tmp_path / "access-token.json"
+    path.write_text("not json")
+    store = FileAccessTokenStore(path=str(path), clock=clock)
+
+    # when
+    access_token = store.get_access_token(fetch)
+
+    # then
+    assert access_token == "new"
+    assert fetch.call_count == 1
+
+
+def test_dynamodb_access_token_store__reads_and_writes_table(
+    clock: _Clock, fetch: MagicMock
+):
+    # given
+    table = MagicMock()
+    table.get_item.return_value = {}
+    store = DynamoDBAccessTokenStore(table=table, clock=clock)
+
+    # when
+    store.get_access_token(fetch)
+
+    # then
+    table.put_item.assert_called_once_with(
+        Item={
+            "token_key": "pds-access-token",
+            "access_token": "new",
+            "expires_at": 1600,
+        }
+    )
+
+    # given another container
+    table.get_item.return_value = {"Item": table.put_item.call_args.kwargs["Item"]}
+    other_store = DynamoDBAccessTokenStore(table=table, clock=clock)
+
+    # when
+    access_token = other_store.get_access_token(fetch)
+
+    # then
+    assert access_token == "new"
+    assert fetch.call_count == 1
+
+
+def test_access_token_store__backend_must_read_and_write_tokens():
+    # given
+    class ReadOnlyAccessTokenStore(AccessTokenStore):
+        def _read(self):
+            return None
+
+    # then
+    with pytest.raises(TypeError):
+        ReadOnlyAccessTokenStore()
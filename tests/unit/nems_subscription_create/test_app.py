@@ -0,0 +1,171 @@
+import json
+from typing import Optional
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+
+from subscription_create.app import bundle_handler, verify_patient_controller
+from subscription_create.external_integrations.pds.exceptions import (
+    PatientDoesNotExist,
+)
+from subscription_create.external_integrations.pds.schemas import (
+    PatientDetailsResponse,
+)
+
+with open("tests/_inputs/valid-patients/test01-patient.json") as f:
+    _PATIENT = json.load(f)
+
+
+def _patient(nhs_number: str = "9728002440", family: str = "Simon") -> dict:
+    patient = json.loads(json.dumps(_PATIENT))
+    patient["identifier"][0]["value"] = nhs_number
+    patient["name"][0]["family"] = family
+    return patient
+
+
+def _bundle_event(bundle_type: str, *resources: dict) -> dict:
+    return {
+        "body": json.dumps(
+            {
+                "resourceType": "Bundle",
+                "type": bundle_type,
+                "entry": [
+                    {"resource": resource, "request": {"method": "POST"}}
+                    for resource in resources
+                ],
+            }
+        )
+    }
+
+
+def _get_patient_details(nhs_number: str) -> PatientDetailsResponse:
+    if nhs_number == "9000000009":
+        raise PatientDoesNotExist
+
+    return PatientDetailsResponse(
+        id=nhs_number,
+        name=[{"family": "Simon", "given": ["Orpah"]}],
+        birthDate="2012-07-19",
+    )
+
+
+@pytest.fixture
+def patient_details_cache(mocker: MockFixture) -> MagicMock:
+    patient_details_cache = MagicMock()
+    patient_details_cache.get_patient_details.side_effect = _get_patient_details
+    mocker.patch.object(
+        verify_patient_controller, "patient_details_cache", patient_details_cache
+    )
+    return patient_details_cache
+
+
+def test_bundle_handler__batch_has_response_for_each_entry(
+    patient_details_cache: MagicMock,
+):
+    # given
+    event = _bundle_event(
+        "batch",
+        _patient(),
+        _patient(family="Smith"),
+        _patient(nhs_number="9000000009"),
+        {"resourceType": "Patient"},
+        _patient(),
+    )
+
+    # when
+    response = bundle_handler(event, MagicMock())
+
+    # then
+    assert response["statusCode"] == 200
+    bundle = json.loads(response["body"])
+    assert bundle["type"] == "batch-response"
+    assert [entry["response"]["status"] for entry in bundle["entry"]] == [
+        "201 Created",
+        "400",
+        "404",
+        "400",
+        "201 Created",
+    ]
+    assert bundle["entry"][0]["response"]["location"].startswith("urn:uuid:")
+    assert (
+        bundle["entry"][1]["response"]["outcome"]["issue"][0]["diagnostics"]
+        == "Name did not match"
+    )
+    assert patient_details_cache.get_patient_details.call_count == 2
+
+
+def test_bundle_handler__transaction_fails_when_any_entry_fails(
+    patient_details_cache: MagicMock,
+):
+    # given
+    event = _bundle_event("transaction", _patient(), _patient(nhs_number="9000000009"))
+
+    # when
+    response = bundle_handler(event, MagicMock())
+
+    # then
+    assert response["statusCode"] == 404
+    issues = json.loads(response["body"])["issue"]
+    assert len(issues) == 1
+    assert issues[0]["expression"] == ["Bundle.entry[1]"]
+
+
+def test_bundle_handler__transaction_succeeds(patient_details_cache: MagicMock):
+    # given
+    event = _bundle_event("transaction", _patient(), _patient())
+
+    # when
+    response = bundle_handler(event, MagicMock())
+
+    # then
+    assert response["statusCode"] == 200
+    bundle = json.loads(response["body"])
+    assert bundle["type"] == "transaction-response"
+    assert len(bundle["entry"]) == 2
+
+
+@pytest.mark.parametrize(
+    "body",
+    (
+        "not json",
+        json.dumps(_PATIENT),
+        json.dumps({"resourceType": "Bundle", "type": "collection"}),
+    ),
+)
+def test_bundle_handler__rejects_other_bodies(body: str):
+    # when
+    response = bundle_handler({"body": body}, MagicMock())
+
+    # then
+    assert response["statusCode"] == 400
+
+
+@pytest.mark.parametrize(
+    "body",
+    (
+        None,
+        json.dumps([]),
+        json.dumps({"resourceType": "Bundle", "type": "batch", "entry": None}),
+        json.dumps({"resourceType": "Bundle", "type": "batch", "entry": {}}),
+    ),
+)
+def test_bundle_handler__rejects_bodies_that_are_not_bundles(body: Optional[str]):
+    # when
+    response = bundle_handler({"body": body}, MagicMock())
+
+    # then
+    assert response["statusCode"] == 400
+    assert (
+        json.loads(response["body"])["issue"][0]["diagnostics"]
+        == "Body must be a FHIR Bundle"
+    )
+
+
+def test_bundle_handler__empty_batch(patient_details_cache: MagicMock):
+    # when
+    response = bundle_handler(_bundle_event("batch"), MagicMock())
+
+    # then
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]).get("entry", []) == []
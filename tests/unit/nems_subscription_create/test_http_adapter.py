@@ -0,0 +1,109 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from subscription_create.http_adapter import (
+    DEFAULT_RETRY_STRATEGY,
+    DEFAULT_TIMEOUT,
+    DeadlineExceeded,
+    TimeoutHTTPAdapter,
+    lambda_deadline,
+    remaining_seconds,
+)
+
+
+def _lambda_context(remaining_millis: int) -> MagicMock:
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = remaining_millis
+    return context
+
+
+class _UnavailableHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_url() -> Iterator[str]:
+    server = HTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _sent_timeout(adapter: TimeoutHTTPAdapter, **kwargs):
+    with patch.object(HTTPAdapter, HTTPAdapter.send.__name__) as send:
+        adapter.send(MagicMock(), **kwargs)
+    return send.call_args.kwargs["timeout"]
+
+
+def test_lambda_deadline__ignores_contexts_without_remaining_time():
+    # when
+    with lambda_deadline(MagicMock()):
+        # then
+        assert remaining_seconds() is None
+
+
+def test_lambda_deadline__keeps_margin_and_is_reset():
+    # when
+    with lambda_deadline(_lambda_context(10_000), margin=2):
+        # then
+        assert 7.9 < remaining_seconds() <= 8
+
+    assert remaining_seconds() is None
+
+
+def test_timeout_http_adapter__shortens_timeout_to_deadline():
+    # given
+    adapter = TimeoutHTTPAdapter()
+
+    # then
+    assert _sent_timeout(adapter) == DEFAULT_TIMEOUT
+    with lambda_deadline(_lambda_context(3_000), margin=0):
+        assert _sent_timeout(adapter) <= 3
+        assert _sent_timeout(adapter, timeout=(1, 10))[0] == 1
+        assert _sent_timeout(adapter, timeout=(1, 10))[1] <= 3
+
+
+def test_timeout_http_adapter__raises_once_deadline_has_passed():
+    # given
+    adapter = TimeoutHTTPAdapter()
+
+    # then
+    with lambda_deadline(_lambda_context(1_000), margin=1):
+        with pytest.raises(DeadlineExceeded):
+            # when
+            adapter.send(MagicMock())
+
+
+def test_timeout_http_adapter__gives_up_retrying_before_deadline(
+    unavailable_url: str,
+):
+    # given
+    session = requests.Session()
+    session.mount(
+        "http://", TimeoutHTTPAdapter(max_retries=DEFAULT_RETRY_STRATEGY, timeout=1)
+    )
+    started_at = time.monotonic()
+
+    # then
+    with lambda_deadline(_lambda_context(4_000), margin=1):
+        with pytest.raises(requests.exceptions.RetryError):
+            # when
+            session.get(unavailable_url)
+
+    # without the deadline the backoff alone would take over 15 seconds
+    assert time.monotonic() - started_at < 3
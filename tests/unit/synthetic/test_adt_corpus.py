@@ -0,0 +1,53 @@
+import pytest
+
+from convert_hl7v2_fhir.controllers.er7.er7_extractor import ER7Extractor
+from convert_hl7v2_fhir.controllers.er7.er7_parser import parse_er7_message
+from convert_hl7v2_fhir.controllers.er7.er7_snapshot import ER7Snapshot
+from convert_hl7v2_fhir.controllers.er7.exceptions import InvalidNHSNumberError
+from tests.synthetic.adt_corpus import CorpusProfile, generate_messages
+
+# every message a valid ADT, and none with hundreds of OBX segments to parse
+_VALID_ADT_PROFILE = CorpusProfile(
+    non_adt_rate=0,
+    invalid_nhs_number_rate=0,
+    missing_nhs_number_rate=0,
+    large_message_rate=0,
+)
+
+
+def _extract(raw_er7_message: str) -> ER7Snapshot:
+    return ER7Extractor(er7_message=parse_er7_message(raw_er7_message)).extract()
+
+
+def test_generate_messages__same_seed_gives_same_corpus():
+    # when
+    first = list(generate_messages(seed=1, count=50))
+    second = list(generate_messages(seed=1, count=50))
+    other_seed = list(generate_messages(seed=2, count=50))
+
+    # then
+    assert first == second
+    assert first != other_seed
+    assert [m.split("\r")[0].split("|")[9] for m in first[:2]] == ["1-0", "1-1"]
+
+
+def test_generate_messages__messages_are_extracted():
+    # given
+    messages = generate_messages(seed=1, count=20, profile=_VALID_ADT_PROFILE)
+
+    # then
+    for raw_er7_message in messages:
+        er7_snapshot = _extract(raw_er7_message)
+        for field in ER7Snapshot.FIELDS:
+            getattr(er7_snapshot, field)
+        assert er7_snapshot.message_type == "ADT"
+
+
+def test_generate_messages__invalid_nhs_numbers_are_rejected():
+    # given
+    profile = _VALID_ADT_PROFILE._replace(invalid_nhs_number_rate=1)
+
+    # then
+    for raw_er7_message in generate_messages(seed=1, count=5, profile=profile):
+        with pytest.raises(InvalidNHSNumberError):
+            _extract(raw_er7_message).nhs_number